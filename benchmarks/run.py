@@ -0,0 +1,248 @@
+"""Runs the benchmark suite and compares it against a stored baseline.
+
+Every case saves or loads a generated payload in a temporary folder and
+reports the median wall time of some repeats, the throughput in MB/s of
+payload, the latency per key and the peak memory traced by `tracemalloc` in a
+separate run. Memory allocated by the hdf5 library itself is not traced.
+
+Usage::
+
+    python benchmarks/run.py --save          # stores benchmarks/baseline.json
+    python benchmarks/run.py                 # compares against it
+    python benchmarks/run.py --quick -k save # small payloads, cases matching
+
+Cases slower or using more memory than the baseline by more than the
+tolerance are reported as regression and the script exits with 1.
+"""
+__license__ = 'MIT'
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root))
+import itsh5py  # noqa: E402
+from itsh5py import config, queue_handler  # noqa: E402
+
+BASELINE = root / 'benchmarks' / 'baseline.json'
+COMPRESSIONS = {'none': (False, 0), 'gzip': (True, 5), 'lzf': 'lzf'}
+
+# Differences below these are noise and never a regression
+MIN_DIFFERENCE = {'time': 1e-3, 'peak_bytes': 2**16}
+
+
+def _nbytes(value):
+    """Payload bytes of a value, counting str by their utf-8 length."""
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(v) for v in value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, str):
+        return len(value.encode())
+    return 8
+
+
+def _keys(value):
+    """Number of leaf keys of a payload."""
+    if isinstance(value, dict):
+        return sum(_keys(v) for v in value.values())
+    return 1
+
+
+def _nested(depth, width, leaf):
+    if depth == 0:
+        return leaf()
+    return {f'g{i}': _nested(depth - 1, width, leaf) for i in range(width)}
+
+
+def payloads(scale):
+    """Generated payloads by name, `scale` shrinks them for quick runs."""
+    rng = np.random.default_rng(0)
+    n = max(1, int(100 * scale))
+    start = datetime(2020, 1, 1)
+    return {
+        'array_small': lambda: {f'a{i}': rng.random(100) for i in range(10 * n)},
+        'array_large': lambda: {'a': rng.random((int(2000 * scale) + 1, 1000))},
+        'many_keys': lambda: {f'k{i}': i for i in range(50 * n)},
+        'nested': lambda: _nested(4, max(2, int(6 * scale ** 0.25)),
+                                  lambda: {'x': rng.random(10), 'y': 1.}),
+        'strings': lambda: {f's{i}': [f'value {j}' for j in range(n)]
+                            for i in range(n)},
+        'datetimes': lambda: {f't{i}': [start + timedelta(hours=j)
+                                        for j in range(10 * n)] for i in range(n)},
+        'lists': lambda: {f'l{i}': [1, 'a', 2.5, None, (1, 2)] for i in range(10 * n)},
+        'ragged': lambda: {'r': [rng.random(i % 50 + 1) for i in range(20 * n)]},
+    }
+
+
+def _save(path, data, compress):
+    return lambda: itsh5py.save(path, data, compress)
+
+
+def _load(path, lazy):
+    def _run():
+        config.use_lazy = lazy
+        data = itsh5py.load(path)
+        if lazy:
+            data.close()
+    return _run
+
+
+def _getitem(path):
+    def _run():
+        config.use_lazy = True
+        data = itsh5py.load(path)
+
+        def _walk(lazy_dict):
+            for key in list(lazy_dict.keys()):
+                value = lazy_dict[key]
+                if isinstance(value, itsh5py.LazyHdfDict):
+                    _walk(value)
+        _walk(data)
+        data.close()
+    return _run
+
+
+def _queue(paths):
+    def _run():
+        config.use_lazy = True
+        for _ in range(5):
+            for path in paths:
+                itsh5py.load(path)
+        queue_handler.cleanup()
+        queue_handler.open_files.clear()
+    return _run
+
+
+def cases(folder, scale):
+    """Yields `(name, setup, run, nbytes, keys)` of all cases. `setup` writes
+    the files a case needs and is not timed."""
+    for name, make in payloads(scale).items():
+        data = make()
+        nbytes, keys = _nbytes(data), _keys(data)
+        for comp, compress in COMPRESSIONS.items():
+            path = folder / f'{name}_{comp}.hdf'
+            yield (f'save/{name}/{comp}', None, _save(path, data, compress),
+                   nbytes, keys)
+
+        # Read cases share a file written once
+        path = folder / f'{name}_read.hdf'
+        setup = _save(path, data, COMPRESSIONS['gzip'])
+        yield f'load_eager/{name}', setup, _load(path, False), nbytes, keys
+        yield f'load_lazy/{name}', None, _load(path, True), nbytes, keys
+        yield f'getitem/{name}', None, _getitem(path), nbytes, keys
+
+    # More files than the queue holds, so loading hits and evicts
+    data = payloads(scale)['many_keys']()
+    paths = [folder / f'queue_{i}.hdf'
+             for i in range(queue_handler.max_open_files + 4)]
+
+    def _setup():
+        for path in paths:
+            itsh5py.save(path, data)
+    yield ('queue/load_open', _setup, _queue(paths), _nbytes(data) * len(paths),
+           _keys(data) * len(paths))
+
+
+def measure(run, repeat):
+    """Median wall time of `repeat` runs and peak traced memory of one more."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+def compare(results, baseline, tolerance):
+    """Returns the names of cases slower or larger than the baseline."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        for field, min_difference in MIN_DIFFERENCE.items():
+            if (result[field] > base[field] * (1 + tolerance)
+                    and result[field] - base[field] > min_difference):
+                regressions.append(
+                    f'{name}: {field} {result[field]:.4g} vs {base[field]:.4g}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-k', dest='pattern', default='',
+                        help='Only run cases containing this string')
+    parser.add_argument('--quick', action='store_true',
+                        help='Small payloads and fewer repeats')
+    parser.add_argument('--repeat', type=int, default=None)
+    parser.add_argument('--baseline', type=Path, default=BASELINE)
+    parser.add_argument('--save', action='store_true',
+                        help='Store the results as new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed relative slowdown, defaults to 0.2')
+    args = parser.parse_args(argv)
+
+    scale = 0.1 if args.quick else 1.
+    repeat = args.repeat or (1 if args.quick else 3)
+    use_lazy, allow_overwrite = config.use_lazy, config.allow_overwrite
+    config.allow_overwrite = True
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, setup, run, nbytes, keys in cases(Path(tmp), scale):
+            if args.pattern not in name:
+                continue
+            if setup is not None:
+                setup()
+            elapsed, peak = measure(run, repeat)
+            config.use_lazy = use_lazy
+            results[name] = {'time': elapsed, 'mb_per_s': nbytes / elapsed / 1e6,
+                             'key_latency': elapsed / keys, 'peak_bytes': peak}
+            print(f'{name:32} {elapsed * 1e3:10.2f} ms {nbytes / elapsed / 1e6:10.1f}'
+                  f' MB/s {elapsed / keys * 1e6:10.2f} us/key'
+                  f' {peak / 1e6:10.2f} MB peak')
+    config.allow_overwrite = allow_overwrite
+
+    meta = {'itsh5py': itsh5py.__version__, 'quick': args.quick,
+            'python': sys.version.split()[0], 'numpy': np.__version__}
+    if args.save:
+        args.baseline.write_text(json.dumps({'meta': meta, 'results': results},
+                                            indent=1))
+        print(f'Stored baseline in {args.baseline}')
+        return 0
+
+    if not args.baseline.exists():
+        print('No baseline to compare against, store one with --save')
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())
+    if baseline['meta'].get('quick') != args.quick:
+        print('Baseline was run with other payload sizes, not comparing')
+        return 0
+
+    regressions = compare(results, baseline['results'], args.tolerance)
+    for regression in regressions:
+        print(f'Regression {regression}')
+    print(f'{len(regressions)} regressions against {args.baseline}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
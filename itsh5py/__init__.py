@@ -8,6 +8,14 @@ __author__ = 'Max Elfner'
 __copyright__ = 'Max Elfner'
 __license__ = 'MIT'
 
-from .hdf_support import save, load, LazyHdfDict
+from .hdf_support import (save, load, LazyHdfDict, LazyArray, RaggedList,
+                          LazyFrame)
+from .writer import HdfWriter
+from .batch import load_many, save_many
+from .aio import aload, asave, aget
+from .buffers import BufferPool
+from .inplace import update, repack, DELETE
 from .queue_handler import max_open_files, open_filenames
+from .registry import register_codec, unregister_codec
+from .inspection import inspect
 from . import config
@@ -0,0 +1,142 @@
+"""
+Asyncio support. `aload`, `asave` and `aget` run the blocking hdf5 work in a
+thread pool, so the event loop keeps serving other requests while a file is
+read, decompressed or written.
+
+All hdf5 calls are serialized by the global lock of `h5py`, threads still let
+decoding, compression in `parallel` and the work on other files overlap.
+Access to a single file is bounded per event loop: reading a file takes one
+of `config.async_file_concurrency` slots, saving takes all slots, so a file
+is never read while it is written. The default of one slot serializes all
+access to a file, which also keeps lazy dicts from being expanded by two
+threads at once.
+
+The pool is created on first use with `config.async_workers` threads and
+shut down at exit or with `shutdown`.
+
+Example
+-------
+>>> data = await aload('data.hdf')
+>>> array = await aget(data, 'array')
+>>> part = await aget(array, slice(0, 10))  # LazyArray
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from pathlib import Path
+import atexit
+import threading
+import weakref
+from logging import getLogger
+
+from .hdf_support import load, save, unpack_dataset, _save_path
+from . import config
+
+logger = getLogger(__package__)
+
+_executor = None
+_executor_lock = threading.Lock()
+# event loop -> {resolved path: _FileGate}, gates are dropped once no
+# awaitable holds them
+_gates = weakref.WeakKeyDictionary()
+
+
+def executor():
+    """Returns the thread pool running the hdf5 work, creating it on first
+    use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(config.async_workers,
+                                           thread_name_prefix='itsh5py')
+            logger.debug(f'Started async pool with {config.async_workers} threads')
+        return _executor
+
+
+@atexit.register
+def shutdown(wait=True):
+    """Shuts the thread pool down, a new one is created on the next use."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
+
+
+class _FileGate:
+    """Bounds concurrent reads of a file and makes writes exclusive. Writers
+    are serialized by a lock and then take all read slots."""
+
+    def __init__(self, slots):
+        self.slots = slots
+        self._reads = asyncio.Semaphore(slots)
+        self._write = asyncio.Lock()
+
+    @asynccontextmanager
+    async def read(self):
+        async with self._reads:
+            yield
+
+    @asynccontextmanager
+    async def write(self):
+        async with self._write:
+            taken = 0
+            try:
+                for _ in range(self.slots):
+                    await self._reads.acquire()
+                    taken += 1
+                yield
+            finally:
+                for _ in range(taken):
+                    self._reads.release()
+
+
+def _gate(path):
+    loop = asyncio.get_running_loop()
+    gates = _gates.get(loop)
+    if gates is None:
+        gates = _gates[loop] = weakref.WeakValueDictionary()
+    key = str(Path(path).resolve())
+    gate = gates.get(key)
+    if gate is None:
+        gate = gates[key] = _FileGate(max(1, config.async_file_concurrency))
+    return gate
+
+
+async def _run(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor(), partial(func, *args, **kwargs))
+
+
+def _load_path(hdf):
+    hdf = Path(hdf)
+    if not hdf.suffix:
+        hdf = hdf.parent / (hdf.name + config.default_suffix)
+    return hdf
+
+
+async def aload(hdf, unpack_attrs=False, unpacker=unpack_dataset,
+                buffers=None):
+    """Awaitable `load`, see there for the parameters. Lazy files are returned
+    as `LazyHdfDict`, read their values with `aget`."""
+    hdf = _load_path(hdf)
+    async with _gate(hdf).read():
+        return await _run(load, hdf, unpack_attrs=unpack_attrs,
+                          unpacker=unpacker, buffers=buffers)
+
+
+async def asave(hdf, data, compress=None, *args, **kwargs):
+    """Awaitable `save`, see there for the parameters. The file is not read or
+    written by other awaitables of this module while saving."""
+    hdf = _save_path(hdf)
+    async with _gate(hdf).write():
+        return await _run(save, hdf, data, compress, *args, **kwargs)
+
+
+async def aget(lazy, key):
+    """Awaitable item access of a lazy value, e.g. a key of a `LazyHdfDict` or
+    a selection of a `LazyArray`, `RaggedList` or `LazyFrame`."""
+    filename = getattr(lazy, '_h5filename', None) or getattr(lazy, '_filename')
+    async with _gate(filename).read():
+        return await _run(lazy.__getitem__, key)
@@ -0,0 +1,170 @@
+"""
+Batch loading and saving of many files in a process pool. Each file is
+handled in a worker process with bounded concurrency, errors are captured per
+file and returned with the results instead of stopping the batch.
+
+Workers always load eager since lazy references can not be shared between
+processes. The package config of the calling process is passed on to the
+workers.
+"""
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from logging import getLogger
+import os
+
+from .hdf_support import LazyHdfDict, _materialize, load, save
+from . import config
+
+logger = getLogger(__package__)
+
+BatchResult = namedtuple('BatchResult', ['path', 'value', 'error'])
+BatchResult.__doc__ = """Result of a single file in a batch. `error` holds the
+exception raised for the file or None, `value` is None on errors."""
+
+
+def _config_state():
+    """Public settings of the config module to pass on to workers."""
+    return {k: v for k, v in vars(config).items()
+            if not k.startswith('_') and isinstance(
+                v, (bool, int, float, str, tuple, dict, type(None)))}
+
+
+def _unlazy(value):
+    """Recursively converts lazy values to their data."""
+    if isinstance(value, LazyHdfDict):
+        return {k: _unlazy(v) for k, v in value.items()}
+    return _materialize(value)
+
+
+def _load_worker(path, keys, unpack_attrs, state):
+    """Loads a file or only the given keys in a worker process."""
+    vars(config).update(state)
+    try:
+        if keys is None:
+            config.use_lazy = False
+            value = load(path, unpack_attrs=unpack_attrs)
+        else:
+            # Lazy loading reads only the selected keys from the file
+            config.use_lazy = True
+            data = load(path, unpack_attrs=unpack_attrs)
+            value = {}
+            for key in keys:
+                item = data
+                for level in [k for k in key.split('/') if k]:
+                    item = item[level]
+                value[key] = _unlazy(item)
+            data.close()
+    except Exception as e:
+        return BatchResult(path, None, e)
+
+    return BatchResult(path, value, None)
+
+
+def _save_worker(path, data, compress, state):
+    """Saves data to a file in a worker process."""
+    vars(config).update(state)
+    try:
+        path = save(path, data, compress=compress)
+    except Exception as e:
+        return BatchResult(path, None, e)
+
+    return BatchResult(path, None, None)
+
+
+def _run(worker, tasks, workers, ordered):
+    """Runs tasks in a process pool, keeping at most twice the number of
+    workers in flight. Yields results in task order or as completed."""
+    workers = workers or os.cpu_count() or 1
+    pending = deque()
+
+    with ProcessPoolExecutor(workers) as executor:
+        for args in tasks:
+            pending.append((args[0], executor.submit(worker, *args)))
+            if len(pending) >= 2 * workers:
+                yield from _collect(pending, ordered)
+
+        while pending:
+            yield from _collect(pending, ordered)
+
+
+def _collect(pending, ordered):
+    """Removes the next finished tasks from `pending` and yields their
+    results. If ordered, this waits for the oldest task."""
+    if ordered:
+        yield _result(*pending.popleft())
+        return
+
+    done, _ = wait([f for _, f in pending], return_when=FIRST_COMPLETED)
+    for entry in [e for e in pending if e[1] in done]:
+        pending.remove(entry)
+        yield _result(*entry)
+
+
+def _result(path, future):
+    """Gets the result of a future, capturing errors of the pool itself,
+    e.g. when a result can not be transferred."""
+    try:
+        return future.result()
+    except Exception as e:
+        logger.error(f'Batch processing of {path} failed: {e}')
+        return BatchResult(path, None, e)
+
+
+def load_many(paths, keys=None, workers=None, ordered=True, unpack_attrs=False):
+    """Loads many files in a process pool.
+
+    Parameters
+    ----------
+    paths: `iterable`
+        Paths to hdf files.
+    keys: `list`, optional
+        Only load these keys from each file, nested keys are given as path,
+        e.g. `group/data`. This keeps the transfer between processes small.
+        The value of each file is then a flat dict with the given keys.
+    workers: `int`, optional
+        Number of worker processes, defaults to the number of cores.
+    ordered: `bool`, optional
+        If True, defaults, a list of results in the order of `paths` is
+        returned. Else an iterator yielding results as they are completed.
+    unpack_attrs: `bool`, optional
+        See `load`.
+
+    Returns
+    -------
+    results: `list` or `iterator` of `BatchResult`
+        Results holding path, value and the error for each file.
+    """
+    state = _config_state()
+    tasks = ((path, keys, unpack_attrs, state) for path in paths)
+    results = _run(_load_worker, tasks, workers, ordered)
+    if ordered:
+        return list(results)
+    return results
+
+
+def save_many(data, compress=None, workers=None, ordered=True):
+    """Saves many files in a process pool.
+
+    Parameters
+    ----------
+    data: `dict`
+        Maps the paths to save to to the data of each file, see `save`.
+    compress: optional
+        Compression spec, see `save`.
+    workers: `int`, optional
+        Number of worker processes, defaults to the number of cores.
+    ordered: `bool`, optional
+        If True, defaults, a list of results in the order of `data` is
+        returned. Else an iterator yielding results as they are completed.
+
+    Returns
+    -------
+    results: `list` or `iterator` of `BatchResult`
+        Results holding the saved path and the error for each file.
+    """
+    state = _config_state()
+    tasks = ((path, value, compress, state) for path, value in data.items())
+    results = _run(_save_worker, tasks, workers, ordered)
+    if ordered:
+        return list(results)
+    return results
@@ -0,0 +1,102 @@
+"""
+Reusable arrays for reading datasets without allocating. Loops reading arrays
+of the same shape from many files can pass a `BufferPool` to `load` or set it
+as `LazyHdfDict.buffers`, untagged arrays of numbers are then read directly
+into a free buffer of the pool. Buffers are handed back with `release` once
+their data is not needed anymore.
+
+Example
+-------
+>>> pool = BufferPool()
+>>> for path in paths:
+...     data = load(path, buffers=pool)
+...     process(data)
+...     pool.release(data)
+"""
+from collections import defaultdict
+from collections.abc import Mapping
+import threading
+from logging import getLogger
+import numpy as np
+
+from .hdf_support import LazyHdfDict
+
+logger = getLogger(__package__)
+
+
+class BufferPool:
+    """
+    Pool of free arrays keyed by shape and dtype.
+
+    Parameters
+    ------------
+    max_free: `int`, optional
+        Maximum number of free buffers kept per shape and dtype, further
+        released buffers are dropped. Defaults to no limit.
+    """
+
+    def __init__(self, max_free=None):
+        self.max_free = max_free
+        self._free = defaultdict(list)  # (shape, dtype) -> free arrays
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, shape, dtype):
+        """Returns a free buffer of the shape and dtype, its content is
+        undefined. A new one is allocated if none is free."""
+        key = (tuple(shape), np.dtype(dtype))
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                self._hits += 1
+                return free.pop()
+            self._misses += 1
+        return np.empty(key[0], dtype=key[1])
+
+    def release(self, value):
+        """Hands buffers back to the pool. Arrays and dicts, `LazyHdfDict`,
+        lists or tuples of them are accepted, only arrays owning their data
+        are kept. Released arrays must not be used anymore.
+
+        Only values a `LazyHdfDict` read into buffers are released, the dict
+        reads them from the file again on their next access. Children which
+        were not listed yet are not listed now."""
+        if isinstance(value, LazyHdfDict):
+            for item in value._take_buffered():
+                self.release(item)
+            for item in value._data.values():
+                if isinstance(item, LazyHdfDict):
+                    self.release(item)
+            return
+        if isinstance(value, Mapping):
+            for item in value.values():
+                self.release(item)
+            return
+        if isinstance(value, (list, tuple)):
+            for item in value:
+                self.release(item)
+            return
+
+        if (type(value) is not np.ndarray or not value.flags.owndata
+                or not value.flags.c_contiguous):
+            return
+
+        key = (value.shape, value.dtype)
+        with self._lock:
+            free = self._free[key]
+            if self.max_free is None or len(free) < self.max_free:
+                free.append(value)
+
+    def clear(self):
+        """Drops all free buffers."""
+        with self._lock:
+            self._free.clear()
+
+    def stats(self):
+        """Returns a `dict` with the number of free buffers, their bytes and
+        the hits and misses of `get`."""
+        with self._lock:
+            buffers = [b for free in self._free.values() for b in free]
+            return {'free': len(buffers), 'bytes': sum(b.nbytes for b in buffers),
+                    'hits': self._hits, 'misses': self._misses}
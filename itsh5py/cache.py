@@ -0,0 +1,123 @@
+"""
+Memory budgeted cache for decoded values of lazy files. Without a budget, a
+`LazyHdfDict` keeps every decoded value forever. With a budget, decoded values
+are held in a least recently used cache instead and evicted entries are read
+from the file again on the next access, since the dict itself keeps only the
+lazy reference.
+
+The process-wide `shared_cache` is used by all files if `config.cache_budget`
+is set. Single dicts can use their own `ValueCache` via `LazyHdfDict.cache`.
+"""
+from collections import OrderedDict
+import sys
+import threading
+from logging import getLogger
+import numpy as np
+
+from . import config
+
+logger = getLogger(__package__)
+
+
+def sizeof(value):
+    """Estimates the memory of a decoded value in bytes."""
+    if isinstance(value, np.ndarray):
+        if value.base is None:  # includes the data of owning arrays
+            return sys.getsizeof(value)
+        return sys.getsizeof(value) + value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class ValueCache:
+    """
+    LRU cache for decoded values with a memory budget. Entries are keyed by
+    the owning dict and the key in it. Values larger than the budget are not
+    cached at all.
+
+    Parameters
+    ------------
+    budget: `int`, optional
+        Memory budget in bytes. If None, `config.cache_budget` is used.
+    """
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self._entries = OrderedDict()  # (owner id, key) -> (value, size)
+        self._owners = {}  # owner id -> set of keys
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.RLock()
+
+    def _budget(self):
+        return config.cache_budget if self.budget is None else self.budget
+
+    def get(self, owner, key):
+        """Returns a tuple of (hit, value) and marks a hit as recently used."""
+        entry_key = (id(owner), key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                self._misses += 1
+                return False, None
+            self._entries.move_to_end(entry_key)
+            self._hits += 1
+            return True, entry[0]
+
+    def put(self, owner, key, value):
+        """Caches a value and evicts least recently used entries until the
+        budget is met."""
+        size = sizeof(value)
+        budget = self._budget()
+        if budget is not None and size > budget:
+            logger.debug(f'Value of {key} exceeds cache budget, not caching')
+            return
+
+        entry_key = (id(owner), key)
+        with self._lock:
+            self._remove(entry_key)
+            self._entries[entry_key] = (value, size)
+            self._owners.setdefault(entry_key[0], set()).add(key)
+            self._bytes += size
+
+            while budget is not None and self._bytes > budget:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def _remove(self, entry_key):
+        entry = self._entries.pop(entry_key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+            keys = self._owners[entry_key[0]]
+            keys.discard(entry_key[1])
+            if not keys:
+                del self._owners[entry_key[0]]
+
+    def discard(self, owner):
+        """Removes all entries of a dict, e.g. when its file is closed."""
+        with self._lock:
+            for key in list(self._owners.get(id(owner), ())):
+                self._remove((id(owner), key))
+
+    def clear(self):
+        """Removes all entries and resets the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._owners.clear()
+            self._bytes = 0
+            self._hits = self._misses = self._evictions = 0
+
+    def stats(self):
+        """Returns a dict with hits, misses, evictions, number of entries,
+        used bytes and the budget."""
+        with self._lock:
+            return {'hits': self._hits, 'misses': self._misses,
+                    'evictions': self._evictions,
+                    'entries': len(self._entries), 'bytes': self._bytes,
+                    'budget': self._budget()}
+
+
+shared_cache = ValueCache()
@@ -5,9 +5,43 @@ default_suffix: `str`, defaults to `.hdf`
     Default suffix to use for saveing hdf files.
 use_lazy: `bool`, defaults to `True`
     Default setting for lazyness on loading.
+use_lazy_arrays: `bool`, defaults to `False`
+    If set to True, array datasets of lazily loaded files are returned as a
+    sliceable `LazyArray` proxy. Slicing the proxy reads only the requested
+    part of the dataset from the file instead of the full array.
+use_memmap: `bool`, defaults to `False`
+    If set to True, contiguous and uncompressed arrays of numbers are returned
+    as read only `numpy.memmap` of their bytes in the file instead of being
+    copied into memory, also in lazy files. Processes mapping the same file
+    share the page cache. Other datasets are read as usual.
+contiguous_bytes: `int`, defaults to None
+    Arrays of numbers of at least this size in bytes are stored contiguous and
+    uncompressed on saving, whatever the compression, so they can be memory
+    mapped with `use_memmap`. None applies the compression to all arrays.
 default_compression: `tuple`, defaults to `(True, 5)`
     Default setting for gzip compression. First element is yes or no, second
-    is level of compression. See `h5py` docs for more details.
+    is level of compression. See `h5py` docs for more details. Any other
+    compression spec from `filters` can be used, e.g. `'lzf'` or
+    `{'filter': 'gzip', 'opts': 4, 'shuffle': True, 'chunks': 'row'}`.
+key_compression: `dict`, defaults to `{}`
+    Compression specs for single keys. Keys are either the full path of a
+    dataset, e.g. `/group/data`, or a plain key name which matches in every
+    group. Takes precedence over the compression given to `save`.
+chunk_bytes: `int`, defaults to `2**20`
+    Target size of a chunk in bytes for the chunk policies in `filters`.
+write_workers: `int`, defaults to 1
+    Number of threads compressing the chunks of gzip compressed arrays on
+    saving. Values larger than 1 enable the parallel compression in `parallel`.
+read_workers: `int`, defaults to 1
+    Number of threads decompressing the chunks of gzip compressed datasets on
+    reading. Values larger than 1 enable the parallel decompression in
+    `parallel`.
+async_workers: `int`, defaults to 4
+    Number of threads running the hdf5 work of the awaitables in `aio`. Takes
+    effect when the pool is created, see `aio.shutdown`.
+async_file_concurrency: `int`, defaults to 1
+    Number of awaitables in `aio` reading the same file at once. Saving a
+    file always waits for all of them.
 allow_fallback_open: `bool`, defaults to `True`
     If an item is unwrapped from a closed file (e.g. when holding many files
     open in long list comprehension), this allows a quick reopen and getting
@@ -22,14 +56,58 @@ squeeze_single: `bool`, defaults to `False`
     If set to True, unpacked data containing a single key will be unpacked.
     This can lead to issues with single key dicts containing sub dicts,
     thus the default is the safer version (False)
+vlen_strings: `bool` or `str`, defaults to `'auto'`
+    Storage of str arrays and lists of str. If True, strings are stored as
+    variable length utf-8. If `'auto'`, ascii strings of similar length are
+    stored fixed width, which is faster to convert, and all others variable
+    length. If False, strings are always stored fixed width.
+datetime_as_numpy: `bool`, defaults to `False`
+    If set to True, stored datetimes are returned as `numpy.datetime64` values
+    instead of python or pandas datetimes. Time zone aware data is returned in
+    UTC.
+native_frames: `bool`, defaults to `False`
+    If set to True, pandas DataFrames and Series are stored in a columnar
+    layout of one dataset per column instead of with `pandas.HDFStore`. Frames
+    can then be stored in any group and are read with the same file handle.
+    With `use_lazy_arrays`, frames of lazy files are returned as `LazyFrame`
+    which reads only selected columns and rows. Columns of other objects than
+    str and column labels with multiple levels raise a TypeError.
+json_fallback: `bool`, defaults to `True`
+    Values which can not be stored natively are serialized as last resort. If
+    True, values which round trip through json (dicts with str keys, lists and
+    scalars) are stored as json, which is much faster than yaml. Anything else
+    and all values if False are stored as yaml.
+structure_index: `str`, defaults to None
+    Persisted index of the file structure which lazy files list their groups
+    from, see `structure`. `'file'` stores it in the file on saving,
+    `'sidecar'` in a json file next to it. None disables the index.
+cache_budget: `int`, defaults to None
+    Memory budget in bytes for decoded values of lazy files, shared by all
+    files, see `cache`. Least recently used values are evicted and read again
+    on access. If None, decoded values are kept in the `LazyHdfDict` forever.
 max_tree_children: `int`, defaults to 30
     Maximum number of children in a group for the tree view to keep recursing.
     This can help to reduce tree size with very large files.
 """
 default_suffix = '.hdf'
 use_lazy = True
+use_lazy_arrays = False
+use_memmap = False
+contiguous_bytes = None
 default_compression = (True, 5)
+key_compression = {}
+chunk_bytes = 2**20
+write_workers = 1
+read_workers = 1
+async_workers = 4
+async_file_concurrency = 1
 allow_fallback_open = False
 allow_overwrite = False
 squeeze_single = False
+vlen_strings = 'auto'
+datetime_as_numpy = False
+native_frames = False
+json_fallback = True
+structure_index = None
+cache_budget = None
 max_tree_children = 30
@@ -0,0 +1,236 @@
+"""
+Compression filters and chunk shapes for new datasets. A compression spec can
+be given in several forms which are all normalized to a `dict`:
+
+* `tuple` of (bool compress, 0-9 level), e.g. `(True, 5)` for gzip level 5.
+* `str` name of a builtin filter: `gzip`, `lzf` or `none`.
+* `int` id of a registered third-party filter, e.g. from `hdf5plugin`.
+* `dict` with any of the keys below. The `h5py` keywords `compression` and
+  `compression_opts` are accepted as well, so `hdf5plugin` filter objects can
+  be passed directly.
+
+Keys of a normalized spec:
+
+filter: `str`, `int` or None
+    Compression filter, None disables compression.
+opts:
+    Options of the filter, e.g. the gzip level.
+shuffle: `bool`
+    Enables the shuffle filter in front of the compression.
+fletcher32: `bool`
+    Enables the fletcher32 checksum filter.
+chunks: `str`, `tuple` or None
+    Chunk policy. None leaves chunking to `h5py`. `auto` splits all axes evenly
+    to reach `chunk_bytes`, `row` keeps the trailing axes complete which is
+    best for reading rows, `column` keeps the leading axes complete. A `tuple`
+    is used as explicit chunk shape and must match the rank of the datasets,
+    set it per key in `config.key_compression`.
+chunk_bytes: `int`
+    Target size of a chunk for the chunk policies, defaults to
+    `config.chunk_bytes`.
+workers: `int`
+    Number of threads compressing chunks of large gzip arrays, see `parallel`.
+    Defaults to `config.write_workers`.
+
+Specs for single keys can be set in `config.key_compression`.
+"""
+from collections.abc import Mapping
+from logging import getLogger
+import numpy as np
+
+from . import config
+
+logger = getLogger(__package__)
+
+BUILTIN_FILTERS = ('gzip', 'lzf')
+CHUNK_POLICIES = ('auto', 'row', 'column')
+SPEC_KEYS = ('filter', 'opts', 'shuffle', 'fletcher32', 'chunks', 'chunk_bytes',
+             'workers')
+
+
+def normalize(compress):
+    """Converts any supported compression spec to its `dict` form.
+
+    Parameters
+    ------------
+    compress: `tuple`, `str`, `int`, `dict` or None
+        Compression spec, None uses `config.default_compression`.
+
+    Returns
+    -------
+    spec: `dict`
+        Normalized spec holding all keys.
+    """
+    if compress is None:
+        compress = config.default_compression
+
+    spec = {'filter': None, 'opts': None, 'shuffle': False,
+            'fletcher32': False, 'chunks': None, 'chunk_bytes': None,
+            'workers': None}
+
+    if isinstance(compress, tuple):
+        if compress[0]:
+            spec['filter'] = 'gzip'
+            spec['opts'] = compress[1]
+
+    elif isinstance(compress, str):
+        if compress != 'none':
+            spec['filter'] = compress
+
+    elif isinstance(compress, Mapping):
+        compress = dict(compress)
+        if 'compression' in compress:
+            compress['filter'] = compress.pop('compression')
+        if 'compression_opts' in compress:
+            compress['opts'] = compress.pop('compression_opts')
+
+        invalid = set(compress) - set(SPEC_KEYS)
+        if invalid:
+            raise ValueError(f'Invalid keys in compression spec: {invalid}')
+        spec.update(compress)
+        if spec['filter'] == 'none':
+            spec['filter'] = None
+
+    elif isinstance(compress, bool):
+        if compress:
+            spec['filter'] = 'gzip'
+
+    elif isinstance(compress, int):
+        spec['filter'] = compress
+
+    else:
+        raise TypeError(f'Invalid compression spec {compress}')
+
+    if isinstance(spec['filter'], str) and spec['filter'] not in BUILTIN_FILTERS:
+        raise ValueError(f'Unknown compression filter {spec["filter"]}, use '
+                         f'one of {BUILTIN_FILTERS} or a filter id')
+
+    chunks = spec['chunks']
+    if chunks is not None and not isinstance(chunks, tuple) \
+            and chunks not in CHUNK_POLICIES:
+        raise ValueError(f'Invalid chunk policy {chunks}')
+
+    if spec['chunk_bytes'] is None:
+        spec['chunk_bytes'] = config.chunk_bytes
+    if spec['workers'] is None:
+        spec['workers'] = config.write_workers
+
+    return spec
+
+
+def for_key(hdfobject, key, compress):
+    """Returns the normalized spec for `key` in `hdfobject`. A spec in
+    `config.key_compression` for the full path of the key or for the plain
+    key name takes precedence over `compress`."""
+    overrides = config.key_compression
+    if overrides:
+        path = f'{hdfobject.name.rstrip("/")}/{key}'
+        if path in overrides:
+            logger.debug(f'Using compression override for {path}')
+            return normalize(overrides[path])
+        if key in overrides:
+            logger.debug(f'Using compression override for {key}')
+            return normalize(overrides[key])
+
+    return normalize(compress)
+
+
+def chunk_shape(shape, itemsize, policy, chunk_bytes):
+    """Computes a chunk shape for a dataset following a chunk policy. An
+    explicit chunk shape of another rank than the dataset raises ValueError.
+
+    Parameters
+    ------------
+    shape: `tuple`
+        Shape of the dataset.
+    itemsize: `int`
+        Size of a single element in bytes.
+    policy: `str`, `tuple` or None
+        Chunk policy, see module documentation.
+    chunk_bytes: `int`
+        Target size of a chunk in bytes.
+
+    Returns
+    -------
+    chunks: `tuple` or None
+        Chunk shape or None if chunking is left to `h5py`.
+    """
+    if policy is None or not shape or 0 in shape:
+        return None
+
+    if isinstance(policy, tuple):
+        if len(policy) != len(shape):
+            raise ValueError(f'Chunk shape {policy} does not match the rank '
+                             f'of shape {shape}')
+        return tuple(max(1, min(c, s)) for c, s in zip(policy, shape))
+
+    target = max(1, chunk_bytes // max(1, itemsize))
+    chunks = list(shape)
+
+    if policy == 'auto':
+        while int(np.prod(chunks)) > target:
+            axis = int(np.argmax(chunks))
+            if chunks[axis] == 1:
+                break
+            chunks[axis] = (chunks[axis] + 1) // 2
+
+    else:
+        axes = range(len(shape))
+        if policy == 'column':
+            axes = reversed(axes)
+
+        # Fill the chunk along the axes in order while the others stay
+        # complete, reducing the next axis only if a single slab is too large
+        for axis in axes:
+            if policy == 'row':
+                rest = int(np.prod(chunks[axis + 1:]))
+            else:
+                rest = int(np.prod(chunks[:axis]))
+            chunks[axis] = max(1, min(shape[axis], target // rest))
+            if rest <= target:
+                break
+
+    return tuple(chunks)
+
+
+def dataset_kwargs(spec, shape, dtype):
+    """Converts a normalized spec to keyword arguments for
+    `h5py.Group.create_dataset` for a dataset of the given shape and dtype.
+    The checksum is left out for variable length data, hdf5 refuses it."""
+    if not shape:  # scalars can not be chunked or filtered
+        return {}
+
+    kwargs = {}
+    if spec['filter'] is not None:
+        kwargs['compression'] = spec['filter']
+        if spec['opts'] is not None:
+            kwargs['compression_opts'] = spec['opts']
+    if spec['shuffle']:
+        kwargs['shuffle'] = True
+    if spec['fletcher32']:
+        if np.dtype(dtype).kind == 'O':
+            logger.debug('Skipping fletcher32 for variable length data')
+        else:
+            kwargs['fletcher32'] = True
+
+    chunks = chunk_shape(shape, np.dtype(dtype).itemsize, spec['chunks'],
+                         spec['chunk_bytes'])
+    if chunks is not None:
+        kwargs['chunks'] = chunks
+
+    return kwargs
+
+
+def pandas_kwargs(spec):
+    """Converts a normalized spec to the compression arguments of `pandas`
+    hdf storage, which only supports zlib for files readable without
+    additional filters."""
+    if spec['filter'] is None:
+        return {'complevel': None, 'complib': None}
+
+    if spec['filter'] != 'gzip':
+        logger.debug(f'Filter {spec["filter"]} not supported for pandas, using zlib')
+        return {'complevel': 4, 'complib': 'zlib'}
+
+    level = 4 if spec['opts'] is None else spec['opts']
+    return {'complevel': level, 'complib': 'zlib'}
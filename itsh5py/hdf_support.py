@@ -5,105 +5,434 @@ however it will be deprecated in future releases
 """
 import os
 import platform
+import json
+import threading
+from copy import deepcopy
+from functools import lru_cache, partial
+from time import perf_counter
 from pathlib import Path, PureWindowsPath
 from collections import UserDict
+from collections.abc import Iterator, Sequence
 from datetime import datetime
 import h5py
 import numpy as np
+from numpy.lib.mixins import NDArrayOperatorsMixin
 import pandas as pd
 import yaml
 from logging import getLogger
 
 from .queue_handler import add_open_file, is_open, remove_from_queue
-from . import config
+from .cache import shared_cache
+from .structure import DEAD_BYTES, TYPEID, scan
+from . import config, filters, parallel, profiling, registry, structure
 
 logger = getLogger(__package__)
 
-TYPEID = '_TYPE_'
+# Attributes of datetime64 datasets
+DT_UNIT = '_DT_UNIT_'
+DT_KIND = '_DT_KIND_'
+DT_TZ = '_DT_TZ_'
 
+# Strings are stored variable length if the longest is more than this factor
+# longer than the mean, see config.vlen_strings
+MAX_STRING_PADDING = 4
 
-def _tree(hdf, levels=[], max_depth=None, buffer=None, large_mode=False,
-          printout=True):
+# Attributes of native DataFrame groups
+FRAME_ROWS = '_FRAME_ROWS_'
+FRAME_DTYPES = '_FRAME_DTYPES_'
+FRAME_RANGE = '_FRAME_RANGE_'
+# Marks series without name, stored with the column label 0 by pandas
+FRAME_UNNAMED = '_FRAME_UNNAMED_'
+FRAME_TYPES = ('frame', 'series')
+
+# Maximum number of lines of the tree view of lazy dicts
+MAX_TREE_LINES = 500
+
+# Maximum number of rows in a chunk of appendable datasets
+STREAM_CHUNK_ROWS = 2**20
+
+# C accelerated yaml if libyaml is available
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+# Number of decoded yaml fallback values to memoize
+SERIALIZED_CACHE_SIZE = 1024
+
+# Types never storable by h5py, these and lists of these are serialized
+# right away
+SERIALIZED_TYPES = (dict, set, frozenset, type(None))
+
+# Elements of sequences stored as plain dataset
+SCALAR_TYPES = (str, bytes, int, float, complex, np.generic)
+
+
+def _tree(hdf, max_depth=None, printout=True, max_lines=MAX_TREE_LINES):
     """
     Displays the hdf tree for lazy dicts.
 
     This function displays a representation of the hdf file tree without
-    loading the actual datasets. Basic information is printed.
+    loading the actual datasets. Basic information is printed. Groups are
+    listed by the native scan, at most `config.max_tree_children` children per
+    group and `max_lines` lines in total, thus rendering takes bounded time for
+    any file size. Size and compression statistics are given by `inspection`.
     """
-    large_tree = False
-    if max_depth and len(levels) > max_depth:
-        return
-    markers = ''.join('   ' if last else '│  ' for last in levels[:-1])
-    if large_mode:
-        markers += '' if not levels else '├─ '
+    if hdf is None:  # dicts without a file
+        return ''
+
+    if isinstance(hdf, h5py.File):
+        lines = [os.path.basename(hdf.filename)]
     else:
-        markers += '' if not levels else '└─ ' if levels[-1] else '├─ '
+        lines = [f'Group {hdf.name}']
 
-    if buffer is None:
-        buffer = ''
+    def _walk(group, markers, depth):
+        if max_depth is not None and depth > max_depth:
+            return
+        children = scan(group, limit=config.max_tree_children)
+        omitted = structure.count(group) - len(children)
+        path = group.name.rstrip('/')
+
+        for index, (name, is_group, type_id, is_pandas) in enumerate(children):
+            if len(lines) >= max_lines:
+                if len(lines) == max_lines:
+                    lines.append(f'{markers}└─> ...output truncated')
+                return
 
-    if isinstance(hdf, h5py.File):
-        msg = f'{markers}{os.path.basename(hdf.filename)}'
-        if printout:
-            print(msg)
-        buffer += msg + '\n'
-
-        children = hdf.keys()
-        last = len(children) - 1
-        for (index, child) in enumerate(children):
-            buffer = _tree(
-                hdf[child], levels + [index == last], max_depth, buffer=buffer,
-                printout=printout)
-
-    elif isinstance(hdf, h5py.Group):
-        msg = f'{markers}Group {hdf.name}'
-        if printout:
-            print(msg)
-        buffer += msg + '\n'
-
-        children = hdf.keys()
-        if len(children) > config.max_tree_children:  # catching very large files
-            omitted = len(children) - config.max_tree_children
-            children = list(children)[:config.max_tree_children]
-            large_tree = True
-
-        last = len(children) - 1
-        for (index, child) in enumerate(children):
-            buffer = _tree(
-                hdf[child], levels + [index == last], max_depth, buffer=buffer,
-                large_mode=large_tree, printout=printout)
-
-        if large_tree:
-            markers = ''.join('   ' if last else '│  '
-                              for last in (levels + [index == last])[:-1])
-            markers += '└─>'
-            buffer += f'{markers} ...and {omitted} more omitted\n'
-
-    elif isinstance(hdf, h5py.Dataset):
-        if hdf.ndim == 0 and TYPEID not in hdf.attrs:
-            msg = f'{markers}{hdf.name}::{hdf[()]}'
-        else:
-            msg = f'{markers}{hdf.name}::{hdf.shape}'
+            last = not omitted and index == len(children) - 1
+            marker = markers + ('└─ ' if last else '├─ ')
+            if is_group:
+                msg = f'{marker}Group {path}/{name}'
+            else:
+                dataset = group[name]
+                if dataset.ndim == 0 and type_id is None:
+                    msg = f'{marker}{path}/{name}::{dataset[()]}'
+                else:
+                    msg = f'{marker}{path}/{name}::{dataset.shape}'
 
-        if TYPEID in hdf.attrs:
-            msg += f' (py-type: {hdf.attrs[TYPEID]})'
+            if type_id is not None:
+                msg += f' (py-type: {type_id})'
+            lines.append(msg)
 
-        if printout:
-            print(msg)
-        buffer += msg + '\n'
+            if is_group and type_id is None and not is_pandas:
+                _walk(group[name], markers + ('   ' if last else '│  '),
+                      depth + 1)
 
-    else:
-        ...
+        if omitted > 0 and len(lines) < max_lines:
+            lines.append(f'{markers}└─> ...and {omitted} more omitted')
 
+    _walk(hdf, '', 1)
+    buffer = '\n'.join(lines) + '\n'
+    if printout:
+        print(buffer, end='')
     return buffer
 
 
+# Type tags which can be decoded from a partial read of their dataset
+SLICEABLE_TYPES = ('datetime', 'datetime64', 'list_str', 'str_array', 'list_arr')
+
+# Kinds of dtypes stored contiguous and memory mapped, see config.use_memmap
+MEMMAP_KINDS = 'biufc'
+
+
+def _read_open(h5object, filename, name, read):
+    """Returns `read(h5object)` while the file is open. Emergency fallback
+    for closed files, e.g. when using long file lists preloaded: the file is
+    reopened for `read(h5file[name])` if `config.allow_fallback_open` is set,
+    else None is returned."""
+    if h5object:
+        return read(h5object)
+
+    if config.allow_fallback_open:
+        logger.debug(f'File {filename} was already closed, reopening...')
+        with _open(filename) as h5file:
+            return read(h5file[name])
+
+    logger.error('Cant access data in closed file which is not '
+                 'unwrapped.')
+    return None
+
+
+class LazyArray(NDArrayOperatorsMixin):
+    """
+    Sliceable proxy for an array dataset in a lazily loaded file. Indexing
+    the proxy reads only the selected hyperslab from the file and decodes it
+    the same way `unpack_dataset` would, so type-tagged datasets return the
+    same types as on a full read. The proxy supports the `__array__`
+    protocol and numpy operators which read the full dataset.
+
+    Parameters
+    ------------
+    dataset: `h5py.Dataset`
+        Dataset to wrap. Must be open on creation.
+    """
+
+    def __init__(self, dataset):
+        self._dataset = dataset
+        self._filename = dataset.file.filename
+        self._name = dataset.name
+        self._type_id = dataset.attrs.get(TYPEID, None)
+        self._shape = dataset.shape
+        self._dtype = dataset.dtype
+
+    @staticmethod
+    def supports(dataset):
+        """Checks if a dataset can be wrapped and sliced by the proxy."""
+        if dataset.ndim == 0:
+            return False
+        type_id = dataset.attrs.get(TYPEID, None)
+        return type_id is None or type_id in SLICEABLE_TYPES
+
+    @property
+    def shape(self):
+        """Shape of the dataset."""
+        return self._shape
+
+    @property
+    def dtype(self):
+        """Data type of the dataset as stored in the file."""
+        return self._dtype
+
+    @property
+    def ndim(self):
+        """Number of dimensions of the dataset."""
+        return len(self._shape)
+
+    @property
+    def size(self):
+        """Number of elements of the dataset."""
+        return int(np.prod(self._shape))
+
+    @property
+    def name(self):
+        """Full name of the dataset in the file."""
+        return self._name
+
+    def __len__(self):
+        return self._shape[0]
+
+    def __repr__(self):
+        return (f'<LazyArray {self._name} shape={self._shape} '
+                f'dtype={self._dtype}>')
+
+    def _read(self, dataset, selection):
+        value = _read_selection(dataset, selection)
+        if self._type_id is not None:
+            return _decode_typed(dataset, value, self._type_id)
+        return value
+
+    def __getitem__(self, selection):
+        """
+        Reads and decodes a selection. Emergency fallback when accessing a
+        closed file is included, see `LazyHdfDict.__getitem__`."""
+        return _read_open(self._dataset, self._filename, self._name,
+                          lambda dataset: self._read(dataset, selection))
+
+    def read_into(self, out, selection=None, dest_sel=None):
+        """Reads a selection of an untagged array of numbers into `out`, see
+        `LazyHdfDict.read_into`. Emergency fallback when accessing a closed
+        file is included."""
+        return _read_open(
+            self._dataset, self._filename, self._name,
+            lambda dataset: _read_direct(dataset, out, selection, dest_sel))
+
+    def __array__(self, dtype=None, copy=None):
+        value = np.asarray(self[()])
+        if dtype is not None:
+            value = value.astype(dtype, copy=False)
+        return value
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        inputs = tuple(np.asarray(i) if isinstance(i, LazyArray) else i
+                       for i in inputs)
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+
+class RaggedList(Sequence):
+    """
+    Lazy list of arrays stored in the ragged layout of a group. Offsets and
+    shapes of the elements are read on creation, indexing reads only the data
+    of the requested elements.
+
+    Parameters
+    ------------
+    group: `h5py.Group`
+        Group with TYPEID `ragged`. Must be open on creation.
+    """
+
+    def __init__(self, group):
+        self._group = group
+        self._filename = group.file.filename
+        self._name = group.name
+        self._offsets = group['offsets'][()]
+        self._shapes = group['shapes'][()]
+
+    @property
+    def name(self):
+        """Full name of the group in the file."""
+        return self._name
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __repr__(self):
+        return f'<RaggedList {self._name} with {len(self)} arrays>'
+
+    def _read(self, start, stop):
+        """Reads the data of the elements from `start` to `stop`."""
+        selection = slice(self._offsets[start], self._offsets[stop])
+        return _read_open(
+            self._group, self._filename, self._name,
+            lambda group: _read_selection(group['data'], selection))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1 or start >= stop:
+                return [self[i] for i in range(start, stop, step)]
+            data = self._read(start, stop)
+            if data is None:
+                return None
+            return _split_ragged(data, self._offsets[start:stop + 1],
+                                 self._shapes[start:stop])
+
+        index = range(len(self))[index]
+        data = self._read(index, index + 1)
+        if data is None:
+            return None
+        return _split_ragged(data, self._offsets[index:index + 2],
+                             self._shapes[index:index + 1])[0]
+
+
+class _Ref:
+    """
+    Handle-free reference to a child of a group in a lazy file, holding only
+    whether it is a group and its type id. The path is given by the group of
+    the dict and the key. References are shared, see `get`, so a key costs no
+    more than its dict entry.
+    """
+    __slots__ = ('is_group', 'type_id')
+    _shared = {}
+
+    def __init__(self, is_group, type_id):
+        self.is_group = is_group
+        self.type_id = type_id
+
+    @classmethod
+    def get(cls, is_group, type_id):
+        """Returns the shared reference of a kind of child."""
+        try:
+            return cls._shared[is_group, type_id]
+        except KeyError:
+            return cls._shared.setdefault((is_group, type_id),
+                                          cls(is_group, type_id))
+
+    def __repr__(self):
+        kind = 'Group' if self.is_group else 'Dataset'
+        return f'<Ref to {kind} (py-type: {self.type_id})>'
+
+
+class LazyFrame:
+    """
+    Lazy DataFrame stored in the native columnar layout of a group, see
+    `config.native_frames`. Labels and dtypes are read on creation, reading
+    selects only the requested columns and rows from the file.
+
+    Indexing with a label returns the column as `pandas.Series`, with a list
+    of labels a `pandas.DataFrame` of these columns and with a slice a
+    `pandas.DataFrame` of these rows.
+
+    Parameters
+    ------------
+    group: `h5py.Group`
+        Group with TYPEID `frame`. Must be open on creation.
+    """
+
+    def __init__(self, group):
+        self._group = group
+        self._filename = group.file.filename
+        self._name = group.name
+        self._labels = unpack_dataset(group['columns'])
+        self._dtypes = json.loads(group.attrs[FRAME_DTYPES])
+        self._rows = int(group.attrs[FRAME_ROWS])
+
+    @property
+    def name(self):
+        """Full name of the group in the file."""
+        return self._name
+
+    @property
+    def columns(self):
+        """Column labels of the frame."""
+        return pd.Index(self._labels)
+
+    @property
+    def dtypes(self):
+        """Names of the column dtypes by label."""
+        return pd.Series(self._dtypes, index=self.columns, dtype=object)
+
+    @property
+    def shape(self):
+        return (self._rows, len(self._labels))
+
+    def __len__(self):
+        return self._rows
+
+    def __repr__(self):
+        return f'<LazyFrame {self._name} with shape {self.shape}>'
+
+    def _positions(self, columns):
+        positions = []
+        for label in columns:
+            try:
+                positions.append(self._labels.index(label))
+            except ValueError:
+                raise KeyError(label) from None
+        return positions
+
+    def read(self, columns=None, rows=None):
+        """Reads a `pandas.DataFrame` of the given column labels (defaults to
+        all) and the rows of a `slice` (defaults to all)."""
+        positions = None if columns is None else self._positions(columns)
+        return _read_open(self._group, self._filename, self._name,
+                          lambda group: _unpack_frame(group, positions, rows))
+
+    def head(self, n=5):
+        """Reads the first `n` rows."""
+        return self.read(rows=slice(0, n))
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.read(rows=key)
+        if isinstance(key, list):
+            return self.read(columns=key)
+
+        frame = self.read(columns=[key])
+        return None if frame is None else frame.iloc[:, 0]
+
+
+# Guards the listing of groups of lazy dicts shared between threads
+_expand_lock = threading.RLock()
+
+
+def _may_proxy(ref):
+    """Checks from a reference if its value may be returned as proxy or memory
+    map, following `config.use_lazy_arrays` and `config.use_memmap`."""
+    if ref.is_group:
+        return config.use_lazy_arrays and ref.type_id in ('ragged', 'frame')
+    return bool((config.use_memmap and ref.type_id is None)
+                or (config.use_lazy_arrays and (ref.type_id is None
+                                                or ref.type_id in SLICEABLE_TYPES)))
+
+
 class LazyHdfDict(UserDict):
     """
     Helps loading data only if values from the dict are requested. This is
     done by reimplementing the __getitem__ method from dict. Other convenience
     functions are added to work with the hdf files as backend.
 
+    The children of the group are enumerated on the first access to the dict,
+    so opening a file does not depend on its size. Groups become child dicts
+    which are expanded on their first access as well.
+
     Parameters
     ------------
     _h5file: 'h5py.File', optional
@@ -115,6 +444,11 @@ class LazyHdfDict(UserDict):
     """
 
     def __init__(self, _h5file=None, group='/', *args, **kwargs):
+        self._cache = None
+        self._buffers = None
+        self._buffered = {}  # key -> _Ref of values read into buffers
+        self._index = None
+        self._expanded = True
         super().__init__(*args, **kwargs)
         self._h5file = None
         self._h5filename = None
@@ -124,6 +458,14 @@ class LazyHdfDict(UserDict):
     def __str__(self):
         return self.__repr__()
 
+    def __copy__(self):
+        # UserDict copies the `data` attribute, which is a property here
+        inst = self.__class__.__new__(self.__class__)
+        inst.__dict__.update(self.__dict__)
+        inst._data = self.data.copy()
+        inst._buffered = dict(self._buffered)
+        return inst
+
     def __repr__(self):
         buffer = _tree(self.h5file, printout=False)
         return buffer
@@ -142,6 +484,127 @@ class LazyHdfDict(UserDict):
             self._h5filename = handle.filename
             logger.debug(f'Added handle and file to LazyDict: {handle}::{handle.filename}')
 
+    @property
+    def data(self):
+        """Children of the dict, enumerated from the group on first access."""
+        if not self._expanded:
+            self._expand()
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._data = data
+
+    def defer(self):
+        """Marks the dict to enumerate the children of its group on the next
+        access instead of now."""
+        self._expanded = False
+
+    def _children(self):
+        """Lists the children of the group. They are taken from the structure
+        index if there is one and their number matches the group, see
+        `structure`. Else a closed file is reopened if
+        `config.allow_fallback_open` is set, or None returned."""
+        if self._index is not None:
+            children = self._index.get(self._group, None)
+            # Keys deleted by other tools may keep the size of the file
+            if children is not None and not (
+                    self.h5file and len(children)
+                    != structure.count(self.h5file[self._group])):
+                return children
+            logger.debug(f'Structure index of {self._group} is outdated')
+
+        h5file = self.h5file
+        if not h5file:
+            if not config.allow_fallback_open:
+                logger.error('Cant list group of closed file which is not '
+                             'unwrapped.')
+                return None
+            h5file = _open(self._h5filename)
+
+        logger.debug(f'Expanding group {self._group} of {self._h5filename}')
+        children = scan(h5file[self._group])
+        if h5file is not self.h5file:
+            h5file.close()
+        return children
+
+    def _expand(self):
+        """Adds the children of the group to the dict. Groups become child
+        dicts, anything else is stored as handle-free reference which is
+        resolved from the file and unpacked on access. The dict is marked
+        expanded once all children are added, other threads wait for it."""
+        with _expand_lock:
+            if self._expanded:
+                return
+            children = self._children()
+            if children is None:
+                return
+
+            prefix = self._group.rstrip('/') + '/'
+            for key, is_group, type_id, is_pandas, *_ in children:
+                if is_pandas:
+                    # This is a dataframe or a series...might be in subgroup
+                    self._data[key] = pd.read_hdf(self._h5filename, prefix + key)
+                elif is_group and type_id is None:
+                    child = LazyHdfDict(group=prefix + key)
+                    child._h5file = self._h5file
+                    child._h5filename = self._h5filename
+                    child._cache = self._cache
+                    child._buffers = self._buffers
+                    child._index = self._index
+                    child.defer()
+                    self._data[key] = child
+                else:
+                    self._data[key] = _Ref.get(is_group, type_id)
+            self._expanded = True
+
+    @property
+    def cache(self):
+        """`ValueCache` holding decoded values of this dict and of all child
+        dicts set at the same time. If None, the shared cache is used when
+        `config.cache_budget` is set, else decoded values are stored in the
+        dict itself."""
+        return self._cache
+
+    @cache.setter
+    def cache(self, value_cache):
+        self._cache = value_cache
+        for item in self._data.values():  # unexpanded children inherit it
+            if isinstance(item, LazyHdfDict):
+                item.cache = value_cache
+
+    @property
+    def buffers(self):
+        """`BufferPool` to read untagged arrays of numbers of this dict and of
+        all child dicts set at the same time into, see `buffers`. If None,
+        arrays are allocated on reading."""
+        return self._buffers
+
+    @buffers.setter
+    def buffers(self, pool):
+        self._buffers = pool
+        for item in self._data.values():  # unexpanded children inherit it
+            if isinstance(item, LazyHdfDict):
+                item.buffers = pool
+
+    def _take_buffered(self):
+        """Removes the values read into buffers from the dict and returns
+        them. They are read from the file again on their next access."""
+        values = []
+        for key, ref in self._buffered.items():
+            if key in self._data:
+                values.append(self._data[key])
+                self._data[key] = ref
+        self._buffered = {}
+        return values
+
+    def _value_cache(self):
+        if self._cache is not None:
+            return self._cache
+        if config.cache_budget is not None:
+            return shared_cache
+        return None
+
     @property
     def group(self):
         """Root group of the `LazyHdfDict`."""
@@ -159,27 +622,39 @@ class LazyHdfDict(UserDict):
         """
         Returns item and loads dataset if needed. Emergency fallback when
         accessing a closed file (e.g. when using long file lists preloaded)
-        is included."""
+        is included. If a memory budget is set, decoded values are kept in
+        the cache instead of the dict, see `cache`. The cache is only
+        consulted for references which are decoded."""
+        cache = self._value_cache()
+        start = perf_counter() if profiling.active else None
         if not self.h5file:
+            if not (self._expanded or config.allow_fallback_open):
+                logger.error('Cant access data in closed file which is not '
+                             'unwrapped.')
+                return None
+
             # Check if this was unwrapped anyway...catching tuples etc.
             item = super().__getitem__(key)
-            if not isinstance(item, h5py.Dataset):
+            if not isinstance(item, _Ref):
                 return item
+            if cache is not None:
+                hit, value = cache.get(self, key)
+                if hit:
+                    return value
 
             if config.allow_fallback_open:
                 logger.debug(f'File {self._h5filename} was already closed, reopening...')
-                self.h5file = h5py.File(self._h5filename, 'r')
-
-                sub = self.h5file
-                if self._group != '/':
-                    for level in [g for g in self._group.split('/') if g != '']:
-                        logger.debug(f'Access to subgroup iter.: {level}')
-                        sub = sub[level]
-                    item = unpack_dataset(sub[key])
-                else:
-                    item = unpack_dataset(self.h5file[key])
-
+                type_id = item.type_id
+                self.h5file = _open(self._h5filename)
+                item = unpack_dataset(self.h5file[self._group][key],
+                                      self._buffers)
                 self.h5file.close()
+                if cache is not None:
+                    cache.put(self, key, item)
+                if start is not None:
+                    profiling.emit('lazy', self._h5filename,
+                                   f'{self._group.rstrip("/")}/{key}', start,
+                                   codec=type_id)
 
             else:
                 logger.error('Cant access data in closed file which is not '
@@ -188,19 +663,87 @@ class LazyHdfDict(UserDict):
 
         else:
             item = super().__getitem__(key)
-            if isinstance(item, h5py.Dataset):
+            if isinstance(item, _Ref):
+                # Proxies are kept in the dict, thus the cache is consulted
+                # for them only once the value turns out to be decoded
+                checked = cache is not None and not _may_proxy(item)
+                if checked:
+                    hit, value = cache.get(self, key)
+                    if hit:
+                        return value
+
+                ref, item = item, self.h5file[self._group][key]
                 try:
-                    item = unpack_dataset(item)
-                    self.__setitem__(key, item)
+                    if (config.use_lazy_arrays and ref.is_group
+                            and ref.type_id == 'ragged'):
+                        item = RaggedList(item)
+                        self.__setitem__(key, item)
+                    elif (config.use_lazy_arrays and ref.is_group
+                            and ref.type_id == 'frame'):
+                        item = LazyFrame(item)
+                        self.__setitem__(key, item)
+                    elif (config.use_memmap and not ref.is_group
+                            and ref.type_id is None and _mappable(item)):
+                        item = _memmap(item)
+                        self.__setitem__(key, item)
+                    elif (config.use_lazy_arrays and not ref.is_group
+                            and LazyArray.supports(item)):
+                        item = LazyArray(item)
+                        self.__setitem__(key, item)
+                    else:
+                        if cache is not None and not checked:
+                            hit, value = cache.get(self, key)
+                            if hit:
+                                return value
+                        item = unpack_dataset(item, self._buffers)
+                        if cache is None:
+                            self.__setitem__(key, item)
+                            if self._buffers is not None:
+                                self._buffered[key] = ref
+                        else:
+                            cache.put(self, key, item)
                 except ValueError:
                     logger.exception(f'Error reading {key} from {self.group} in {self.h5file}')
 
+                if start is not None:
+                    profiling.emit('lazy', self._h5filename,
+                                   f'{self._group.rstrip("/")}/{key}', start,
+                                   codec=ref.type_id)
+
         return item
 
+    def read_into(self, key, out, source_sel=None, dest_sel=None):
+        """
+        Reads the array stored at `key` into an existing array without
+        unpacking it into the dict, e.g. into one row of a stack of arrays.
+        Closed files are reopened if `config.allow_fallback_open` is set.
+
+        Parameters
+        ------------
+        key: `str`
+            Key of an untagged array of numbers in the group of the dict.
+        out: `np.ndarray`
+            Array to read into. Read directly if C-contiguous and of the
+            dtype of the dataset, else through a temporary array.
+        source_sel, dest_sel: optional
+            Selections of the dataset and of `out`, e.g. `np.s_[0:10]`.
+            Default to all.
+
+        Returns
+        -------
+        out: `np.ndarray`
+            The array read into, None if the file is closed and not reopened.
+        """
+        return _read_open(
+            self.h5file, self._h5filename, '/',
+            lambda h5file: _read_direct(h5file[self._group][key], out,
+                                        source_sel, dest_sel))
+
     def unlazy(self):
         """Unpacks all datasets and closes the Lazy reference
         """
-        unlazied = dict(self)
+        unlazied = {k: v[()] if isinstance(v, LazyArray) else v
+                    for k, v in self.items()}
         self.close()
         return unlazied
 
@@ -208,7 +751,12 @@ class LazyHdfDict(UserDict):
         """Closes the h5file if provided at initialization.
 
         Unpackig will keep on working using the fallback routine if enabled.
+        Cached values of the dict are dropped.
         """
+        cache = self._value_cache()
+        if cache is not None:
+            cache.discard(self)
+
         if self._h5file is not None:  # set
             if self._h5file:  # ...and open
                 if self._group == '/':  # Only if this is a root file...
@@ -217,7 +765,7 @@ class LazyHdfDict(UserDict):
     def __del__(self):
         try:
             self.close()
-        except ImportError:  # this can happen on ipython crtl+D
+        except (ImportError, AttributeError):  # this can happen on ipython crtl+D
             ...
 
     def _ipython_key_completions_(self):
@@ -228,85 +776,358 @@ class LazyHdfDict(UserDict):
         return tuple(self.keys())
 
 
-def unpack_dataset(item):
-    """Reconstruct a hdfdict dataset.
+def _encode_strings(array):
+    """Encodes a str array for storage. Following `config.vlen_strings`,
+    ascii strings of similar length are stored fixed width, cast in bulk by
+    numpy. Anything else is returned as object array to be stored as variable
+    length utf-8, encoded in bulk by `h5py`."""
+    if config.vlen_strings is True:
+        return array.astype(object)
 
-    This holds all special **unpacking** procedures for types not natively
-    supported by `h5py`.
+    try:
+        encoded = array.astype('S')
+    except UnicodeEncodeError:
+        if config.vlen_strings is False:
+            return np.char.encode(array.astype(str), 'utf-8')
+        return array.astype(object)
+
+    if config.vlen_strings is False or encoded.size == 0:
+        return encoded
+
+    mean_length = max(1., float(np.mean(np.char.str_len(encoded))))
+    if encoded.itemsize > MAX_STRING_PADDING * mean_length:
+        logger.debug('Strings differ in length, storing variable length')
+        return array.astype(object)
+    return encoded
+
+
+def _read(item, selection=()):
+    """Reads a selection of a dataset. Variable length strings are decoded in
+    bulk by `h5py`, if they are no valid utf-8 the bytes are returned."""
+    if item.dtype.kind == 'O' and h5py.check_string_dtype(item.dtype) is not None:
+        try:
+            return item.asstr()[selection]
+        except UnicodeDecodeError:
+            logger.debug(f'Cant decode strings in {item.name}, reading bytes')
+    return item[selection]
 
-    Parameters
-    ----------
-    item: `h5py.Dataset`
-        The dataset to unpack
 
-    Returns
-    -------
-    value:
-        Unpacked Data
+def _read_selection(item, selection):
+    """Reads a selection of a dataset as `_read`, reported as `slice` event
+    when profiling."""
+    if not profiling.active:
+        return _read(item, selection)
+
+    start = profiling.enter()
+    try:
+        value = _read(item, selection)
+    finally:
+        profiling.leave()
+    if start is not None:
+        profiling.record('slice', item, start,
+                         nbytes=getattr(value, 'nbytes', item.dtype.itemsize))
+    return value
+
+
+def _mappable(item):
+    """Checks if a dataset is an untagged array of numbers stored contiguous
+    and unfiltered in the file itself, which can be memory mapped."""
+    if item.ndim == 0 or item.dtype.kind not in MEMMAP_KINDS:
+        return False
+    if TYPEID in item.attrs or item.file.driver != 'sec2':
+        return False
+    dcpl = item.id.get_create_plist()
+    return (dcpl.get_layout() == h5py.h5d.CONTIGUOUS and not dcpl.get_nfilters()
+            and not dcpl.get_external_count() and item.id.get_offset() is not None)
+
+
+def _memmap(item):
+    """Maps the bytes of a dataset in the file read only, see `_mappable`."""
+    return np.memmap(item.file.filename, dtype=item.dtype, mode='r',
+                     offset=item.id.get_offset(), shape=item.shape)
+
+
+def _direct_readable(item):
+    """Checks if a dataset is an untagged array of numbers, which can be read
+    into an existing array."""
+    return (item.ndim > 0 and item.dtype.kind in MEMMAP_KINDS
+            and TYPEID not in item.attrs)
+
+
+def _read_direct(item, out, source_sel=None, dest_sel=None):
+    """Reads a selection of a dataset into a selection of `out`, directly if
+    `out` is C-contiguous, else through a temporary array."""
+    if not _direct_readable(item):
+        raise TypeError(f'Cant read {item.name} into an array, only untagged '
+                        'arrays of numbers are supported')
+    if out.flags.c_contiguous and out.dtype == item.dtype:
+        item.read_direct(out, source_sel, dest_sel)
+    else:
+        out[() if dest_sel is None else dest_sel] = item[
+            () if source_sel is None else source_sel]
+    return out
+
+
+def _open(filename, kind='reopen'):
+    """Opens a file read only, reported as `kind` event when profiling."""
+    if not profiling.active:
+        return h5py.File(filename, 'r')
+
+    start = perf_counter()
+    h5file = h5py.File(filename, 'r')
+    profiling.emit(kind, str(filename), '/', start)
+    return h5file
+
+
+def _decode_str(item, value):
+    """Decodes bytes or arrays of bytes to str, trying utf-8 first and
+    latin-1 second. Arrays of fixed width bytes, as stored by older versions,
+    and ascii arrays are decoded in bulk. Values which are str already are
+    returned as is."""
+    if isinstance(value, np.ndarray) and value.dtype.kind == 'S':
+        try:  # numpy casts ascii in bulk
+            return value.astype(str)
+        except UnicodeDecodeError:
+            ...
+
+    # Elements of variable length reads share their type, str ones are done
+    if (isinstance(value, np.ndarray) and value.dtype.kind == 'O'
+            and (not value.size or not isinstance(value.flat[0], bytes))):
+        return value
+
+    for encoding in ('utf-8', 'latin-1'):
+        try:
+            if isinstance(value, bytes):
+                return value.decode(encoding)
+            if isinstance(value, np.ndarray) and value.dtype.kind == 'S':
+                return np.char.decode(value, encoding)
+            if isinstance(value, np.ndarray) and value.dtype.kind == 'O':
+                return np.array(
+                    [v.decode(encoding) if isinstance(v, bytes) else v
+                     for v in value.ravel()], dtype=object).reshape(value.shape)
+            return value
+        except UnicodeDecodeError:
+            continue
+
+    logger.exception(f'Cant decode bytes in {item.name}')
+    return None
+
+
+def _decode_timestamps(item, value):
+    """Decodes float timestamps as stored by older versions for datetimes."""
+    if hasattr(value, '__iter__'):
+        return [datetime.fromtimestamp(ts) for ts in value]
+    return datetime.fromtimestamp(value)
+
+
+@lru_cache(maxsize=SERIALIZED_CACHE_SIZE)
+def _load_yaml(text):
+    """Parses yaml text, memoized since equal fallback values are common in
+    config-like data. json is parsed faster than a memoized value is copied,
+    thus it is not memoized."""
+    return yaml.load(text, Loader=YAML_LOADER)
+
+
+def _decode_serialized(item, value, type_id):
+    if isinstance(value, bytes):
+        value = value.decode()
+    if type_id == 'json':
+        return json.loads(value)
+    value = _load_yaml(value)
+    if isinstance(value, (str, int, float, bool, type(None))):
+        return value
+    return deepcopy(value)  # the memoized value must not be shared
+
+
+def _decode_yaml(item, value):
+    return _decode_serialized(item, value, 'yaml')
+
+
+def _decode_json(item, value):
+    return _decode_serialized(item, value, 'json')
+
+
+def _decode_str_array_legacy(item, value):
+    logger.warning('The strArray typeID is deprecated!')
+    return np.array(_decode_yaml(item, value))
+
+
+def _decode_list_str(item, value):
+    value = _decode_str(item, value)
+    if isinstance(value, np.ndarray):
+        value = value.tolist()
+    return value
+
+
+def _decode_str_array(item, value):
+    value = _decode_str(item, value)
+    if isinstance(value, np.ndarray):
+        value = value.astype(str)
+    return value
+
+
+def _decode_list_arr(item, value):
+    if isinstance(value, np.ndarray):
+        value = list(value)
+    return value
+
+
+def _decode_path(item, value):
+    if isinstance(value, bytes):
+        value = value.decode()
+    return Path(value)
+
+
+# TYPEID of groups holding iterables -> True if it is a tuple
+ITER_TYPES = {'tuple': True, 'list': False, 'path_list': False,
+              'path_tuple': True}
+
+
+def _decode_typed(item, value, type_id=None):
+    """Decodes a raw value read from a type-tagged dataset.
+
+    `value` is either the full content (`item[()]`) or a selection of it, so
+    every decoder has to handle scalars as well as arrays. `type_id` is read
+    from the dataset if not given.
     """
-    if TYPEID in item.attrs:
-        if item.attrs[TYPEID] == 'datetime':
-            value = item[()]
-            if hasattr(value, '__iter__'):
-                value = [datetime.fromtimestamp(
-                    ts) for ts in value]
-            else:
-                value = datetime.fromtimestamp(value)
+    if type_id is None:
+        type_id = item.attrs[TYPEID]
 
-        elif item.attrs[TYPEID] == 'yaml':
-            value = item[()]
-            try:
-                value = yaml.safe_load(value.decode())
-            except AttributeError:  # already decoded string
-                value = yaml.safe_load(value)
+    decoder = DECODERS.get(type_id, None)
+    if decoder is not None:
+        return decoder(item, value)
 
-        elif item.attrs[TYPEID] == 'tuple':
-            value = 0
+    codec = registry.get(type_id)
+    if codec is None:
+        raise RuntimeError('Invalid TYPEID in h5 database')
+    return codec.decode(value)
 
-        elif item.attrs[TYPEID] == 'list_str':
-            try:
-                value = [it.decode() for it in item[()]]
-            except UnicodeDecodeError:
-                try:
-                    value = [it.decode('latin-1') for it in item[()]]
-                except UnicodeDecodeError:
-                    logger.exception(f'Cant decode bytes in {item.name}')
-                    value = None
-
-        elif item.attrs[TYPEID] == 'strArray':
-            logger.warning('The strArray typeID is deprecated!')
-            value = item[()]
-            try:
-                value = yaml.safe_load(value.decode())
-            except AttributeError:  # already decoded string
-                value = yaml.safe_load(value)
-            value = np.array(value)
-
-        elif item.attrs[TYPEID] == 'str_array':
-            value = item[()]
-            init_shape = value.shape
-            try:
-                value = np.array(
-                    [v.decode() for v in value.ravel()]).reshape(init_shape)
-            except UnicodeDecodeError:
-                try:
-                    value = np.array(
-                        [v.decode() for v in value.ravel()]).reshape(init_shape)
-                except UnicodeDecodeError:
-                    logger.exception(f'Cant decode bytes in {item.name}')
-                    value = None
 
-        elif item.attrs[TYPEID] == 'list_arr':
-            value = list(item[()])
+def _split_ragged(data, offsets, shapes):
+    """Splits the data buffer of the ragged layout into arrays. `data` starts
+    at the first offset."""
+    base = offsets[0]
+    return [data[start - base:stop - base].reshape(tuple(shape[shape >= 0]))
+            for start, stop, shape in zip(offsets[:-1], offsets[1:], shapes)]
+
+
+def _unpack_ragged(group):
+    """Reads a list of arrays from the ragged layout."""
+    return _split_ragged(unpack_dataset(group['data']), group['offsets'][()],
+                         group['shapes'][()])
+
+
+def _read_column(dataset, rows):
+    """Reads the rows of a column or index dataset of a native frame."""
+    value = _read_selection(dataset, rows)
+    type_id = dataset.attrs.get(TYPEID, None)
+    if type_id is not None:
+        value = _decode_typed(dataset, value, type_id)
+    return value
+
 
-        elif item.attrs[TYPEID] == 'path':
-            value = Path(item[()].decode())
+def _unpack_frame(group, positions=None, rows=None):
+    """Reads a `pandas.DataFrame` from the native columnar layout, only the
+    columns at `positions` (defaults to all) and the rows of the slice
+    `rows` (defaults to all)."""
+    labels = unpack_dataset(group['columns'])
+    index_name, columns_name = unpack_dataset(group['names'])
+    dtypes = json.loads(group.attrs[FRAME_DTYPES])
+    rows = slice(None) if rows is None else rows
+    if positions is None:
+        positions = range(len(labels))
 
+    if FRAME_RANGE in group.attrs:
+        index = pd.RangeIndex(*group.attrs[FRAME_RANGE], name=index_name)[rows]
+    else:
+        index = pd.Index(_read_column(group['index'], rows), name=index_name)
+
+    columns = {}
+    for i, position in enumerate(positions):
+        column = pd.Series(_read_column(group[f'c_{position}'], rows),
+                           index=index, copy=False)
+        if str(column.dtype) != dtypes[position]:
+            try:
+                column = column.astype(dtypes[position])
+            except (TypeError, ValueError):
+                logger.warning(f'Cant restore dtype {dtypes[position]} of '
+                               f'{labels[position]} in {group.name}')
+        columns[i] = column
+
+    frame = pd.DataFrame(columns, index=index)
+    # The dtype of the labels is inferred from all, not only the selected
+    frame.columns = pd.Index([labels[p] for p in positions], name=columns_name,
+                             dtype=pd.Index(labels).dtype)
+    return frame
+
+
+def _unpack_iter_data(group, unpack, is_tuple=False):
+    """Unpacks a group holding a tuple or list, every element with
+    `unpack(item, type_id)`."""
+    dl = list()
+    for name, _, type_id, _ in scan(group):
+        if type_id in ITER_TYPES:
+            dl.append(_unpack_iter_data(group[name], unpack, ITER_TYPES[type_id]))
         else:
-            raise RuntimeError('Invalid TYPEID in h5 database')
+            dl.append(unpack(group[name], type_id))
+
+    if is_tuple:
+        dl = tuple(dl)
+
+    return dl
+
+
+def _unpack_item(item, type_id, buffers=None):
+    """Unpacks a dataset or type-tagged group with a known type id, see
+    `unpack_dataset`. Reported as `unpack` event when profiling."""
+    if not profiling.active:
+        return _unpack_value(item, type_id, buffers)
+
+    start = profiling.enter()
+    try:
+        value = _unpack_value(item, type_id, buffers)
+    finally:
+        profiling.leave()
+    if start is not None:
+        profiling.record('unpack', item, start, codec=type_id)
+    return value
+
+
+def _unpack_value(item, type_id, buffers=None):
+    if isinstance(item, h5py.Group):
+        if type_id in ITER_TYPES:
+            unpack = _unpack_item if buffers is None else partial(
+                _unpack_item, buffers=buffers)
+            return _unpack_iter_data(item, unpack, ITER_TYPES[type_id])
+        if type_id in FRAME_TYPES:
+            frame = _unpack_frame(item)
+            if type_id == 'frame':
+                return frame
+            series = frame.iloc[:, 0]
+            if item.attrs.get(FRAME_UNNAMED, False):
+                series.name = None
+            return series
+        return _unpack_ragged(item)
+
+    if config.use_memmap and type_id is None and _mappable(item):
+        return _memmap(item)
+
+    if buffers is not None and type_id is None and _direct_readable(item):
+        value = buffers.get(item.shape, item.dtype)
+        if parallel.supports_read(item):
+            return parallel.read_chunks(item, out=value)
+        item.read_direct(value)
+        return value
+
+    if parallel.supports_read(item):
+        value = parallel.read_chunks(item)
+    else:
+        value = _read(item)
+
+    if type_id is not None:
+        value = _decode_typed(item, value, type_id)
 
     else:
-        value = item[()]
         if isinstance(value, bytes):
             # This is most likely a str...trying to decode that right away
             try:
@@ -318,7 +1139,30 @@ def unpack_dataset(item):
     return value
 
 
-def load(hdf, unpack_attrs=False, unpacker=unpack_dataset):
+def unpack_dataset(item, buffers=None):
+    """Reconstruct a hdfdict dataset.
+
+    This holds all special **unpacking** procedures for types not natively
+    supported by `h5py`.
+
+    Parameters
+    ----------
+    item: `h5py.Dataset`
+        The dataset to unpack. Tuples, lists and lists of arrays in the ragged
+        layout are stored in a `h5py.Group` which is unpacked as well.
+    buffers: `BufferPool`, optional
+        Pool to take the arrays of untagged numeric datasets from, which are
+        then read without allocating, see `buffers`.
+
+    Returns
+    -------
+    value:
+        Unpacked Data
+    """
+    return _unpack_item(item, item.attrs.get(TYPEID, None), buffers)
+
+
+def load(hdf, unpack_attrs=False, unpacker=unpack_dataset, buffers=None):
     """Returns a dictionary containing the groups as keys and the datasets as
     values from given hdf file.
 
@@ -332,6 +1176,11 @@ def load(hdf, unpack_attrs=False, unpacker=unpack_dataset):
     unpacker : `callable`
         Unpack function gets `value` of type h5py.Dataset.
         Must return the data you would like to have it in the returned dict.
+        Only used if not lazy.
+    buffers : `BufferPool`, optional
+        Untagged arrays of numbers are read into buffers of the pool instead
+        of newly allocated arrays. Set as `LazyHdfDict.buffers` if lazy, only
+        used with the default unpacker.
 
     Returns
     -------
@@ -340,75 +1189,30 @@ def load(hdf, unpack_attrs=False, unpacker=unpack_dataset):
         values. Can be lazy and thus not unwrapped.
     """
     lazy = config.use_lazy
+    start = perf_counter() if profiling.active else None
 
-    def _recurse_iter_data(value, is_tuple=False):
-        dl = list()
-        for _, v in value.items():
-            # Tuples wont work lazy so we have to unpack them right
-            # away, anything else is way to complicated
-            if TYPEID in v.attrs:
-                if v.attrs[TYPEID] == 'tuple':
-                    dl.append(_recurse_iter_data(v, True))
-                elif v.attrs[TYPEID] == 'list':
-                    dl.append(_recurse_iter_data(v))
-                elif v.attrs[TYPEID] == 'path_list' or v.attrs[TYPEID] == 'path_tuple':
-                    dl.append(_recurse_iter_data(v))
-
-                else:
-                    dl.append(unpacker(v))
-            else:
-                dl.append(unpacker(v))
-
-        if is_tuple:
-            dl = tuple(dl)
-
-        return dl
-
-    def _recurse(hdfobject, datadict):
-        for key, value in hdfobject.items():
-            if 'pandas_type' in value.attrs:
+    if unpacker is unpack_dataset:
+        unpack = _unpack_item if buffers is None else partial(
+            _unpack_item, buffers=buffers)
+    else:
+        def unpack(item, type_id):
+            return unpacker(item)
+
+    def _build(hdfobject, datadict):
+        """Builds the dicts from a scan per group. Tuples, lists, pandas data
+        and other tagged groups are unpacked as a whole."""
+        for key, is_group, type_id, is_pandas in scan(hdfobject):
+            if is_pandas:
                 # This is a dataframe or a series...might be in subgroup
-                if isinstance(hdfobject, h5py.File):
-                    datadict[key] = pd.read_hdf(hdfobject.filename, key)
-                else:
-                    datadict[key] = pd.read_hdf(hdfobject.file.filename,
-                                                f'{hdfobject.name}/{key}')
+                datadict[key] = pd.read_hdf(hdfobject.file.filename,
+                                            hdfobject[key].name)
+            elif is_group and type_id is None:
+                datadict[key] = _build(hdfobject[key], {})
+            elif type_id in ITER_TYPES and unpack is not _unpack_item:
+                datadict[key] = _unpack_iter_data(hdfobject[key], unpack,
+                                                  ITER_TYPES[type_id])
             else:
-                if TYPEID in value.attrs:
-                    if value.attrs[TYPEID] == 'tuple':
-                        datadict[key] = _recurse_iter_data(value, True)
-                    elif value.attrs[TYPEID] == 'list':
-                        datadict[key] = _recurse_iter_data(value)
-                    elif value.attrs[TYPEID] == 'path_list' or value.attrs[TYPEID] == 'path_tuple':
-                        datadict[key] = _recurse_iter_data(value, 'tuple' in value.attrs[TYPEID])
-
-                    else:
-                        if lazy:
-                            datadict[key] = value
-                        else:
-                            datadict[key] = unpacker(value)
-
-                elif isinstance(value, h5py.Group) or isinstance(value, LazyHdfDict):
-                    if lazy:
-                        datadict[key] = LazyHdfDict()
-                        if isinstance(value, h5py.Group):
-                            logger.debug('LazyDict from Group - searching parent...')
-                            datadict[key].h5file = value.file
-                            datadict[key].group = value.name
-                            logger.debug(
-                                f'Created child LazyDict of Group {datadict[key].group} in File {datadict[key].h5file}')
-                        else:
-                            datadict[key].h5file = hdfobject
-                    else:
-                        datadict[key] = {}
-
-                    datadict[key] = _recurse(value, datadict[key])
-
-                elif isinstance(value, h5py.Dataset):
-                    if lazy:
-                        datadict[key] = value
-                    else:
-                        datadict[key] = unpacker(value)
+                datadict[key] = unpack(hdfobject[key], type_id)
 
         return datadict
 
@@ -426,18 +1230,22 @@ def load(hdf, unpack_attrs=False, unpacker=unpack_dataset):
     if lazy:
         data = is_open(hdf)
         if data is not None:
+            if buffers is not None:
+                data.buffers = buffers
             if 'attrs' not in data and unpack_attrs:
                 logger.debug('Reloading file attributes to unwrap...')
-                data['attrs'] = {k: v for k, v in data.h5file.attrs.items()}
+                data['attrs'] = {k: v for k, v in data.h5file.attrs.items()
+                                 if k != DEAD_BYTES}
                 return data
             else:
                 return data
 
     # Else open the file and go on
-    hdf_handle = h5py.File(hdf, 'r')
+    hdf_handle = _open(hdf, 'open')
 
     if lazy:
         data = LazyHdfDict(_h5file=hdf_handle)
+        data.buffers = buffers
         add_open_file(data)
 
     else:
@@ -446,16 +1254,24 @@ def load(hdf, unpack_attrs=False, unpacker=unpack_dataset):
     # Attributes are loaded into a dict if asked for. Else they will remain
     # in the h5file
     if unpack_attrs:
-        data['attrs'] = {k: v for k, v in hdf_handle.attrs.items()}
+        data['attrs'] = {k: v for k, v in hdf_handle.attrs.items()
+                         if k != DEAD_BYTES}
 
     # Finally, add the rest from the file. If not lazy, close it right away.
-    # If lazy, the file must stay open.
-    data = _recurse(hdf_handle, data)
-
+    # If lazy, the file must stay open and groups are listed on access.
     if lazy:
+        data._index = structure.read(hdf_handle)
+        data.defer()
+        if start is not None:
+            profiling.emit('load', str(hdf), '/', start)
         return data
 
+    data = _build(hdf_handle, data)
+
     hdf_handle.close()
+    if start is not None:
+        profiling.emit('load', str(hdf), '/', start,
+                       stored_bytes=hdf.stat().st_size)
 
     # squeeze singleton data from dict, only if enabled. Default is off
     if config.squeeze_single and len(data.keys()) == 1:
@@ -464,193 +1280,649 @@ def load(hdf, unpack_attrs=False, unpacker=unpack_dataset):
     return data
 
 
-def pack_dataset(hdfobject, key, value, compress):
-    """Packs a given key value pair into a dataset in the given hdfobject.
+def _save_path(hdf):
+    """Converts a target given as `str` or `Path` to the `Path` to save to,
+    adding the default suffix if needed."""
+    if isinstance(hdf, str):
+        # Fixing windows issues with manually specified pathes
+        if platform.system() == 'Windows':
+            hdf = PureWindowsPath(hdf)
 
-    This holds all special **packing** procedures for types not natively
-    supported by `h5py`. If a value exists that is not conformable with hdf,
-    the the function tries to adapt or serialize the value using yaml as last
-    resort, raising a TypeWarning on the go.
-    If yaml fails, the exception of the failure is raised and not handled, thus
-    having the code fail, e.g. saving is only successful if all datasets were
-    packable!
+        hdf = Path(hdf)
+
+    if not hdf.suffix == config.default_suffix:
+        hdf = hdf.parent / (hdf.name + config.default_suffix)
+
+    return hdf
+
+
+def _append_block(hdfobject, key, block, compress):
+    """Appends a block of rows to a resizable dataset.
+
+    The dataset is created chunked and resizable along the first axis on the
+    first call. A block with one dimension less than the dataset is appended
+    as a single row, the first block always defines rows along its first axis.
+    Unicode blocks are stored as variable length strings so later blocks can
+    hold longer strings.
 
     Parameters
     ------------
-    hdfobject: `h5py.File` or similar to save the data to.
-        The object to pack the key-value in to.
+    hdfobject: `h5py.File` or `h5py.Group`
+        The object holding the dataset.
     key: `string`
-        Indetifier to write the data to.
-    value: `any`
-        Data value
-    compress: `tuple`
-        Tuple of (bool compress, 0-9 level) which specifies the compression.
+        Name or path of the dataset, nested groups are created if needed.
+    block: `array_like`
+        Data to append.
+    compress: `dict`
+        Normalized compression spec used on creation of the dataset, see
+        `filters`. Chunk policies other than an explicit shape use the `row`
+        policy.
+
+    Returns
+    -------
+    dataset: `h5py.Dataset`
+        The dataset the block was appended to.
     """
-    def _dump_array(name, array, group, compress, type_id=None):
-        if len(array) == 0:
-            return
+    block = np.asarray(block)
+    is_str = block.dtype.kind == 'U'
 
-        # This is a string array - to avoid unicode this will be made binary
-        # and stored with a unique typeid
-        if array.dtype.str.startswith('<U'):
-            logger.debug('(unicode) str array found, making list')
-            init_shape = array.shape
-            array = np.array([str(v).encode() for v in array.ravel()]).reshape(init_shape)
-            if compress[0]:
-                subset = group.create_dataset(
-                    name=name, data=array, compression='gzip',
-                    compression_opts=compress[1])
-            else:
-                subset = group.create_dataset(
-                    name=name, data=array)
-            subset.attrs.create(
+    if key in hdfobject:
+        ds = hdfobject[key]
+        if not isinstance(ds, h5py.Dataset) or ds.maxshape[0] is not None:
+            raise ValueError(f'Dataset {key} exists and is not appendable')
+        if block.ndim == ds.ndim - 1:
+            block = block[np.newaxis]
+
+    else:
+        if block.ndim == 0:
+            block = block[np.newaxis]
+
+        row_shape = block.shape[1:]
+        dtype = h5py.string_dtype() if is_str else block.dtype
+        if not isinstance(compress['chunks'], tuple):
+            compress = dict(compress, chunks='row')
+
+        # The nominal length only limits the rows of a chunk
+        kwargs = filters.dataset_kwargs(
+            compress, (STREAM_CHUNK_ROWS,) + row_shape, dtype)
+        logger.debug(f'Creating appendable dataset {key} with chunks {kwargs["chunks"]}')
+        ds = hdfobject.create_dataset(
+            name=key, shape=(0,) + row_shape, maxshape=(None,) + row_shape,
+            dtype=dtype, **kwargs)
+
+        if is_str:
+            ds.attrs.create(
                 name=TYPEID,
                 data=str('str_array'))
 
-            return
+    if block.shape[1:] != ds.shape[1:]:
+        raise ValueError(f'Block of shape {block.shape} does not fit rows '
+                         f'of {key} with shape {ds.shape[1:]}')
+
+    n_rows = ds.shape[0]
+    ds.resize(n_rows + len(block), axis=0)
+    ds[n_rows:] = block.astype(object) if is_str else block
+
+    return ds
+
+
+def _is_ragged(value):
+    """Checks if a list can be packed in the ragged layout, which needs numeric
+    arrays of a single dtype."""
+    if not value or not isinstance(value[0], np.ndarray):
+        return False
+    dtype = value[0].dtype
+    return dtype.kind in 'biufc' and all(
+        isinstance(v, np.ndarray) and v.dtype == dtype for v in value)
+
+
+def _datetime_kind(value):
+    """Classifies datetime values to pack, except lists and tuples which are
+    classified by `_classify_sequence`. Returns the kind of datetime storage
+    or None if `value` is not a datetime type."""
+    if isinstance(value, (datetime, np.datetime64)):
+        return 'scalar'
+    if isinstance(value, np.ndarray):
+        return 'numpy' if value.dtype.kind == 'M' else None
+    if isinstance(value, pd.DatetimeIndex):
+        return 'pandas'
+    return None
+
+
+def _pack_datetime(hdfobject, key, value, kind, compress):
+    """Packs datetime values as int64 dataset of a `datetime64` unit. Python
+    datetimes and aware pandas data are converted in bulk, aware values are
+    stored in UTC with the name of the time zone as attribute."""
+    tz = None
+    if kind == 'numpy' or isinstance(value, np.datetime64):
+        data = np.asarray(value)
+        if kind == 'scalar':
+            kind = 'numpy'
+    elif kind == 'pandas':
+        tz = value.tz
+        data = (value.tz_convert(None) if tz is not None else value).to_numpy()
+    else:
+        values = [value] if kind == 'scalar' else list(value)
+        tz = values[0].tzinfo
+        if tz is None:
+            try:
+                data = pd.DatetimeIndex(values).to_numpy().astype('M8[us]')
+            except pd.errors.OutOfBoundsDatetime:
+                data = np.array(values, dtype='M8[us]')
+        else:
+            tz = pd.Timestamp(values[0]).tz
+            data = pd.to_datetime(values, utc=True).tz_convert(None).to_numpy()
+            data = data.astype('M8[us]')
+        if kind == 'scalar':
+            data = data[0]
+
+    unit = np.datetime_data(data.dtype)[0]
+    logger.debug(f'Packing {key} as datetime64[{unit}] of kind {kind}')
+    data = data.view('int64')
+    ds = hdfobject.create_dataset(
+        name=key, data=data,
+        **filters.dataset_kwargs(compress, data.shape, data.dtype))
+    ds.attrs.create(name=TYPEID, data='datetime64')
+    ds.attrs.create(name=DT_UNIT, data=unit)
+    ds.attrs.create(name=DT_KIND, data=kind)
+    if tz is not None:
+        ds.attrs.create(name=DT_TZ, data=str(tz))
+
+
+def _unpack_datetime(item, value):
+    """Decodes a raw (possibly sliced) value of a `datetime64` dataset. Python
+    datetimes are converted in bulk, with `config.datetime_as_numpy` the
+    `datetime64` values are returned directly (in UTC for aware data)."""
+    attrs = item.attrs
+    kind = attrs[DT_KIND]
+    tz = attrs.get(DT_TZ, None)
+    value = np.asarray(value).view(f'M8[{attrs[DT_UNIT]}]')
+    scalar = value.ndim == 0
+
+    if kind == 'numpy' or config.datetime_as_numpy:
+        return value[()] if scalar else value
+
+    if kind == 'pandas':
+        index = pd.DatetimeIndex(value.ravel())
+        if tz is not None:
+            index = index.tz_localize('UTC').tz_convert(tz)
+        return index[0] if scalar else index
+
+    if tz is not None:
+        value = pd.DatetimeIndex(value.ravel()).tz_localize('UTC').tz_convert(
+            tz).to_pydatetime()
+    else:
+        value = value.ravel().astype('M8[us]').astype(object)
+
+    if scalar:
+        return value[0]
+    if kind == 'tuple':
+        return tuple(value)
+    return value.tolist()
+
+
+# TYPEID of datasets -> decoder getting the dataset and its raw value
+DECODERS = {
+    'datetime64': _unpack_datetime,
+    'datetime': _decode_timestamps,
+    'yaml': _decode_yaml,
+    'json': _decode_json,
+    'tuple': lambda item, value: 0,
+    'list_str': _decode_list_str,
+    'strArray': _decode_str_array_legacy,
+    'str_array': _decode_str_array,
+    'list_arr': _decode_list_arr,
+    'path': _decode_path,
+}
+
+
+def _create_array(name, array, group, compress):
+    if (config.contiguous_bytes is not None and array.ndim
+            and array.dtype.kind in MEMMAP_KINDS
+            and array.nbytes >= config.contiguous_bytes):
+        logger.debug(f'Storing {name} contiguous to be memory mapped')
+        return group.create_dataset(name=name, data=array)
+
+    kwargs = filters.dataset_kwargs(compress, array.shape, array.dtype)
+    if parallel.supports(compress, array):
+        kwargs['chunks'] = parallel.chunk_shape(compress, array)
+        subset = group.create_dataset(
+            name=name, shape=array.shape, dtype=array.dtype, **kwargs)
+        parallel.write_chunks(subset, array, compress)
+    else:
+        subset = group.create_dataset(name=name, data=array, **kwargs)
+
+    return subset
+
+
+def _dump_array(name, array, group, compress, type_id=None):
+    if len(array) == 0:
+        return
 
-        logger.debug(f'Dumping array {name} to file')
-        if compress[0]:
+    # This is a string array or list - stored as fixed width ascii or
+    # variable length utf-8 with a unique typeid, see _encode_strings
+    if array.dtype.kind == 'U' or type_id == 'list_str':
+        array = _encode_strings(array)
+        if array.dtype.kind == 'O':
+            logger.debug('(unicode) str array found, storing variable length')
             subset = group.create_dataset(
-                name=name, data=array, compression='gzip',
-                compression_opts=compress[1])
+                name=name, data=array, dtype=h5py.string_dtype(),
+                **filters.dataset_kwargs(compress, array.shape, object))
         else:
-            subset = group.create_dataset(
-                name=name, data=array)
+            logger.debug('(unicode) str array found, storing fixed width')
+            subset = _create_array(name, array, group, compress)
+        subset.attrs.create(
+            name=TYPEID,
+            data=str(type_id or 'str_array'))
 
-        if type_id is not None:
-            subset.attrs.create(
-                name=TYPEID,
-                data=str(type_id))
-
-    def _iterate_iter_data(hdfobject, key, value, typeID, inner_id=None):
-        ds = hdfobject.create_group(key)
-        elementsOrder = int(np.floor(np.log10(len(value))) + 1)
-        fmt = 'i_{:0' + str(elementsOrder) + 'd}'
-        for i, v in enumerate(value):
-            if isinstance(v, tuple):
-                _iterate_iter_data(ds, fmt.format(i), v, "tuple", inner_id)
-            elif isinstance(v, list):
-                # check for mixed type, if yes, dump to group as tuple
-                if not all([isinstance(v, type(value[0])) for v in value]):
-                    _iterate_iter_data(hdfobject, key, value, "list", inner_id)
-                else:
-                    _iterate_iter_data(ds, fmt.format(i), v, "list", inner_id)
-            else:
-                if isinstance(v, np.ndarray):
-                    _dump_array(fmt.format(i), v, ds, compress)
-                else:
-                    if isinstance(v, np.str_):
-                        v = str(v)
-                    inner = ds.create_dataset(name=fmt.format(i), data=v)
+        return
 
-                    if inner_id is not None:
-                        logger.debug(f'Adding innermost id {inner_id} to {inner}')
-                        inner.attrs.create(
-                            name=TYPEID,
-                            data=str(inner_id))
+    logger.debug(f'Dumping array {name} to file')
+    subset = _create_array(name, array, group, compress)
 
-        ds.attrs.create(
+    if type_id is not None:
+        subset.attrs.create(
             name=TYPEID,
-            data=str(typeID))
+            data=str(type_id))
+
+
+def _dump_ragged(name, value, group, compress):
+    logger.debug(f'Dumping {len(value)} arrays of {name} in ragged layout')
+    ds = group.create_group(name)
+    ndim = max(v.ndim for v in value)
+    shapes = np.full((len(value), ndim), -1, dtype=np.int64)
+    for i, v in enumerate(value):
+        shapes[i, :v.ndim] = v.shape
+    offsets = np.zeros(len(value) + 1, dtype=np.int64)
+    np.cumsum([v.size for v in value], out=offsets[1:])
+
+    data = np.concatenate([v.ravel() for v in value])
+    if data.size:
+        _create_array('data', data, ds, compress)
+    else:
+        ds.create_dataset('data', data=data)
+    ds.create_dataset('offsets', data=offsets)
+    ds.create_dataset('shapes', data=shapes)
+    ds.attrs.create(
+        name=TYPEID,
+        data=str('ragged'))
+
+
+def _dump_codec(name, value, group, compress, codec):
+    data = codec.encode(value)
+    logger.debug(f'Dumping {name} with codec {codec.type_id}')
+    if isinstance(data, np.ndarray) and data.ndim and data.dtype.kind in 'biufc':
+        ds = _create_array(name, data, group, compress)
+    else:
+        ds = group.create_dataset(name=name, data=data)
+    ds.attrs.create(
+        name=TYPEID,
+        data=str(codec.type_id))
+
+
+def _iterate_iter_data(hdfobject, key, value, typeID, compress, inner_id=None):
+    ds = hdfobject.create_group(key)
+    elementsOrder = int(np.floor(np.log10(max(len(value), 1))) + 1)
+    fmt = 'i_{:0' + str(elementsOrder) + 'd}'
+    for i, v in enumerate(value):
+        name = fmt.format(i)
+        if isinstance(v, tuple):
+            _iterate_iter_data(ds, name, v, "tuple", compress, inner_id)
+        elif isinstance(v, list):
+            if _is_ragged(v):
+                _dump_ragged(name, v, ds, compress)
+            else:
+                _iterate_iter_data(ds, name, v, "list", compress, inner_id)
+        elif isinstance(v, np.ndarray):
+            _dump_array(name, v, ds, compress)
+        elif inner_id is None and not isinstance(v, SCALAR_TYPES):
+            # E.g. None, dicts or datetimes in mixed sequences
+            pack_dataset(ds, name, v, compress)
+        else:
+            codec = registry.find(v)
+            if codec is not None:
+                _dump_codec(name, v, ds, compress, codec)
+                continue
+
+            if isinstance(v, np.str_):
+                v = str(v)
+            inner = ds.create_dataset(name=name, data=v)
+
+            if inner_id is not None:
+                logger.debug(f'Adding innermost id {inner_id} to {inner}')
+                inner.attrs.create(
+                    name=TYPEID,
+                    data=str(inner_id))
+
+    ds.attrs.create(
+        name=TYPEID,
+        data=str(typeID))
+
+
+def _classify_sequence(value):
+    """Classifies a list or tuple by the set of its element types, which is
+    built in a single pass. Returns the name of the packer and its option, see
+    `_classify`."""
+    sequence = 'tuple' if isinstance(value, tuple) else 'list'
+    if not value:
+        return 'group', sequence
+
+    types = set(map(type, value))
+    first = type(value[0])
+    same = all(issubclass(t, first) for t in types)
+
+    # Python datetimes must be either all naive or all aware
+    if same and issubclass(first, datetime):
+        if len({v.tzinfo is None for v in value}) == 1:
+            return 'datetime', sequence
+
+    if issubclass(first, Path):
+        if not same:
+            error = 'Path iterables are only supported in homogeneoeus packs'
+            logger.error(error)
+            raise RuntimeError(error)
+        return 'paths', sequence
+
+    if sequence == 'tuple':
+        return 'group', sequence
+
+    # Lists of float or int are arrays, mixed and nested lists are groups
+    if all(issubclass(t, (int, float)) for t in types):
+        return 'numbers', None
+    if not same or issubclass(first, list):
+        return 'group', sequence
+    if issubclass(first, str):
+        return 'strings', None
+
+    # List of numpy arrays (changing shape possible), packed ragged if the
+    # dtypes match
+    if issubclass(first, np.ndarray):
+        if value[0].dtype.kind in 'biufc' and len({v.dtype for v in value}) == 1:
+            return 'ragged', None
+        return 'group', sequence
+
+    if issubclass(first, SERIALIZED_TYPES):
+        return 'serialized', None
+
+    return 'other', None
+
+
+def _materialize(value):
+    """Reads lazy values of loaded files, so they are packed like the data
+    they stand for."""
+    if isinstance(value, LazyArray):
+        return value[()]
+    if isinstance(value, RaggedList):
+        return list(value)
+    if isinstance(value, LazyFrame):
+        return value.read()
+    return value
+
+
+def _classify(value):
+    """Picks how a value is packed. Returns the name of the packer in
+    `PACKERS` and its option, e.g. the codec or the kind of datetimes.
+    Registered codecs are checked first."""
+    codec = registry.find(value)
+    if codec is not None:
+        return 'codec', codec
+
+    # Generators and other iterators are streamed block by block
+    if isinstance(value, Iterator):
+        return 'stream', None
+
+    if isinstance(value, (list, tuple)):
+        return _classify_sequence(value)
+
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return 'frame', None
+
+    dt_kind = _datetime_kind(value)
+    if dt_kind is not None:
+        return 'datetime', dt_kind
+
+    if isinstance(value, np.ndarray):
+        return 'array', None
+
+    if isinstance(value, Path):
+        return 'path', None
+
+    if isinstance(value, SERIALIZED_TYPES):
+        return 'serialized', None
+
+    return 'other', None
+
+
+def _pack_stream(hdfobject, key, value, compress, option):
+    logger.debug(f'Streaming {key} block by block')
+    for block in value:
+        _append_block(hdfobject, key, block, compress)
+
+
+def _pack_datetimes(hdfobject, key, value, compress, kind):
+    _pack_datetime(hdfobject, key, value, kind, compress)
+
+
+def _pack_codec(hdfobject, key, value, compress, codec):
+    _dump_codec(key, value, hdfobject, compress, codec)
 
-    logger.debug(f'Packing {key}, with type {type(value)}')
 
-    isdt = False
-    if isinstance(value, datetime):
-        value = value.timestamp()
-        isdt = True
+def _pack_group(hdfobject, key, value, compress, sequence):
+    _iterate_iter_data(hdfobject, key, value, sequence, compress)
 
-    elif hasattr(value, '__iter__'):
-        if all(isinstance(i, datetime) for i in value):
-            value = [item.timestamp() for item in value]
-            isdt = True
 
+def _pack_paths(hdfobject, key, value, compress, sequence):
+    _iterate_iter_data(hdfobject, key, [str(v) for v in value], sequence,
+                       compress, inner_id='path')
+
+
+def _pack_numbers(hdfobject, key, value, compress, option):
+    _dump_array(key, np.array(value), hdfobject, compress, type_id='list_arr')
+
+
+def _pack_strings(hdfobject, key, value, compress, option):
+    logger.debug('List of strings will be stored as array, adding type '
+                 f'attribute for later decompression for {key}...')
+    _dump_array(key, np.array(value, dtype=object), hdfobject, compress,
+                type_id='list_str')
+
+
+def _frame_values(values):
+    """Converts a column or the index of a frame to data with a native
+    packing. Categories are stored by value, columns of other objects than
+    str are not supported."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(values.cat.categories.dtype if isinstance(
+            values, pd.Series) else values.categories.dtype)
+    if isinstance(values.dtype, pd.DatetimeTZDtype):
+        return pd.DatetimeIndex(values)
+
+    array = np.asarray(values.to_numpy())
+    if array.dtype.kind in 'biufcMU':
+        return array
+    if array.size and set(map(type, array.ravel())) <= {str}:
+        return array.astype(str)
+
+    raise TypeError(f'Values of dtype {values.dtype} can not be stored in the '
+                    'native frame layout')
+
+
+def _pack_frame(hdfobject, key, value, compress, option):
+    type_id = 'series' if isinstance(value, pd.Series) else 'frame'
+    frame = value.to_frame() if type_id == 'series' else value
+    logger.debug(f'Packing {type_id} {key} with shape {frame.shape} in '
+                 'native layout')
+    if isinstance(frame.columns, pd.MultiIndex):
+        raise TypeError('Columns with multiple levels can not be stored in the '
+                        'native frame layout')
+
+    ds = hdfobject.create_group(key)
     try:
-        manual_type = None
-
-        # Catch a list or tuple of Path as a special cases
-        if isinstance(value, tuple) or isinstance(value, list):
-            if isinstance(value[0], Path):
-                if not all([isinstance(v, type(value[0])) for v in value]):
-                    error = 'Path iterables are only supported in homogeneoeus packs'
-                    logger.error(error)
-                    raise RuntimeError(error)
-
-                if isinstance(value, tuple): path_type = 'tuple'
-                elif isinstance(value, list): path_type = 'list'
-                else:
-                    error = 'Unsupported Path iterable'
-                    logger.error(error)
-                    raise RuntimeError(error)
+        _pack_frame_group(ds, frame, type_id, compress)
+        if type_id == 'series' and value.name is None:
+            ds.attrs.create(name=FRAME_UNNAMED, data=True)
+    except Exception:
+        # No partly written frames are left
+        del hdfobject[key]
+        raise
+
+
+def _pack_frame_group(ds, frame, type_id, compress):
+    # Labels may be of any type and names None, both are serialized
+    _pack_serialized(ds, 'columns', list(frame.columns), compress, None)
+    _pack_serialized(ds, 'names', [frame.index.name, frame.columns.name],
+                     compress, None)
+    if isinstance(frame.index, pd.RangeIndex):
+        index = frame.index
+        ds.attrs.create(name=FRAME_RANGE, data=[index.start, index.stop, index.step])
+    else:
+        pack_dataset(ds, 'index', _frame_values(frame.index), compress)
 
-                _iterate_iter_data(
-                    hdfobject, key, [str(v) for v in value], path_type, inner_id='path')
-                return
+    for i in range(frame.shape[1]):
+        pack_dataset(ds, f'c_{i}', _frame_values(frame.iloc[:, i]), compress)
 
-        if isinstance(value, tuple):
-            _iterate_iter_data(hdfobject, key, value, "tuple")
-            return
+    ds.attrs.create(name=FRAME_ROWS, data=len(frame))
+    ds.attrs.create(name=FRAME_DTYPES,
+                    data=json.dumps([str(dtype) for dtype in frame.dtypes]))
+    ds.attrs.create(
+        name=TYPEID,
+        data=str(type_id))
 
-        # Catching list of strings or list of np.str_ or mixed lists..
-        if isinstance(value, list):
-            # check if all float or all int, then its ok to pass on
-            if all([isinstance(v, (int, float)) for v in value]):
-                value = np.array(value)
-                manual_type = 'list_arr'
-
-            # check for mixed type if yes, dump to group
-            # using the same as tuple
-            elif not all([isinstance(v, type(value[0])) for v in value]):
-                _iterate_iter_data(hdfobject, key, value, "list")
-                return
 
-            # check for nested list if yes, dump to group
-            # using the same as tuple
-            elif (all([isinstance(v, type(value[0])) for v in value])
-                  and isinstance(value[0], list)):
-                logger.debug('Packing list of lists')
-                _iterate_iter_data(hdfobject, key, value, "list")
-                return
+def _pack_ragged(hdfobject, key, value, compress, option):
+    _dump_ragged(key, value, hdfobject, compress)
 
-            # List of (np) string
-            elif all([isinstance(v, (str, np.str_)) for v in value]):
-                value = np.array([str(v).encode() for v in value])
-                logger.debug('List of strings will be binarized as array, adding type '
-                             f'attribute for later decompression for {key}...')
-                manual_type = 'list_str'
 
-            # List of numpy arrays (changing shape possible)
-            elif all([isinstance(v, np.ndarray) for v in value]):
-                _iterate_iter_data(hdfobject, key, value, "list")
-                return
+def _pack_array(hdfobject, key, value, compress, option):
+    _dump_array(key, value, hdfobject, compress)
 
-        logger.debug(f'Trying to save {key} with type {type(value)}')
-        if isinstance(value, np.ndarray):
-            _dump_array(key, value, hdfobject, compress, type_id=manual_type)
-            isdt = False
 
-        elif isinstance(value, Path):
-            ds = hdfobject.create_dataset(name=key, data=str(value))
-            ds.attrs.create(
-                name=TYPEID,
-                data=str('path'))
+def _pack_path(hdfobject, key, value, compress, option):
+    ds = hdfobject.create_dataset(name=key, data=str(value))
+    ds.attrs.create(
+        name=TYPEID,
+        data=str('path'))
 
-        else:
-            if compress[0]:
-                if isdt:
-                    logger.debug('No compression for datetime...')
-                else:
-                    logger.debug('No compression for unknown type...')
 
-            ds = hdfobject.create_dataset(name=key, data=value)
+def _is_json(value):
+    """Checks if a value round trips through json unchanged, which excludes
+    e.g. tuples and dicts with keys other than str."""
+    value_type = type(value)
+    if value_type in (str, int, float, bool) or value is None:
+        return True
+    if value_type is list:
+        return all(_is_json(v) for v in value)
+    if value_type is dict:
+        return all(type(k) is str and _is_json(v) for k, v in value.items())
+    return False
 
-        if isdt:
-            ds.attrs.create(
-                name=TYPEID,
-                data=str("datetime"))
+
+def _serialize(value):
+    """Serializes a value not storable by `h5py` as a last resort. Returns the
+    type id of the serializer and the text. json is used if possible and
+    enabled by `config.json_fallback`, yaml for anything else."""
+    if config.json_fallback and _is_json(value):
+        return 'json', json.dumps(value, separators=(',', ':'))
+    return 'yaml', yaml.dump(value, Dumper=YAML_DUMPER)
+
+
+def _pack_serialized(hdfobject, key, value, compress, option):
+    try:
+        type_id, text = _serialize(value)
+    except yaml.representer.RepresenterError:
+        logger.error(
+            'Cannot dump {:s} to h5, incompatible data format '
+            'even when using serialization.'.format(key))
+        logger.error(50*'-')
+        raise RuntimeError(f'Cant save {key}')
+
+    ds = hdfobject.create_dataset(name=key, data=text)
+    ds.attrs.create(
+        name=TYPEID,
+        data=str(type_id))
+
+
+def _pack_other(hdfobject, key, value, compress, option):
+    if compress['filter'] is not None:
+        logger.debug('No compression for unknown type...')
+
+    hdfobject.create_dataset(name=key, data=value)
+
+
+# Name of a packer from _classify -> function getting
+# (hdfobject, key, value, compress, option)
+PACKERS = {
+    'codec': _pack_codec,
+    'stream': _pack_stream,
+    'datetime': _pack_datetimes,
+    'group': _pack_group,
+    'paths': _pack_paths,
+    'numbers': _pack_numbers,
+    'strings': _pack_strings,
+    'ragged': _pack_ragged,
+    'frame': _pack_frame,
+    'array': _pack_array,
+    'path': _pack_path,
+    'serialized': _pack_serialized,
+    'other': _pack_other,
+}
+
+
+def pack_dataset(hdfobject, key, value, compress):
+    """Packs a given key value pair into a dataset in the given hdfobject.
+
+    This holds all special **packing** procedures for types not natively
+    supported by `h5py`. If a value exists that is not conformable with hdf,
+    the the function tries to adapt or serialize the value using yaml as last
+    resort, raising a TypeWarning on the go.
+    If yaml fails, the exception of the failure is raised and not handled, thus
+    having the code fail, e.g. saving is only successful if all datasets were
+    packable!
+    Iterators and generators are consumed and each yielded block is appended
+    to a resizable dataset, so they never have to be held in memory at once.
+    Each value is classified once to pick its packer, codecs registered with
+    `registry.register_codec` are used for custom types. Packing is reported
+    as `pack` event when profiling, see `profiling`.
+
+    Parameters
+    ------------
+    hdfobject: `h5py.File` or similar to save the data to.
+        The object to pack the key-value in to.
+    key: `string`
+        Indetifier to write the data to.
+    value: `any`
+        Data value
+    compress: `tuple`, `str`, `int` or `dict`
+        Compression spec, see `filters` for the supported forms. A spec in
+        `config.key_compression` for this key takes precedence.
+    """
+    if not profiling.active:
+        return _pack_value(hdfobject, key, value, compress)
+
+    start = profiling.enter()
+    try:
+        _pack_value(hdfobject, key, value, compress)
+    finally:
+        profiling.leave()
+    # Empty values create no dataset
+    if start is not None and key in hdfobject:
+        profiling.record('pack', hdfobject[key], start)
+
+
+def _pack_value(hdfobject, key, value, compress):
+    logger.debug(f'Packing {key}, with type {type(value)}')
+    compress = filters.for_key(hdfobject, key, compress)
+
+    value = _materialize(value)
+    packer, option = _classify(value)
+    try:
+        logger.debug(f'Trying to save {key} with packer {packer}')
+        PACKERS[packer](hdfobject, key, value, compress, option)
 
     except TypeError:
+        if packer == 'frame':
+            # Frames are not serializable, the reason is more telling
+            raise
         # Typecast to def. string for yaml. If it was a string, no action
         # needed but to dump it
         if isinstance(value, np.str_) or isinstance(value, str):
@@ -661,25 +1933,12 @@ def pack_dataset(hdfobject, key, value, compress):
                 )
         else:
             # Obviously the data was not serializable. To give it
-            # a last try; serialize it to yaml but expect this to go down the
-            # crapper
-            try:
-                ds = hdfobject.create_dataset(
-                    name=key,
-                    data=yaml.safe_dump(value)
-                    )
-                ds.attrs.create(
-                    name=TYPEID,
-                    data=str("yaml"))
-            except yaml.representer.RepresenterError:
-                logger.error(
-                    'Cannot dump {:s} to h5, incompatible data format '
-                    'even when using serialization.'.format(key))
-                logger.error(50*'-')
-                raise RuntimeError(f'Cant save {key}')
+            # a last try; serialize it to json or yaml but expect this to go
+            # down the crapper
+            _pack_serialized(hdfobject, key, value, compress, None)
 
 
-def save(hdf, data, compress=config.default_compression, packer=pack_dataset,
+def save(hdf, data, compress=None, packer=pack_dataset,
          *args, **kwargs):
     """
     Adds keys of given dict as groups and values as datasets to the given
@@ -698,17 +1957,20 @@ def save(hdf, data, compress=config.default_compression, packer=pack_dataset,
         Path to File
     data: `dict`
         The dictionary containing *only string or tuple* keys and
-        data values or dicts as above again.
+        data values or dicts as above again. Values can be generators or
+        iterators which are streamed to the file block by block.
     packer: `callable`
         Callable gets `hdfobject, key, value` as input.
         `hdfobject` is considered to be either a h5py.File or a h5py.Group.
         `key` is the name of the dataset.
         `value` is the dataset to be packed and accepted by h5py.
         Defaults to `pack_dataset()`
-    compress: `tuple`
-        Try to compress arrays, use carefully. If on, gzip mode is used in
-        every case. Defaults to `(False, 0)`. When `(True,...)` the second
-        element specifies the level from `0-9`, see h5py doc.
+    compress: `tuple`, `str`, `int` or `dict`
+        Try to compress arrays, use carefully. Defaults to
+        `config.default_compression`. When `(True,...)` gzip is used and the
+        second element specifies the level from `0-9`, see h5py doc. Other
+        filters and chunk policies can be given as spec, see `filters`.
+        Single keys can be configured with `config.key_compression`.
 
     Returns
     --------
@@ -723,31 +1985,30 @@ def save(hdf, data, compress=config.default_compression, packer=pack_dataset,
                 hdfgroup = hdfobject.create_group(key)
                 _recurse(value, hdfgroup)
             else:
-                if isinstance(value, (pd.DataFrame, pd.Series)):
+                if (isinstance(value, (pd.DataFrame, pd.Series))
+                        and not config.native_frames):
                     raise TypeError('pandas Data must be stored in root group')
                 else:
                     packer(hdfobject, key, value, compress)
 
-    if isinstance(hdf, str):
-        # Fixing windows issues with manually specified pathes
-        if platform.system() == 'Windows':
-            hdf = PureWindowsPath(hdf)
-
-        hdf = Path(hdf)
-
-    if not hdf.suffix == config.default_suffix:
-        hdf = hdf.parent / (hdf.name + config.default_suffix)
+    start = perf_counter() if profiling.active else None
+    hdf = _save_path(hdf)
+    # Custom packers get the spec as given before
+    compress = config.default_compression if compress is None else compress
 
     # Single dataframe
-    if isinstance(data, (pd.DataFrame, pd.Series)):
-        if compress[0]:
-            store = pd.HDFStore(hdf, compress=compress[1], complib='zlib')
-        else:
-            store = pd.HDFStore(hdf, compress=None)
+    if isinstance(data, (pd.DataFrame, pd.Series)) and config.native_frames:
+        data = {'pd_dataframe': data}
+
+    elif isinstance(data, (pd.DataFrame, pd.Series)):
+        store = pd.HDFStore(hdf, **filters.pandas_kwargs(filters.normalize(compress)))
 
         store.put('pd_dataframe', data)
         store.close()
 
+        if start is not None:
+            profiling.emit('save', str(hdf), '/', start,
+                           stored_bytes=hdf.stat().st_size)
         return hdf
 
     if config.allow_overwrite:
@@ -760,11 +2021,9 @@ def save(hdf, data, compress=config.default_compression, packer=pack_dataset,
     pandas_keys = list()
 
     for k, v in data.items():
-        if isinstance(v, (pd.DataFrame, pd.Series)):
-            if compress[0]:
-                v.to_hdf(hdf, key=k, mode=file_mode, complevel=compress[1], complib='zlib')
-            else:
-                v.to_hdf(hdf, key=k, mode=file_mode, complib=None)
+        if isinstance(v, (pd.DataFrame, pd.Series)) and not config.native_frames:
+            v.to_hdf(hdf, key=k, mode=file_mode,
+                     **filters.pandas_kwargs(filters.normalize(compress)))
             pandas_keys.append(k)
             file_mode = 'r+'
 
@@ -782,4 +2041,13 @@ def save(hdf, data, compress=config.default_compression, packer=pack_dataset,
         # Finally save the data
         _recurse(data, hdf_handle)
 
+        if config.structure_index == 'file':
+            structure.write(hdf_handle)
+
+    if config.structure_index == 'sidecar':
+        structure.write_sidecar(hdf)
+
+    if start is not None:
+        profiling.emit('save', str(hdf), '/', start,
+                       stored_bytes=hdf.stat().st_size)
     return hdf
@@ -0,0 +1,290 @@
+"""
+In-place updates of existing files. `update` adds, replaces or deletes single
+keys and subtrees without rewriting the rest of the file. Arrays of numbers
+replacing an array of the same dtype are written into the existing dataset,
+chunked datasets are resized for this if their maximum shape allows.
+
+Space of deleted or replaced datasets is not returned to the file system by
+hdf5, it is only reused while the file is open. The bytes left unused when
+an update closes the file are counted in the file as dead space, `repack`
+copies the data into a new file to reclaim them. Pandas keys stored without
+`config.native_frames` are replaced by pandas and not counted.
+
+Example
+-------
+>>> report = update('data.hdf', {'array': new_array,
+...                              'group': {'old': DELETE, 'new': 1}})
+>>> report.dead_bytes
+>>> repack('data.hdf')
+"""
+from collections import namedtuple
+from pathlib import Path
+from time import perf_counter
+import os
+from logging import getLogger
+import h5py
+import numpy as np
+import pandas as pd
+
+from .hdf_support import LazyHdfDict, MEMMAP_KINDS, _save_path, pack_dataset
+from .queue_handler import remove_from_queue
+from .structure import DEAD_BYTES, TYPEID
+from . import config, filters, profiling, structure
+
+logger = getLogger(__package__)
+
+
+class _Delete:
+    """Marker of keys to delete, use the `DELETE` instance."""
+
+    def __repr__(self):
+        return 'DELETE'
+
+
+DELETE = _Delete()
+
+REPLACED_SUFFIX = '__replaced__'
+
+UpdateReport = namedtuple('UpdateReport', ['path', 'added', 'replaced',
+                                           'reused', 'resized', 'deleted',
+                                           'dead_bytes', 'reclaimed_bytes'])
+UpdateReport.__doc__ = """Result of an `update`. `added`, `replaced`, `reused`,
+`resized` and `deleted` list the names of the keys per action, `dead_bytes`
+is the unused space in the file after the update and `reclaimed_bytes` the
+bytes freed by repacking."""
+
+
+def dead_bytes(h5file):
+    """Unused bytes of a file left by updates, counted and bounded by the
+    bytes of the file not stored in datasets."""
+    counted = int(h5file.attrs.get(DEAD_BYTES, 0))
+    if not counted:
+        return 0
+
+    stored = [0]
+
+    def _add(name, item):
+        if isinstance(item, h5py.Dataset):
+            stored[0] += item.id.get_storage_size()
+    h5file.visititems(_add)
+    return max(0, min(counted, h5file.id.get_filesize() - stored[0]))
+
+
+def _reusable(dataset, value):
+    """Checks if an array can be written into an existing dataset, resizing
+    it if needed. Datasets with attributes hold tagged or converted data and
+    are replaced."""
+    if (type(value) is not np.ndarray or value.dtype.kind not in MEMMAP_KINDS
+            or value.dtype != dataset.dtype or value.ndim != dataset.ndim
+            or len(dataset.attrs)):
+        return False
+    if value.shape == dataset.shape:
+        return True
+    return dataset.chunks is not None and all(
+        m is None or s <= m for s, m in zip(value.shape, dataset.maxshape))
+
+
+def _replace(hdfobject, name, value, compress, packer, exists):
+    """Packs a value into `name`, an existing key is moved aside meanwhile
+    and restored if packing fails."""
+    if not exists:
+        packer(hdfobject, name, value, compress)
+        return
+
+    backup = f'{name}{REPLACED_SUFFIX}'
+    hdfobject.move(name, backup)
+    try:
+        packer(hdfobject, name, value, compress)
+    except BaseException:
+        if name in hdfobject:
+            del hdfobject[name]
+        hdfobject.move(backup, name)
+        raise
+    del hdfobject[backup]
+
+
+def _update(group, data, compress, packer, report):
+    for key, value in data.items():
+        if isinstance(key, tuple):
+            key = '_'.join((str(i) for i in key))
+        parent, _, name = key.rpartition('/')
+        hdfobject = group.require_group(parent) if parent else group
+        item = hdfobject.get(name)
+        exists = item is not None
+
+        if value is DELETE:
+            if exists:
+                del hdfobject[name]
+                report.deleted.append(f'{hdfobject.name.rstrip("/")}/{name}')
+            else:
+                logger.debug(f'Cant delete missing key {name} from {hdfobject.name}')
+            continue
+
+        if isinstance(value, (dict, LazyHdfDict)):
+            if (isinstance(item, h5py.Group)
+                    and TYPEID not in item.attrs):
+                _update(item, value, compress, packer, report)
+                continue
+            if exists:
+                del hdfobject[name]
+            _update(hdfobject.create_group(name), value, compress, packer,
+                    report)
+            continue
+
+        if isinstance(item, h5py.Dataset) and _reusable(item, value):
+            if item.shape != value.shape:
+                item.resize(value.shape)
+                report.resized.append(item.name)
+            else:
+                report.reused.append(item.name)
+            item.write_direct(np.ascontiguousarray(value))
+            continue
+
+        if (isinstance(value, (pd.DataFrame, pd.Series))
+                and not config.native_frames):
+            raise TypeError('pandas Data must be stored in root group')
+        _replace(hdfobject, name, value, compress, packer, exists)
+        (report.replaced if exists else report.added).append(
+            hdfobject[name].name)
+
+
+def update(hdf, data, compress=None, packer=pack_dataset, reclaim=False,
+           *args, **kwargs):
+    """
+    Adds, replaces or deletes keys of an existing file in place. Missing files
+    are created. Nested dicts update the keys of existing groups, keys can
+    also be paths like `group/sub/key`. Values set to `DELETE` remove the key
+    or subtree.
+
+    Arrays of numbers replacing an untagged array of the same dtype are
+    written into the dataset, keeping its filters and chunks. If the shape
+    differs, chunked datasets are resized within their maximum shape. All
+    other values replace the old key as `save` would store them.
+
+    The `attrs` key updates the root attributes, `DELETE` removes them. Lazy
+    dicts of the file are closed, the structure index is updated as set in
+    `config.structure_index`.
+
+    `\\*args` and `\\*\\*kwargs` will be passed to the `h5py.File` constructor.
+
+    Parameters
+    -----------
+    hdf: `string`, `Path`
+        Path to File
+    data: `dict`
+        The keys to update, see `save`.
+    compress: `tuple`, `str`, `int` or `dict`
+        Compression spec of new datasets, see `save`.
+    packer: `callable`
+        Packs new values, see `save`.
+    reclaim: `bool` or `float`
+        If True, the dead space is reclaimed with `repack` after the update.
+        A float repacks only if the dead space exceeds this fraction of the
+        file size. Defaults to False.
+
+    Returns
+    --------
+    report: `UpdateReport`
+        Keys per action and the dead space of the file.
+    """
+    start = perf_counter() if profiling.active else None
+    hdf = _save_path(hdf)
+    compress = config.default_compression if compress is None else compress
+    remove_from_queue(hdf)
+    report = UpdateReport(hdf, [], [], [], [], [], 0, 0)
+
+    data = dict(data)
+    attrs = data.pop('attrs', {})
+    pandas_keys = [k for k, v in data.items()
+                   if isinstance(v, (pd.DataFrame, pd.Series))
+                   and not config.native_frames]
+
+    # Pandas keeps its own file lock, thus its keys are stored in advance
+    if pandas_keys:
+        existing = set()
+        if hdf.exists():
+            with h5py.File(hdf, 'r') as hdf_handle:
+                existing = {k for k in pandas_keys if k in hdf_handle}
+        for k in pandas_keys:
+            data.pop(k).to_hdf(hdf, key=k, mode='a',
+                               **filters.pandas_kwargs(filters.normalize(compress)))
+            (report.replaced if k in existing else report.added).append(f'/{k}')
+
+    with h5py.File(hdf, 'a', *args, **kwargs) as hdf_handle:
+        for k, v in attrs.items():
+            if v is DELETE:
+                hdf_handle.attrs.pop(k, None)
+            else:
+                hdf_handle.attrs[k] = v
+
+        _update(hdf_handle, data, compress, packer, report)
+
+        # Free space is lost once the file is closed
+        freed = hdf_handle.id.get_freespace()
+        if freed:
+            hdf_handle.attrs[DEAD_BYTES] = int(hdf_handle.attrs.get(DEAD_BYTES, 0)) + freed
+
+        # Written last since the index holds the size of the file
+        if config.structure_index == 'file':
+            structure.write(hdf_handle)
+        dead = dead_bytes(hdf_handle)
+
+    if config.structure_index == 'sidecar':
+        structure.write_sidecar(hdf)
+
+    size = hdf.stat().st_size
+    if reclaim is True or (reclaim and dead > reclaim * size):
+        report = report._replace(reclaimed_bytes=repack(hdf))
+        dead = 0
+    report = report._replace(dead_bytes=dead)
+    logger.debug(f'Updated {hdf} with {dead} bytes of dead space')
+
+    if start is not None:
+        profiling.emit('update', str(hdf), '/', start,
+                       stored_bytes=hdf.stat().st_size)
+    return report
+
+
+def repack(hdf):
+    """
+    Copies all keys and root attributes of a file into a new file which
+    replaces it, reclaiming the dead space left by updates. Filters and chunks
+    of the datasets are kept. Lazy dicts of the file are closed, the structure
+    index is written again as set in `config.structure_index`.
+
+    Parameters
+    -----------
+    hdf: `string`, `Path`
+        Path to File
+
+    Returns
+    --------
+    reclaimed: `int`
+        Bytes the file shrunk by.
+    """
+    hdf = Path(hdf)
+    remove_from_queue(hdf)
+    size = hdf.stat().st_size
+    target = hdf.parent / (hdf.name + '.repack')
+
+    try:
+        with h5py.File(hdf, 'r') as source, h5py.File(target, 'w') as dest:
+            for k, v in source.attrs.items():
+                if k != DEAD_BYTES:
+                    dest.attrs[k] = v
+            for name in source:
+                if name != structure.INDEX_NAME:
+                    source.copy(source[name], dest, name=name)
+            if config.structure_index == 'file':
+                structure.write(dest)
+        os.replace(target, hdf)
+    finally:
+        if target.exists():
+            target.unlink()
+
+    if config.structure_index == 'sidecar':
+        structure.write_sidecar(hdf)
+
+    reclaimed = size - hdf.stat().st_size
+    logger.debug(f'Repacked {hdf}, reclaimed {reclaimed} bytes')
+    return reclaimed
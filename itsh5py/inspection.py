@@ -0,0 +1,231 @@
+"""
+Inspection of the storage of hdf files from metadata only. No data is read,
+for each key the shape, dtype, type id, chunk shape and filters are reported
+with the logical bytes of the data and the bytes stored in the file. Groups
+hold the totals of their subtree.
+
+Inspecting lists every object once, rendering is bounded by the number of
+children per group and lines, so it takes bounded time for any file size.
+Variable length data (e.g. str arrays) is counted by its references, the heap
+holding the strings themselves is not included.
+
+Example
+-------
+>>> info = inspect('data.hdf')
+>>> print(info.render(max_depth=2))
+>>> info.to_frame().sort_values('stored_bytes').tail()
+"""
+from pathlib import Path
+from logging import getLogger
+import h5py
+import numpy as np
+import pandas as pd
+
+from . import config, structure
+
+logger = getLogger(__package__)
+
+# Names of the common hdf5 filter ids
+FILTER_NAMES = {1: 'gzip', 2: 'shuffle', 3: 'fletcher32', 4: 'szip', 5: 'nbit',
+                6: 'scaleoffset', 32000: 'lzf', 32001: 'blosc', 32004: 'lz4',
+                32008: 'bitshuffle', 32015: 'zstd'}
+
+# Maximum number of lines rendered
+MAX_RENDER_LINES = 500
+
+_UNITS = ('B', 'kB', 'MB', 'GB', 'TB')
+
+
+def _format_bytes(num):
+    for unit in _UNITS[:-1]:
+        if abs(num) < 1000:
+            break
+        num /= 1000
+    else:
+        unit = _UNITS[-1]
+    return f'{num:.0f} {unit}' if unit == 'B' else f'{num:.1f} {unit}'
+
+
+class Entry:
+    """
+    Storage information of a key, see `inspect`. Datasets have no children,
+    for groups the shape, dtype, chunks and filters are None and the bytes
+    are the totals of the subtree.
+    """
+    __slots__ = ('path', 'is_group', 'type_id', 'shape', 'dtype', 'chunks',
+                 'filters', 'logical_bytes', 'stored_bytes', 'num_datasets',
+                 'children')
+
+    def __init__(self, path, is_group, type_id=None, shape=None, dtype=None,
+                 chunks=None, filters=None, logical_bytes=0, stored_bytes=0):
+        self.path = path
+        self.is_group = is_group
+        self.type_id = type_id
+        self.shape = shape
+        self.dtype = dtype
+        self.chunks = chunks
+        self.filters = filters
+        self.logical_bytes = logical_bytes
+        self.stored_bytes = stored_bytes
+        self.num_datasets = 0 if is_group else 1
+        self.children = []
+
+    @property
+    def ratio(self):
+        """Compression ratio of logical to stored bytes, None if nothing is
+        stored."""
+        return self.logical_bytes / self.stored_bytes if self.stored_bytes else None
+
+    @property
+    def chunk_bytes(self):
+        """Bytes of a chunk, None if not chunked."""
+        if self.chunks is None:
+            return None
+        return int(np.prod(self.chunks)) * np.dtype(self.dtype).itemsize
+
+    def _describe(self):
+        if self.is_group:
+            msg = f'Group {self.path}'
+        else:
+            msg = f'{self.path}::{self.shape} {self.dtype}'
+        if self.type_id is not None:
+            msg += f' (py-type: {self.type_id})'
+        if self.filters:
+            msg += f' [{"+".join(self.filters)}]'
+        if self.chunks is not None:
+            msg += f' chunks {self.chunks}'
+
+        msg += (f' {_format_bytes(self.logical_bytes)} ->'
+                f' {_format_bytes(self.stored_bytes)}')
+        if self.ratio is not None:
+            msg += f' ({self.ratio:.2f}x)'
+        if self.is_group:
+            msg += f', {self.num_datasets} datasets'
+        return msg
+
+    def render(self, max_depth=None, max_children=None,
+               max_lines=MAX_RENDER_LINES):
+        """Renders the entry and its children as tree.
+
+        Parameters
+        ------------
+        max_depth: `int`
+            Levels of children to render, defaults to all.
+        max_children: `int`
+            Children rendered per group, defaults to
+            `config.max_tree_children`. Children are sorted by stored bytes,
+            largest first.
+        max_lines: `int`
+            Maximum number of lines.
+        """
+        if max_children is None:
+            max_children = config.max_tree_children
+        lines = [self._describe()]
+
+        def _walk(entry, markers, depth):
+            if max_depth is not None and depth > max_depth:
+                return
+            children = sorted(entry.children, key=lambda c: c.stored_bytes,
+                              reverse=True)[:max_children]
+            omitted = len(entry.children) - len(children)
+
+            for index, child in enumerate(children):
+                if len(lines) >= max_lines:
+                    if len(lines) == max_lines:
+                        lines.append(f'{markers}└─> ...output truncated')
+                    return
+                last = not omitted and index == len(children) - 1
+                lines.append(f'{markers}{"└─ " if last else "├─ "}'
+                             f'{child._describe()}')
+                _walk(child, markers + ('   ' if last else '│  '), depth + 1)
+
+            if omitted and len(lines) < max_lines:
+                lines.append(f'{markers}└─> ...and {omitted} more omitted')
+
+        _walk(self, '', 1)
+        return '\n'.join(lines)
+
+    def walk(self):
+        """Iterates over the entry and all entries below it, depth first."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def to_frame(self):
+        """Table of the entry and all entries below it, one row per key."""
+        rows = [(e.path, e.is_group, e.type_id, e.shape, e.dtype, e.chunks,
+                 e.chunk_bytes, '+'.join(e.filters or ()), e.logical_bytes,
+                 e.stored_bytes, e.ratio) for e in self.walk()]
+        return pd.DataFrame(rows, columns=[
+            'path', 'is_group', 'type_id', 'shape', 'dtype', 'chunks',
+            'chunk_bytes', 'filters', 'logical_bytes', 'stored_bytes',
+            'ratio']).set_index('path')
+
+    def __repr__(self):
+        return self.render()
+
+
+def _dataset(loc, name, path, type_id):
+    dsid = h5py.h5d.open(loc, name.encode())
+    dcpl = dsid.get_create_plist()
+    filters = [dcpl.get_filter(i)[0] for i in range(dcpl.get_nfilters())]
+    chunks = dcpl.get_chunk() if dcpl.get_layout() == h5py.h5d.CHUNKED else None
+    shape = dsid.shape
+    return Entry(path, False, type_id, shape=shape, dtype=str(dsid.dtype),
+                 chunks=chunks,
+                 filters=[FILTER_NAMES.get(f, str(f)) for f in filters],
+                 logical_bytes=int(np.prod(shape)) * dsid.dtype.itemsize,
+                 stored_bytes=dsid.get_storage_size())
+
+
+def _inspect(group, entry, depth, max_depth):
+    path = entry.path.rstrip('/')
+    for name, is_group, type_id, _ in structure.scan(group):
+        if is_group:
+            child = _inspect(group[name], Entry(f'{path}/{name}', True, type_id),
+                             depth + 1, max_depth)
+        else:
+            child = _dataset(group.id, name, f'{path}/{name}', type_id)
+
+        entry.logical_bytes += child.logical_bytes
+        entry.stored_bytes += child.stored_bytes
+        entry.num_datasets += child.num_datasets
+        if max_depth is None or depth <= max_depth:
+            entry.children.append(child)
+
+    return entry
+
+
+def inspect(hdf, group='/', max_depth=None):
+    """
+    Inspects the storage of a file from metadata only.
+
+    Parameters
+    ------------
+    hdf: `str`, `Path`, `h5py.Group` or `LazyHdfDict`
+        File to inspect. Paths are opened read only, a `LazyHdfDict` is
+        inspected from its group.
+    group: `str`
+        Group to inspect for paths and files, defaults to the root.
+    max_depth: `int`
+        Levels of entries kept, deeper keys only count to the totals.
+
+    Returns
+    -------
+    entry: `Entry`
+        Entry of the group with its children.
+    """
+    if isinstance(hdf, (str, Path)):
+        with h5py.File(hdf, 'r') as h5file:
+            return inspect(h5file, group, max_depth)
+
+    if hasattr(hdf, 'h5file'):  # LazyHdfDict
+        if not hdf.h5file:
+            return inspect(hdf._h5filename, hdf.group, max_depth)
+        hdf, group = hdf.h5file, hdf.group
+
+    hdf = hdf[group]
+    type_id = hdf.attrs.get(structure.TYPEID, None)
+    entry = _inspect(hdf, Entry(hdf.name, True, type_id), 1, max_depth)
+    logger.debug(f'Inspected {entry.num_datasets} datasets in {hdf.name}')
+    return entry
@@ -0,0 +1,197 @@
+"""
+Parallel chunk compression and decompression for large arrays. HDF5 runs its
+filters serially, so chunks are compressed in a thread pool here and the
+compressed chunks are written directly to the file. Reading works the other
+way round: raw chunks are read from the file and decompressed in a thread
+pool into a preallocated array. `zlib` releases the GIL, thus threads scale
+over the available cores. The files are default hdf files using the deflate
+and shuffle filters.
+
+Only gzip compression with an optional shuffle is supported this way, other
+filters are handled by HDF5 itself.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice, product
+from logging import getLogger
+import zlib
+import h5py
+import numpy as np
+
+from . import config, filters
+
+logger = getLogger(__package__)
+
+
+def supports(spec, array):
+    """Checks if an array with the normalized compression spec can be written
+    with parallel chunk compression. Arrays fitting into a single chunk are
+    not worth the pool."""
+    if (spec['workers'] < 2 or spec['filter'] != 'gzip' or spec['fletcher32']
+            or array.ndim == 0 or array.dtype.kind not in 'biufcSV'
+            or array.dtype.hasobject):
+        return False
+    return _multiple_chunks(array.shape, chunk_shape(spec, array))
+
+
+def chunk_shape(spec, array):
+    """Chunk shape of a new dataset of the array, following the chunk policy
+    of the spec or as chosen by `h5py`."""
+    chunks = filters.dataset_kwargs(spec, array.shape, array.dtype).get('chunks')
+    if chunks is None:
+        chunks = h5py.filters.guess_chunk(array.shape, None, array.dtype.itemsize)
+    return chunks
+
+
+def _multiple_chunks(shape, chunks):
+    return any(s > c for s, c in zip(shape, chunks))
+
+
+def supports_read(dataset):
+    """Checks if a dataset can be read with parallel chunk decompression."""
+    if (config.read_workers < 2 or dataset.chunks is None
+            or dataset.dtype.kind not in 'biufcSV' or dataset.dtype.hasobject):
+        return False
+
+    plist = dataset.id.get_create_plist()
+    codes = [plist.get_filter(i)[0] for i in range(plist.get_nfilters())]
+    if h5py.h5z.FILTER_DEFLATE not in codes or any(
+            c not in (h5py.h5z.FILTER_DEFLATE, h5py.h5z.FILTER_SHUFFLE) for c in codes):
+        return False
+
+    # A single chunk is not worth the pool
+    return _multiple_chunks(dataset.shape, dataset.chunks)
+
+
+def _chunk_offsets(shape, chunks):
+    """Yields the offsets of all chunks of a dataset in C order."""
+    return product(*(range(0, s, c) for s, c in zip(shape, chunks)))
+
+
+def _shuffle(buffer, itemsize):
+    """Byte shuffle as done by the HDF5 shuffle filter."""
+    if itemsize == 1:
+        return buffer
+    return np.frombuffer(buffer, np.uint8).reshape(-1, itemsize).T.tobytes()
+
+
+def _unshuffle(buffer, itemsize):
+    """Reverts the byte shuffle of the HDF5 shuffle filter."""
+    if itemsize == 1:
+        return buffer
+    return np.frombuffer(buffer, np.uint8).reshape(itemsize, -1).T.tobytes()
+
+
+def _compress_chunk(array, offset, chunks, level, shuffle):
+    """Compresses the chunk at `offset`. Edge chunks are padded with zeros,
+    HDF5 always stores complete chunks."""
+    selection = tuple(slice(o, o + c) for o, c in zip(offset, chunks))
+    block = array[selection]
+    if block.shape != tuple(chunks):
+        padded = np.zeros(chunks, dtype=array.dtype)
+        padded[tuple(slice(0, s) for s in block.shape)] = block
+        block = padded
+
+    buffer = np.ascontiguousarray(block).tobytes()
+    if shuffle:
+        buffer = _shuffle(buffer, array.dtype.itemsize)
+    return zlib.compress(buffer, level)
+
+
+def write_chunks(dataset, array, spec):
+    """Compresses `array` chunk by chunk in a thread pool and writes the
+    compressed chunks directly to `dataset`.
+
+    Parameters
+    ------------
+    dataset: `h5py.Dataset`
+        Chunked dataset with gzip compression, created with the shape and
+        dtype of `array`.
+    array: `np.ndarray`
+        Data to write.
+    spec: `dict`
+        Normalized compression spec, see `filters`.
+    """
+    array = np.asarray(array, dtype=dataset.dtype)
+    chunks = dataset.chunks
+    level = 4 if spec['opts'] is None else spec['opts']
+    workers = spec['workers']
+
+    logger.debug(f'Compressing {dataset.name} with {workers} threads')
+    offsets = _chunk_offsets(array.shape, chunks)
+    with ThreadPoolExecutor(workers) as executor:
+        # Submitting in windows bounds the compressed chunks held in memory
+        while True:
+            window = list(islice(offsets, 4 * workers))
+            if not window:
+                break
+            futures = [executor.submit(_compress_chunk, array, offset, chunks,
+                                       level, spec['shuffle'])
+                       for offset in window]
+            for offset, future in zip(window, futures):
+                dataset.id.write_direct_chunk(offset, future.result())
+
+
+def _decompress_chunk(out, raw, offset, chunks, filters, filter_mask):
+    """Decompresses a raw chunk and places it at `offset` in `out`. Filters
+    are reverted in reverse order, skipping those flagged in the mask."""
+    for index in reversed(range(len(filters))):
+        if filter_mask & (1 << index):
+            continue
+        if filters[index] == h5py.h5z.FILTER_DEFLATE:
+            raw = zlib.decompress(raw)
+        else:
+            raw = _unshuffle(raw, out.dtype.itemsize)
+
+    block = np.frombuffer(raw, dtype=out.dtype).reshape(chunks)
+    selection = tuple(slice(o, min(o + c, s))
+                      for o, c, s in zip(offset, chunks, out.shape))
+    out[selection] = block[tuple(slice(0, s.stop - s.start) for s in selection)]
+
+
+def read_chunks(dataset, out=None):
+    """Reads a chunked gzip dataset by decompressing its chunks in a thread
+    pool. Raw chunks are read serially since `h5py` holds a global lock on
+    file access.
+
+    Parameters
+    ------------
+    dataset: `h5py.Dataset`
+        Dataset to read, see `supports_read`.
+    out: `np.ndarray`, optional
+        C-contiguous array of the shape and dtype of the dataset to read
+        into. Allocated if not given.
+
+    Returns
+    -------
+    value: `np.ndarray`
+        Full content of the dataset.
+    """
+    chunks = dataset.chunks
+    workers = config.read_workers
+    plist = dataset.id.get_create_plist()
+    filters = [plist.get_filter(i)[0] for i in range(plist.get_nfilters())]
+
+    if out is None:
+        out = np.empty(dataset.shape, dtype=dataset.dtype)
+    logger.debug(f'Decompressing {dataset.name} with {workers} threads')
+    offsets = _chunk_offsets(dataset.shape, chunks)
+    with ThreadPoolExecutor(workers) as executor:
+        # Reading in windows bounds the raw chunks held in memory
+        while True:
+            window = list(islice(offsets, 4 * workers))
+            if not window:
+                break
+            futures = []
+            for offset in window:
+                if dataset.id.get_chunk_info_by_coord(offset).byte_offset is None:
+                    selection = tuple(slice(o, o + c) for o, c in zip(offset, chunks))
+                    out[selection] = dataset.fillvalue
+                    continue
+                filter_mask, raw = dataset.id.read_direct_chunk(offset)
+                futures.append(executor.submit(
+                    _decompress_chunk, out, raw, offset, chunks, filters,
+                    filter_mask))
+            for future in futures:
+                future.result()
+
+    return out
@@ -0,0 +1,170 @@
+"""
+Profiling hooks for saving, loading and lazy reads. Every dataset touched,
+every file opened and every lazy access is reported as `Event` to the
+registered hooks. Without hooks nothing is measured, the instrumented code
+only checks `active`.
+
+Kinds of events:
+
+* `save`, `load`, `update`: a whole file, the stored bytes are the size on
+  disk.
+* `open`, `reopen`: opening a file on loading and the fallback reopening of
+  closed files, see `config.allow_fallback_open`.
+* `pack`, `unpack`: a dataset or type-tagged group, e.g. a list or frame,
+  with the bytes of all datasets in it. Elements of groups are not reported
+  on their own.
+* `lazy`: resolving a key of a `LazyHdfDict`, including its `unpack` event.
+* `slice`: a partial read of a `LazyArray`, `RaggedList` or `LazyFrame`. The
+  stored bytes are estimated from the fraction read.
+
+Bytes are taken from metadata: `nbytes` is the logical size of the data,
+`stored_bytes` the size in the file and `decompressed_bytes` the logical size
+if the dataset has filters. Variable length data is counted by its references.
+
+Example
+-------
+>>> with Collector() as collector:
+...     data = itsh5py.load('data.hdf')
+>>> collector.summary(by='codec')
+>>> collector.slowest(5)
+"""
+from collections import namedtuple
+from time import perf_counter
+import threading
+from logging import getLogger
+import h5py
+import pandas as pd
+
+from .structure import TYPEID
+
+logger = getLogger(__package__)
+
+Event = namedtuple('Event', ['kind', 'file', 'key', 'seconds', 'nbytes',
+                             'stored_bytes', 'decompressed_bytes', 'codec'])
+
+active = False  # True if any hook is registered
+
+_hooks = []
+_lock = threading.Lock()
+_state = threading.local()  # depth of nested events per thread
+
+
+def add_hook(hook):
+    """Registers a callable getting every `Event`."""
+    global active
+    with _lock:
+        _hooks.append(hook)
+        active = True
+
+
+def remove_hook(hook):
+    """Removes a hook, raises ValueError if it is not registered."""
+    global active
+    with _lock:
+        _hooks.remove(hook)
+        active = bool(_hooks)
+
+
+def enter():
+    """Starts an event, returns the start time or None if the thread is within
+    another event already. Must be paired with `leave`."""
+    depth = getattr(_state, 'depth', 0)
+    _state.depth = depth + 1
+    return perf_counter() if not depth else None
+
+
+def leave():
+    _state.depth -= 1
+
+
+def emit(kind, file, key, start, nbytes=0, stored_bytes=0,
+         decompressed_bytes=0, codec=None):
+    """Passes an event which started at `perf_counter()` time `start` to all
+    hooks."""
+    event = Event(kind, file, key, perf_counter() - start, nbytes,
+                  stored_bytes, decompressed_bytes, codec)
+    for hook in list(_hooks):
+        hook(event)
+
+
+def dataset_bytes(dataset):
+    """Logical, stored and decompressed bytes of a dataset from metadata."""
+    nbytes = dataset.size * dataset.dtype.itemsize
+    filtered = dataset.id.get_create_plist().get_nfilters() > 0
+    return nbytes, dataset.id.get_storage_size(), nbytes if filtered else 0
+
+
+def group_bytes(group):
+    """Sums of the bytes of all datasets in a group, see `dataset_bytes`."""
+    totals = [0, 0, 0]
+
+    def _add(name, item):
+        if isinstance(item, h5py.Dataset):
+            for i, nbytes in enumerate(dataset_bytes(item)):
+                totals[i] += nbytes
+    group.visititems(_add)
+    return tuple(totals)
+
+
+def record(kind, item, start, codec=None, nbytes=None):
+    """Emits an event of a dataset or group. If `nbytes` is given, only this
+    part of a dataset was read and the other bytes are scaled to it."""
+    if isinstance(item, h5py.Dataset):
+        total, stored, decompressed = dataset_bytes(item)
+        if nbytes is not None and total:
+            stored = stored * nbytes // total
+            decompressed = decompressed * nbytes // total
+        else:
+            nbytes = total
+    else:
+        nbytes, stored, decompressed = group_bytes(item)
+
+    if codec is None:
+        codec = item.attrs.get(TYPEID, None)
+    emit(kind, item.file.filename, item.name, start, nbytes, stored,
+         decompressed, codec)
+
+
+class Collector:
+    """
+    Hook collecting all events while used as context manager.
+
+    Attributes
+    ------------
+    events: `list`
+        Collected `Event` tuples in the order of their end.
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(event)
+
+    def __enter__(self):
+        add_hook(self)
+        return self
+
+    def __exit__(self, *exc):
+        remove_hook(self)
+
+    def to_frame(self):
+        """Events as `pandas.DataFrame`, one row per event."""
+        return pd.DataFrame(self.events, columns=Event._fields)
+
+    def summary(self, by='kind'):
+        """Aggregated statistics grouped by one or more event fields, e.g.
+        `kind`, `codec` or `file`."""
+        frame = self.to_frame()
+        return frame.groupby(by, dropna=False).agg(
+            count=('seconds', 'size'), seconds=('seconds', 'sum'),
+            mean_seconds=('seconds', 'mean'), max_seconds=('seconds', 'max'),
+            nbytes=('nbytes', 'sum'), stored_bytes=('stored_bytes', 'sum'),
+            decompressed_bytes=('decompressed_bytes', 'sum'))
+
+    def slowest(self, n=10, kind=None):
+        """The `n` slowest events, of one kind only if given."""
+        frame = self.to_frame()
+        if kind is not None:
+            frame = frame[frame['kind'] == kind]
+        return frame.nlargest(n, 'seconds')
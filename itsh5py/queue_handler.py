@@ -2,52 +2,120 @@
 Base module to handle the queue of open (in memory) files. The main
 important settings of how many filse are allowed (`max_open_files`) and
 the currently open files are exposed in the main API.
+
+The queue is a least recently used cache keyed by the resolved absolute path
+of a file. Each entry remembers inode and modification time of the file on
+opening, so a file which was replaced on disk is not returned from memory.
+Files are evicted on adding a file when there are more than `max_open_files`
+or, if set, when the estimated memory of all open handles exceeds
+`max_open_bytes`. Lookups do not touch the handles. All operations are
+thread-safe.
 """
-from collections import deque
+from collections import OrderedDict
+from pathlib import Path
 import atexit
+import threading
 from logging import getLogger
 
 logger = getLogger(__package__)
 
-open_files = deque()
+open_files = OrderedDict()  # resolved path -> (identity, LazyDict), oldest first
 max_open_files = 12
+max_open_bytes = None
+
+_lock = threading.RLock()
+
+
+def _resolve(filepath):
+    """Resolved absolute path of a file as string, used as key."""
+    return str(Path(filepath).resolve())
+
+
+def _identity(path):
+    """Inode and modification time of a file or None if it does not exist."""
+    try:
+        stat = Path(path).stat()
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns)
+
+
+def handle_bytes(lazy_dict):
+    """Estimates the memory held by an open file handle. This is the current
+    size of the metadata cache plus the size of the raw data chunk cache."""
+    h5file = lazy_dict.h5file
+    if not h5file:
+        return 0
+    cache_bytes = h5file.id.get_access_plist().get_cache()[2]
+    return h5file.id.get_mdc_size()[2] + cache_bytes
+
+
+def _evict():
+    """Closes least recently used files until the limits are met."""
+    while len(open_files) > max_open_files:
+        _, (_, lazy_dict) = open_files.popitem(last=False)
+        close(lazy_dict)
+        logger.debug('Removed file from queue due to size limit')
+
+    if max_open_bytes is not None:
+        sizes = OrderedDict((k, handle_bytes(h)) for k, (_, h) in open_files.items())
+        total = sum(sizes.values())
+        while total > max_open_bytes and len(open_files) > 1:
+            key, (_, lazy_dict) = open_files.popitem(last=False)
+            total -= sizes[key]
+            close(lazy_dict)
+            logger.debug('Removed file from queue due to memory limit')
 
 
 def add_open_file(lazy_dict):
     """Adds a file (or better a LazyDict reference) to the queue."""
-    if len(open_files) >= max_open_files:
-        close(open_files.pop())
-        logger.debug('Removed file from queue due to size limit')
+    filename = lazy_dict.h5file.filename
+    key = _resolve(filename)
+    with _lock:
+        if key in open_files:
+            close(open_files.pop(key)[1])
+        open_files[key] = (_identity(key), lazy_dict)
+        _evict()
 
-    open_files.appendleft(lazy_dict)
-    logger.debug(f'Added new file to queue: {lazy_dict.h5file.filename}')
+    logger.debug(f'Added new file to queue: {filename}')
 
 
 def is_open(filepath):
-    """Checks if a file is in the queue and thus oenened in memory."""
-    filenames = [h.h5file.filename for h in open_files]
-    if filepath.name in filenames:
-        logger.debug(f'File {filepath.name} found in memory - returning...')
-        return open_files[filenames.index(filepath.name)]
-    else:
-        return None
+    """Checks if a file is in the queue and thus oenened in memory. A hit
+    marks the file as most recently used, the limits are enforced when files
+    are added."""
+    key = _resolve(filepath)
+    with _lock:
+        entry = open_files.get(key)
+        if entry is None:
+            return None
+
+        identity, lazy_dict = entry
+        if identity != _identity(key) or not lazy_dict.h5file:
+            logger.debug(f'File {key} changed on disk or was closed - dropping...')
+            close(lazy_dict)
+            del open_files[key]
+            return None
+
+        open_files.move_to_end(key)
+
+    logger.debug(f'File {key} found in memory - returning...')
+    return lazy_dict
 
 
 def remove_from_queue(file):
     """
     Removes file from the queue and from memory. Only if file exists.
 
-    This is more complicated than it should be. The issue is that in the queue
-    the actual LazyHdfDict are stored and comparison of those on remove can
-    fail. So comaprison is done on file name basis and removal via index.
+    The file is given by its name, which is resolved to the key of the queue.
     """
-    filenames = [h.h5file.filename for h in open_files]
-    logger.debug(f'Removing {file} from queue: {filenames}')
-    if file in filenames:
-        handle_index = filenames.index(file)
-        handle = open_files[handle_index]
-        close(handle)
-        del open_files[handle_index]
+    key = _resolve(file)
+    logger.debug(f'Removing {file} from queue')
+    with _lock:
+        entry = open_files.pop(key, None)
+
+    if entry is not None:
+        close(entry[1])
         logger.debug(f'File {file} removed from queue')
     else:
         logger.debug(f'File {file} not found in queue, can not remove!')
@@ -60,8 +128,9 @@ def close(lazy_dict):
 
 
 def open_filenames():
-    """Show file paths of open files"""
-    return [h.h5file.filename for h in open_files]
+    """Show file paths of open files, most recently used first"""
+    with _lock:
+        return [h.h5file.filename for _, h in reversed(open_files.values())]
 
 
 @atexit.register
@@ -70,5 +139,6 @@ def cleanup():
     This will be run atexit and ensures that no references persist in
     memory and all hdf files are freed.
     """
-    for lzd in open_files:
-        close(lzd)
+    with _lock:
+        for _, lzd in open_files.values():
+            close(lzd)
@@ -0,0 +1,83 @@
+"""
+Registry of codecs for custom types. A codec converts values of its types to
+data `h5py` can store, e.g. an array, a scalar or a str, and back. The dataset
+is tagged with the type id of the codec, so loading is a lookup by type id.
+
+Codecs are checked before the builtin types when packing, thus a codec for a
+builtin type (e.g. `list`) replaces the builtin packing of that type. Values of
+a codec are stored as single dataset and are not sliceable when lazy.
+
+Example
+-------
+>>> from fractions import Fraction
+>>> import numpy as np
+>>> register_codec('fraction', Fraction,
+...                encode=lambda f: np.array([f.numerator, f.denominator]),
+...                decode=lambda a: Fraction(int(a[0]), int(a[1])))
+"""
+from collections import namedtuple
+from logging import getLogger
+
+logger = getLogger(__package__)
+
+Codec = namedtuple('Codec', ['type_id', 'types', 'encode', 'decode'])
+
+# Type ids used by the builtin packing, these can not be registered
+BUILTIN_TYPE_IDS = ('tuple', 'list', 'path_list', 'path_tuple', 'list_str',
+                    'str_array', 'strArray', 'list_arr', 'path', 'yaml',
+                    'json', 'datetime', 'datetime64', 'ragged')
+
+_codecs = {}  # type id -> Codec
+_by_type = {}  # type -> Codec or None, filled on lookup
+
+
+def register_codec(type_id, types, encode, decode):
+    """Registers a codec for custom types. A codec registered with the type id
+    of an existing codec replaces it.
+
+    Parameters
+    ------------
+    type_id: `str`
+        Identifier stored with the dataset.
+    types: `type` or `tuple` of `type`
+        Types packed with this codec, subclasses included.
+    encode: `callable`
+        Gets the value and returns data storable by `h5py`.
+    decode: `callable`
+        Gets the data as read from the dataset and returns the value.
+    """
+    if type_id in BUILTIN_TYPE_IDS:
+        raise ValueError(f'Type id {type_id} is used by builtin types')
+    if not isinstance(types, tuple):
+        types = (types, )
+
+    _codecs[type_id] = Codec(type_id, types, encode, decode)
+    _by_type.clear()
+    logger.debug(f'Registered codec {type_id} for {types}')
+
+
+def unregister_codec(type_id):
+    """Removes a codec, files using it can not be loaded afterwards."""
+    if _codecs.pop(type_id, None) is None:
+        raise KeyError(f'No codec registered for {type_id}')
+    _by_type.clear()
+
+
+def find(value):
+    """Returns the codec packing `value` or None. Lookups are cached by type."""
+    if not _codecs:
+        return None
+
+    value_type = type(value)
+    try:
+        return _by_type[value_type]
+    except KeyError:
+        codec = next((c for c in _codecs.values()
+                      if issubclass(value_type, c.types)), None)
+        _by_type[value_type] = codec
+        return codec
+
+
+def get(type_id):
+    """Returns the codec of a type id or None."""
+    return _codecs.get(type_id, None)
@@ -0,0 +1,249 @@
+"""
+Structure of hdf files: native scanning of groups and the persisted structure
+index.
+
+The index lists the children of every plain group with their type ids and,
+for datasets, shape, dtype, byte offset and filters. Lazy files list their
+groups from the index instead of the file, so reopening a file does not touch
+its metadata. Set `config.structure_index` to
+
+* `'file'` to store the index in the file on saving. It is checked against
+  the keys of the root group and the size of the file on loading, so files
+  changed by other tools are scanned. Groups of open files are scanned if
+  their number of children differs from the index, e.g. after deleting a key
+  which kept the size of the file.
+* `'sidecar'` to store the index as json next to the file. It is checked
+  against size, modification time and a hash of the head and tail of the
+  file. A missing or outdated sidecar is written on loading.
+"""
+import hashlib
+import json
+from pathlib import Path
+from logging import getLogger
+import h5py
+import numpy as np
+
+from . import config
+
+logger = getLogger(__package__)
+
+TYPEID = '_TYPE_'
+
+# Dataset in the root group holding the index, hidden on loading
+INDEX_NAME = '_INDEX_'
+SIDECAR_SUFFIX = '.index.json'
+INDEX_VERSION = 2
+# Attribute of the index holding the size of the file after writing it
+INDEX_FILE_SIZE = '_FILE_SIZE_'
+
+# Root attribute counting the bytes lost by in-place updates, hidden on
+# loading, see `inplace`
+DEAD_BYTES = '_DEAD_BYTES_'
+
+# Bytes of head and tail of a file hashed to check a sidecar
+FINGERPRINT_BYTES = 2**16
+
+_TYPEID_BYTES = TYPEID.encode()
+_INDEX_BYTES = INDEX_NAME.encode()
+
+
+def object_tags(loc, name, num_attrs):
+    """Reads the type id of an object and if it is pandas data, passing once
+    over the names of its attributes. Objects without attributes are not
+    opened."""
+    if not num_attrs:
+        return None, False
+
+    oid = h5py.h5o.open(loc, name)
+    names = []
+    h5py.h5a.iterate(oid, names.append)
+
+    type_id = None
+    if _TYPEID_BYTES in names:
+        aid = h5py.h5a.open(oid, _TYPEID_BYTES)
+        value = np.empty(aid.shape, dtype=aid.dtype)
+        aid.read(value)
+        type_id = value[()]
+        if isinstance(type_id, bytes):
+            type_id = type_id.decode()
+
+    return type_id, b'pandas_type' in names
+
+
+def scan(group, limit=None):
+    """Lists the children of a group with their type tags by native link
+    iteration, without creating `h5py` objects. The index is left out.
+
+    Parameters
+    ------------
+    group: `h5py.Group`
+        Group to list.
+    limit: `int`
+        Stops after this many children, defaults to all.
+
+    Returns
+    -------
+    objects: `list`
+        `(name, is_group, type_id, is_pandas)` per child.
+    """
+    loc = group.id
+    if limit is None:
+        names = loc
+    else:
+        # Iterating the group id lists all names, stop early instead
+        names = []
+
+        def _collect(name):
+            if name != _INDEX_BYTES:
+                names.append(name)
+            return 1 if len(names) >= limit else None
+
+        if limit > 0:
+            loc.links.iterate(_collect)
+
+    objects = []
+    for name in names:
+        if name == _INDEX_BYTES:
+            continue
+        info = h5py.h5o.get_info(loc, name)
+        objects.append((name.decode(), info.type == h5py.h5o.TYPE_GROUP)
+                       + object_tags(loc, name, info.num_attrs))
+
+    return objects
+
+
+def count(group):
+    """Number of children of a group, the index left out."""
+    num = group.id.get_num_objs()
+    if group.name == '/' and INDEX_NAME in group:
+        num -= 1
+    return num
+
+
+def _dataset_info(loc, name):
+    """Shape, dtype, byte offset (None if chunked) and filter ids with chunk
+    shape of a dataset."""
+    dsid = h5py.h5d.open(loc, name.encode())
+    dcpl = dsid.get_create_plist()
+    filter_ids = [dcpl.get_filter(i)[0] for i in range(dcpl.get_nfilters())]
+    chunks = dcpl.get_chunk() if dcpl.get_layout() == h5py.h5d.CHUNKED else None
+    return [list(dsid.shape), dsid.dtype.str, dsid.get_offset(),
+            {'filters': filter_ids, 'chunks': chunks}]
+
+
+def build(h5file):
+    """Builds the index of an open file.
+
+    Returns
+    -------
+    index: `dict`
+        Maps the path of every plain group to the list of its children, each
+        `[name, is_group, type_id, is_pandas, shape, dtype, offset,
+        compression]`. The dataset fields are None for groups.
+    """
+    groups = {}
+
+    def _walk(group, path):
+        children = []
+        for name, is_group, type_id, is_pandas in scan(group):
+            if is_group:
+                children.append([name, True, type_id, is_pandas, None, None,
+                                 None, None])
+                if type_id is None and not is_pandas:
+                    _walk(group[name], f'{path.rstrip("/")}/{name}')
+            else:
+                children.append([name, False, type_id, is_pandas]
+                                + _dataset_info(group.id, name))
+        groups[path] = children
+
+    _walk(h5file, '/')
+    return groups
+
+
+def _root_keys(h5file):
+    return sorted(name.decode() for name in h5file.id if name != _INDEX_BYTES)
+
+
+def _fingerprint(path):
+    """Size, modification time and hash of head and tail of a file."""
+    stat = Path(path).stat()
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_BYTES))
+        f.seek(max(0, stat.st_size - FINGERPRINT_BYTES))
+        digest.update(f.read())
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+            'hash': digest.hexdigest()}
+
+
+def sidecar_path(path):
+    """Path of the sidecar index of a file."""
+    path = Path(path)
+    return path.parent / (path.name + SIDECAR_SUFFIX)
+
+
+def write(h5file):
+    """Writes the index into a file open for writing, replacing an old one."""
+    groups = build(h5file)
+    text = json.dumps({'version': INDEX_VERSION, 'root': _root_keys(h5file),
+                       'groups': groups}, separators=(',', ':'))
+    if INDEX_NAME in h5file:
+        del h5file[INDEX_NAME]
+    index = h5file.create_dataset(INDEX_NAME, compression='gzip',
+                                  data=np.frombuffer(text.encode(), np.uint8))
+    # The attribute is created first, so setting its value keeps the size
+    index.attrs[INDEX_FILE_SIZE] = np.int64(0)
+    h5file.flush()
+    index.attrs[INDEX_FILE_SIZE] = np.int64(h5file.id.get_filesize())
+    logger.debug(f'Stored structure index of {len(groups)} groups in {h5file.filename}')
+
+
+def write_sidecar(path, h5file=None):
+    """Writes the sidecar index of a closed file or from an open handle."""
+    if h5file is None:
+        with h5py.File(path, 'r') as handle:
+            groups = build(handle)
+    else:
+        groups = build(h5file)
+
+    text = json.dumps({'version': INDEX_VERSION, 'file': _fingerprint(path),
+                       'groups': groups}, separators=(',', ':'))
+    sidecar_path(path).write_text(text)
+    logger.debug(f'Wrote structure index sidecar of {path}')
+    return groups
+
+
+def read(h5file):
+    """Returns the groups of a valid index of an open file, following
+    `config.structure_index`, or None. A missing or outdated sidecar is
+    written."""
+    if config.structure_index == 'file':
+        if INDEX_NAME not in h5file:
+            return None
+        dataset = h5file[INDEX_NAME]
+        size = dataset.attrs.get(INDEX_FILE_SIZE, None)
+        index = json.loads(dataset[()].tobytes())
+        if (index['version'] != INDEX_VERSION or size != h5file.id.get_filesize()
+                or index['root'] != _root_keys(h5file)):
+            logger.debug(f'Structure index of {h5file.filename} is outdated')
+            return None
+        return index['groups']
+
+    if config.structure_index == 'sidecar':
+        path = sidecar_path(h5file.filename)
+        try:
+            index = json.loads(path.read_text())
+            if (index['version'] == INDEX_VERSION
+                    and index['file'] == _fingerprint(h5file.filename)):
+                return index['groups']
+        except (OSError, ValueError, KeyError):
+            ...
+
+        logger.debug(f'Sidecar index of {h5file.filename} missing or outdated')
+        try:
+            return write_sidecar(h5file.filename, h5file)
+        except OSError:
+            logger.warning(f'Cant write sidecar index of {h5file.filename}')
+            return build(h5file)
+
+    return None
@@ -0,0 +1,97 @@
+"""
+Streaming writer for hdf files. Data can be appended to datasets block by
+block which keeps the memory of the writing process bounded, e.g. for long
+running acquisitions.
+"""
+from logging import getLogger
+import h5py
+
+from .hdf_support import LazyHdfDict, _append_block, _save_path, pack_dataset
+from . import config, filters, structure
+
+logger = getLogger(__package__)
+
+
+class HdfWriter:
+    """
+    Keeps a file open for writing and appends rows or blocks to named keys.
+    Keys can be paths like `group/sub/key` and nested groups are created on
+    the go. Appendable datasets are chunked and resizable along their first
+    axis, thus the resulting files are default hdf files which can be read
+    with `load`.
+
+    The writer can be used as a context manager, else `close` must be called.
+
+    Parameters
+    ------------
+    hdf: `string`, `Path`
+        Path to File
+    compress: `tuple`, `str`, `int` or `dict`, optional
+        Compression spec used for new datasets, see `filters`. Defaults to
+        `config.default_compression`.
+    args, kwargs:
+        Passed to the `h5py.File` constructor.
+    """
+
+    def __init__(self, hdf, compress=None, *args, **kwargs):
+        self.filename = _save_path(hdf)
+        self.compress = config.default_compression if compress is None else compress
+
+        if config.allow_overwrite:
+            file_mode = 'w'
+        else:
+            file_mode = 'a'
+
+        self.h5file = h5py.File(self.filename, file_mode, *args, **kwargs)
+        logger.debug(f'Opened {self.filename} for streaming')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, key, block):
+        """Appends `block` to the dataset `key`.
+
+        A block with one dimension less than the dataset is appended as a
+        single row, else it is appended along the first axis. On the first
+        call, the dataset is created and the first axis of `block` defines
+        the rows.
+
+        Returns
+        -------
+        rows: `int`
+            Number of rows in the dataset after appending.
+        """
+        ds = _append_block(self.h5file, key, block,
+                           filters.for_key(self.h5file, key, self.compress))
+        return ds.shape[0]
+
+    def write(self, key, value):
+        """Writes a complete value to `key` as `save` would. Dicts are stored
+        as groups, iterators are streamed."""
+        parent, _, name = key.rpartition('/')
+        group = self.h5file.require_group(parent) if parent else self.h5file
+
+        if isinstance(value, (dict, LazyHdfDict)):
+            group = group.create_group(name)
+            for k, v in value.items():
+                self.write(f'{group.name}/{k}', v)
+        else:
+            pack_dataset(group, name, value, self.compress)
+
+    def flush(self):
+        """Flushes buffers of the file to disk."""
+        self.h5file.flush()
+
+    def close(self):
+        """Closes the file. The structure index is written as set in
+        `config.structure_index`."""
+        if self.h5file:
+            if config.structure_index == 'file':
+                structure.write(self.h5file)
+            self.h5file.close()
+            logger.debug(f'Closed {self.filename} after streaming')
+            if config.structure_index == 'sidecar':
+                structure.write_sidecar(self.filename)
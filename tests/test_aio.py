@@ -0,0 +1,101 @@
+"""
+Tester for the asyncio support.
+"""
+import asyncio
+import unittest
+import logging
+import numpy as np
+from numpy.testing import assert_array_equal
+import itsh5py
+from itsh5py import aio
+
+logger = logging.getLogger('itsh5py')
+
+
+class TestAsync(unittest.TestCase):
+    def setUp(self):
+        self.test_data = {'array': np.random.random((100, 10)),
+                          'group': {'list_type': [1, 'a']},
+                          }
+
+    def test_eager(self):
+        itsh5py.config.use_lazy = False
+
+        async def _main():
+            test_file = await itsh5py.asave('test_aio', self.test_data)
+            loaded = await asyncio.gather(*(itsh5py.aload(test_file)
+                                            for _ in range(4)))
+            return test_file, loaded
+
+        test_file, loaded = asyncio.run(_main())
+        for data in loaded:
+            assert_array_equal(data['array'], self.test_data['array'])
+            self.assertEqual(data['group'], self.test_data['group'])
+        test_file.unlink()
+
+    def test_lazy(self):
+        itsh5py.config.use_lazy = True
+        itsh5py.config.use_lazy_arrays = True
+
+        async def _main():
+            test_file = await itsh5py.asave('test_aio_lazy', self.test_data)
+            data = await itsh5py.aload(test_file)
+            array = await itsh5py.aget(data, 'array')
+            part = await itsh5py.aget(array, slice(2, 5))
+            group = await itsh5py.aget(data, 'group')
+            values = await asyncio.gather(itsh5py.aget(group, 'list_type'),
+                                          itsh5py.aget(array, 0))
+            data.close()
+            return test_file, part, values
+
+        test_file, part, values = asyncio.run(_main())
+        assert_array_equal(part, self.test_data['array'][2:5])
+        self.assertEqual(values[0], [1, 'a'])
+        assert_array_equal(values[1], self.test_data['array'][0])
+        test_file.unlink()
+
+    def test_buffers_and_idle_gates(self):
+        itsh5py.config.use_lazy = False
+        pool = itsh5py.BufferPool()
+
+        async def _main():
+            test_file = await itsh5py.asave('test_aio_buffers', self.test_data)
+            for _ in range(2):
+                data = await itsh5py.aload(test_file, buffers=pool)
+                pool.release(data)
+            return test_file, dict(aio._gates[asyncio.get_running_loop()])
+
+        test_file, gates = asyncio.run(_main())
+        self.assertEqual(pool.stats()['hits'], 1)
+        self.assertEqual(gates, {})
+        test_file.unlink()
+
+    def test_write_exclusive(self):
+        events = []
+
+        async def _main():
+            gate = aio._FileGate(2)
+
+            async def _read(i):
+                async with gate.read():
+                    events.append(f'read {i}')
+                    await asyncio.sleep(0.01)
+                    events.append(f'done {i}')
+
+            async def _write():
+                async with gate.write():
+                    events.append('write')
+                    await asyncio.sleep(0.01)
+                    events.append('written')
+
+            await asyncio.gather(_read(0), _write(), _read(1))
+
+        asyncio.run(_main())
+        start = events.index('write')
+        self.assertEqual(events[start + 1], 'written')
+        self.assertEqual(events[:start], ['read 0', 'done 0'])
+
+    def tearDown(self):
+        itsh5py.config.use_lazy = False
+        itsh5py.config.use_lazy_arrays = False
+        aio.shutdown()
@@ -0,0 +1,77 @@
+"""
+Tester for batch loading and saving in a process pool.
+"""
+import unittest
+import logging
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from numpy.testing import assert_array_equal
+import itsh5py
+
+logger = logging.getLogger('itsh5py')
+itsh5py.config.use_lazy = False  # Set lazy to False so the data can be compared.
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.datasets = {
+            Path(f'test_batch_{i}.hdf'): {
+                'data': np.random.random((10, 10)),
+                'nested': {'index': i, 'name': f'file {i}'},
+                } for i in range(5)}
+
+    def test_save_load(self):
+        results = itsh5py.save_many(self.datasets, workers=2)
+        self.assertEqual([r.path for r in results], list(self.datasets))
+        self.assertTrue(all(r.error is None for r in results))
+
+        paths = list(self.datasets) + [Path('test_batch_missing.hdf')]
+        results = itsh5py.load_many(paths, workers=2)
+        self.assertEqual([r.path for r in results], paths)
+        for result in results[:-1]:
+            self.assertIsNone(result.error)
+            assert_array_equal(result.value['data'],
+                               self.datasets[result.path]['data'])
+            self.assertEqual(result.value['nested'],
+                             self.datasets[result.path]['nested'])
+
+        self.assertIsNone(results[-1].value)
+        self.assertIsInstance(results[-1].error, Exception)
+
+    def test_selected_keys(self):
+        itsh5py.save_many(self.datasets, workers=2)
+
+        results = list(itsh5py.load_many(
+            self.datasets, keys=['nested/index'], workers=2, ordered=False))
+        self.assertEqual(len(results), len(self.datasets))
+        for result in results:
+            self.assertEqual(result.value, {
+                'nested/index': self.datasets[result.path]['nested']['index']})
+
+    def test_lazy_arrays(self):
+        itsh5py.config.use_lazy_arrays = True
+        itsh5py.config.native_frames = True
+        ragged = [np.arange(3), np.arange(5)]
+        frame = pd.DataFrame({'a': [1, 2]})
+        for data in self.datasets.values():
+            data.update({'ragged': ragged, 'frame': frame})
+        itsh5py.save_many(self.datasets, workers=2)
+
+        results = itsh5py.load_many(self.datasets, keys=['ragged', 'frame'],
+                                    workers=2)
+        for result in results:
+            self.assertIsNone(result.error)
+            for array, expected in zip(result.value['ragged'], ragged):
+                assert_array_equal(array, expected)
+            pd.testing.assert_frame_equal(result.value['frame'], frame)
+
+    def tearDown(self):
+        itsh5py.config.use_lazy_arrays = False
+        itsh5py.config.native_frames = False
+        for path in self.datasets:
+            path.unlink()
+
+
+if __name__ == '__main__':
+    unittest.main()
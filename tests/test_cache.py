@@ -0,0 +1,76 @@
+"""
+Tester for the memory budgeted value cache of lazy files.
+"""
+import unittest
+import logging
+import numpy as np
+from numpy.testing import assert_array_equal
+import itsh5py
+from itsh5py.cache import ValueCache, shared_cache
+
+logger = logging.getLogger('itsh5py')
+
+
+class TestValueCache(unittest.TestCase):
+    def setUp(self):
+        itsh5py.config.use_lazy = True
+        self.test_data = {f'data_{i}': np.random.random((100, 10))
+                          for i in range(5)}
+        self.test_file = itsh5py.save('test_cache', self.test_data)
+
+    def test_shared_budget(self):
+        itsh5py.config.cache_budget = 2 * 8000 + 1000
+        shared_cache.clear()
+        loaded = itsh5py.load(self.test_file)
+
+        for key, value in self.test_data.items():
+            assert_array_equal(loaded[key], value)
+        assert_array_equal(loaded['data_4'], self.test_data['data_4'])
+
+        stats = shared_cache.stats()
+        self.assertEqual(stats['misses'], 5)
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['evictions'], 3)
+        self.assertEqual(stats['entries'], 2)
+        self.assertLessEqual(stats['bytes'], stats['budget'])
+
+        # Evicted values are lazy again and read on access
+        assert_array_equal(loaded['data_0'], self.test_data['data_0'])
+        self.assertEqual(shared_cache.stats()['misses'], 6)
+
+        loaded.close()
+        self.assertEqual(shared_cache.stats()['entries'], 0)
+        itsh5py.config.cache_budget = None
+
+    def test_dict_cache(self):
+        loaded = itsh5py.load(self.test_file)
+        loaded.cache = ValueCache(budget=100)
+        assert_array_equal(loaded['data_0'], self.test_data['data_0'])
+        self.assertEqual(loaded.cache.stats()['entries'], 0)
+        assert_array_equal(loaded['data_0'], self.test_data['data_0'])
+        self.assertEqual(loaded.cache.stats()['misses'], 2)
+        loaded.close()
+
+    def test_not_cached(self):
+        itsh5py.config.use_lazy_arrays = True
+        test_file = itsh5py.save('test_cache_proxies', {
+            'group': {'int_type': 1}, 'array': np.arange(10), 'str_type': 'a'})
+        loaded = itsh5py.load(test_file)
+        loaded.cache = ValueCache()
+        for _ in range(3):
+            loaded['group']
+            loaded['array']
+            self.assertEqual(loaded['str_type'], 'a')
+        self.assertEqual(loaded.cache.stats()['misses'], 1)
+        self.assertEqual(loaded.cache.stats()['hits'], 2)
+        loaded.close()
+        itsh5py.config.use_lazy_arrays = False
+        test_file.unlink()
+
+    def tearDown(self):
+        self.test_file.unlink()
+        itsh5py.config.use_lazy = False
+
+
+if __name__ == '__main__':
+    unittest.main()
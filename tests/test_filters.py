@@ -0,0 +1,156 @@
+"""
+Tester for compression specs and chunk policies.
+"""
+import unittest
+import logging
+import h5py
+import numpy as np
+from numpy.testing import assert_array_equal
+import itsh5py
+from itsh5py import filters, parallel
+
+logger = logging.getLogger('itsh5py')
+itsh5py.config.use_lazy = False  # Set lazy to False so the data can be compared.
+
+
+class TestSpecs(unittest.TestCase):
+    def test_normalize(self):
+        self.assertEqual(filters.normalize((True, 3))['filter'], 'gzip')
+        self.assertEqual(filters.normalize((True, 3))['opts'], 3)
+        self.assertIsNone(filters.normalize((False, 3))['filter'])
+        self.assertEqual(filters.normalize('lzf')['filter'], 'lzf')
+        self.assertIsNone(filters.normalize('none')['filter'])
+        self.assertEqual(filters.normalize(32001)['filter'], 32001)
+
+        spec = filters.normalize({'compression': 'gzip', 'compression_opts': 1,
+                                  'shuffle': True, 'chunks': 'row'})
+        self.assertEqual((spec['filter'], spec['opts'], spec['shuffle']),
+                         ('gzip', 1, True))
+        self.assertEqual(spec['chunk_bytes'], itsh5py.config.chunk_bytes)
+
+        with self.assertRaises(ValueError):
+            filters.normalize('zstd')
+        with self.assertRaises(ValueError):
+            filters.normalize({'level': 3})
+        with self.assertRaises(ValueError):
+            filters.normalize({'chunks': 'diagonal'})
+
+    def test_chunk_shape(self):
+        shape = (1000, 500)
+        self.assertEqual(filters.chunk_shape(shape, 8, 'row', 8 * 5000), (10, 500))
+        self.assertEqual(filters.chunk_shape(shape, 8, 'column', 8 * 5000), (1000, 5))
+        self.assertEqual(filters.chunk_shape(shape, 8, 'row', 8 * 100), (1, 100))
+        self.assertEqual(filters.chunk_shape(shape, 8, (50, 1000), 0), (50, 500))
+        with self.assertRaises(ValueError):
+            filters.chunk_shape(shape, 8, (50,), 0)
+        self.assertIsNone(filters.chunk_shape(shape, 8, None, 0))
+
+        auto = filters.chunk_shape(shape, 8, 'auto', 8 * 5000)
+        self.assertLessEqual(np.prod(auto), 5000)
+
+
+class TestFilteredSave(unittest.TestCase):
+    def test_spec_and_override(self):
+        test_data = {'data': np.random.random((200, 50)),
+                     'nested': {'other': np.arange(1000)},
+                     }
+        itsh5py.config.key_compression = {'/nested/other': 'none'}
+        test_file = itsh5py.save(
+            'test_filters', test_data,
+            compress={'filter': 'lzf', 'shuffle': True, 'fletcher32': True,
+                      'chunks': 'row', 'chunk_bytes': 8 * 50 * 20})
+        itsh5py.config.key_compression = {}
+
+        with h5py.File(test_file, 'r') as h5file:
+            self.assertEqual(h5file['data'].compression, 'lzf')
+            self.assertTrue(h5file['data'].shuffle)
+            self.assertTrue(h5file['data'].fletcher32)
+            self.assertEqual(h5file['data'].chunks, (20, 50))
+            self.assertIsNone(h5file['nested/other'].compression)
+
+        test_data_loaded = itsh5py.load(test_file)
+        assert_array_equal(test_data_loaded['data'], test_data['data'])
+        assert_array_equal(test_data_loaded['nested']['other'],
+                           test_data['nested']['other'])
+        test_file.unlink()
+
+
+    def test_variable_length(self):
+        compress = {'filter': 'gzip', 'fletcher32': True}
+        test_data = {'names': ['ä', 'bb', 'c'],
+                     'data': np.arange(10.),
+                     }
+        test_file = itsh5py.save('test_filters_vlen', test_data,
+                                 compress=compress)
+        with h5py.File(test_file, 'r') as h5file:
+            self.assertFalse(h5file['names'].fletcher32)
+            self.assertEqual(h5file['names'].compression, 'gzip')
+            self.assertTrue(h5file['data'].fletcher32)
+        self.assertEqual(itsh5py.load(test_file)['names'], test_data['names'])
+        test_file.unlink()
+
+        with itsh5py.HdfWriter('test_filters_vlen_append',
+                               compress=compress) as writer:
+            writer.append('names', np.array(['ä', 'bb']))
+            test_file = writer.filename
+        assert_array_equal(itsh5py.load(test_file)['names'], ['ä', 'bb'])
+        test_file.unlink()
+
+
+class TestParallelCompression(unittest.TestCase):
+    def test_parallel_write(self):
+        test_data = {'data': np.random.random((301, 77)),
+                     'ints': np.arange(10000).reshape(100, 100),
+                     'shuffled': np.random.randint(0, 100, (1000, 3)),
+                     }
+        itsh5py.config.write_workers = 4
+        itsh5py.config.key_compression = {
+            'shuffled': {'filter': 'gzip', 'shuffle': True, 'chunks': (64, 2)}}
+        test_file = itsh5py.save(
+            'test_parallel_write', test_data,
+            compress={'filter': 'gzip', 'opts': 6, 'chunks': (50, 20)})
+        itsh5py.config.key_compression = {}
+        itsh5py.config.write_workers = 1
+
+        with h5py.File(test_file, 'r') as h5file:
+            self.assertEqual(h5file['data'].compression, 'gzip')
+            self.assertTrue(h5file['shuffled'].shuffle)
+            assert_array_equal(h5file['data'][()], test_data['data'])
+            assert_array_equal(h5file['shuffled'][()], test_data['shuffled'])
+
+        test_data_loaded = itsh5py.load(test_file)
+        for key, value in test_data.items():
+            assert_array_equal(test_data_loaded[key], value)
+        test_file.unlink()
+
+    def test_single_chunk(self):
+        spec = filters.normalize({'filter': 'gzip', 'workers': 4})
+        self.assertFalse(parallel.supports(spec, np.zeros(100)))
+        self.assertTrue(parallel.supports(spec, np.zeros((1000, 1000))))
+        spec = filters.normalize({'filter': 'gzip', 'workers': 4,
+                                  'chunks': (10,)})
+        self.assertTrue(parallel.supports(spec, np.zeros(100)))
+
+    def test_parallel_read(self):
+        test_file = itsh5py.save('test_parallel_read', {
+            'data': np.random.random((301, 77)),
+            'bytes': np.array([b'a', b'bc'] * 500),
+            })
+        with h5py.File(test_file, 'r+') as h5file:
+            h5file.create_dataset(
+                'sparse', shape=(100, 100), chunks=(10, 10), dtype='i4',
+                compression='gzip', shuffle=True, fillvalue=-1)
+            h5file['sparse'][:15, :15] = 7
+            expected = {k: v[()] for k, v in h5file.items()}
+
+        itsh5py.config.read_workers = 4
+        test_data_loaded = itsh5py.load(test_file)
+        itsh5py.config.read_workers = 1
+
+        for key, value in expected.items():
+            assert_array_equal(test_data_loaded[key], value)
+        test_file.unlink()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,10 +2,15 @@
 Tester for the main functions handling hdf io. All test are run with
 compression which, in theory, should work since gzip is lossless.
 """
+import sys
+import threading
 from sys import argv
+from concurrent.futures import ThreadPoolExecutor
 import unittest
 import logging
 from pathlib import Path
+from datetime import datetime, timedelta, timezone
+import h5py
 import numpy as np
 import pandas as pd
 from numpy.testing import assert_array_equal
@@ -116,6 +121,22 @@ class TestSupplementary(unittest.TestCase):
         itsh5py.config.use_lazy = True
         itsh5py.config.allow_overwrite = False
 
+    def test_custom_packer(self):
+        specs = []
+
+        def packer(hdfobject, key, value, compress):
+            specs.append(compress)
+            if compress[0]:
+                hdfobject.create_dataset(key, data=value, compression='gzip',
+                                         compression_opts=compress[1])
+
+        test_file = itsh5py.save('test_custom_packer', {'array': np.ones(100)},
+                                 packer=packer)
+        self.assertEqual(specs, [itsh5py.config.default_compression])
+        itsh5py.update(test_file, {'other': np.ones(100)}, packer=packer)
+        self.assertEqual(specs[-1], itsh5py.config.default_compression)
+        test_file.unlink()
+
 
 class TestPathFlavors(unittest.TestCase):
     def setUp(self):
@@ -261,6 +282,21 @@ class TestIterableTypes(unittest.TestCase):
             self.assertDictEqual(test_data, test_data_loaded)
         test_file.unlink()
 
+    def test_empty_and_nested_mixed(self):
+        itsh5py.config.use_lazy = False
+        test_data = {'empty_list': [],
+                     'empty_tuple': (),
+                     'mixed_nested': [[1, 2], 'a', ('b', 3)],
+                     'mixed_serialized': [1, None, {'a': 1}, (2, None)],
+                     'mixed_datetime': [1, datetime(2020, 1, 1), 'a'],
+                     }
+
+        test_file = itsh5py.save('test_empty_iterables', test_data)
+        test_data_loaded = itsh5py.load(test_file)
+
+        self.assertDictEqual(test_data, test_data_loaded)
+        test_file.unlink()
+
 
 class TestNestedTypes(unittest.TestCase):
     def test_nested(self):
@@ -336,6 +372,157 @@ class TestArrayTypes(unittest.TestCase, CustomValidation):
             test_file.unlink()
 
 
+class TestStringStorage(unittest.TestCase, CustomValidation):
+    def test_variable_length(self):
+        test_data = {'string_type': np.array(['a', 'a much longer string', 'äöü']),
+                     'list_type_str': ['a', 'a much longer string', 'äöü'],
+                     }
+
+        test_file = itsh5py.save('test_string_storage', test_data)
+        with h5py.File(test_file, 'r') as h5file:
+            for key in test_data:
+                self.assertEqual(h5py.check_string_dtype(h5file[key].dtype).length,
+                                 None)
+
+        test_data_loaded = itsh5py.load(test_file)
+        self.assertDictEqual_with_arrays(test_data, test_data_loaded)
+        self.assertEqual(test_data_loaded['string_type'].dtype.kind, 'U')
+        test_file.unlink()
+
+    def test_modes(self):
+        test_data = {'similar': ['ab', 'cd', 'efg'],
+                     'unicode': ['ab', 'äöü'],
+                     }
+
+        for mode, expected in (('auto', {'similar': 3, 'unicode': None}),
+                               (True, {'similar': None, 'unicode': None}),
+                               (False, {'similar': 3, 'unicode': 6})):
+            itsh5py.config.vlen_strings = mode
+            test_file = itsh5py.save('test_string_modes', test_data)
+            with h5py.File(test_file, 'r') as h5file:
+                for key, length in expected.items():
+                    self.assertEqual(
+                        h5py.check_string_dtype(h5file[key].dtype).length, length)
+
+            test_data_loaded = itsh5py.load(test_file)
+            self.assertDictEqual(test_data, test_data_loaded)
+            test_file.unlink()
+
+        itsh5py.config.vlen_strings = 'auto'
+
+    def test_legacy_layout(self):
+        test_file = Path('test_string_legacy.hdf')
+        with h5py.File(test_file, 'w') as h5file:
+            ds = h5file.create_dataset(
+                'string_type', data=np.array([v.encode() for v in ['a', 'äöü']]))
+            ds.attrs[itsh5py.hdf_support.TYPEID] = 'str_array'
+            ds = h5file.create_dataset(
+                'list_type_str', data=np.array([v.encode() for v in ['a', 'cd']]))
+            ds.attrs[itsh5py.hdf_support.TYPEID] = 'list_str'
+            ds = h5file.create_dataset(
+                'list_type_latin', data=np.array([v.encode('latin-1') for v in ['a', 'ü']]))
+            ds.attrs[itsh5py.hdf_support.TYPEID] = 'list_str'
+
+        test_data_loaded = itsh5py.load(test_file)
+        assert_array_equal(test_data_loaded['string_type'], np.array(['a', 'äöü']))
+        self.assertEqual(test_data_loaded['list_type_str'], ['a', 'cd'])
+        self.assertEqual(test_data_loaded['list_type_latin'], ['a', 'ü'])
+        test_file.unlink()
+
+
+class TestRaggedArrays(unittest.TestCase):
+    def test_roundtrip(self):
+        rng = np.random.default_rng(0)
+        test_data = {'ragged': [rng.random((i % 7, 3)) for i in range(1000)],
+                     'ragged_ndim': [np.arange(6).reshape(2, 3), np.arange(4),
+                                     np.array(1)],
+                     'mixed': [np.ones(3, dtype=int), np.ones(2, dtype=float)],
+                     }
+
+        test_file = itsh5py.save('test_ragged', test_data)
+        with h5py.File(test_file, 'r') as h5file:
+            self.assertEqual(h5file['ragged'].attrs['_TYPE_'], 'ragged')
+            self.assertEqual(len(h5file['ragged']), 3)
+            self.assertEqual(h5file['mixed'].attrs['_TYPE_'], 'list')
+
+        test_data_loaded = itsh5py.load(test_file)
+        for key, value in test_data.items():
+            self.assertIsInstance(test_data_loaded[key], list)
+            self.assertEqual(len(test_data_loaded[key]), len(value))
+            for arr, arr_loaded in zip(value, test_data_loaded[key]):
+                self.assertEqual(arr.dtype, arr_loaded.dtype)
+                assert_array_equal(arr, arr_loaded)
+        test_file.unlink()
+
+    def test_lazy(self):
+        itsh5py.config.use_lazy = True
+        itsh5py.config.use_lazy_arrays = True
+        test_data = {'ragged': [np.full((i, 2), i) for i in range(10)]}
+
+        test_file = itsh5py.save('test_ragged_lazy', test_data)
+        test_data_loaded = itsh5py.load(test_file)
+        proxy = test_data_loaded['ragged']
+        self.assertIsInstance(proxy, itsh5py.RaggedList)
+        self.assertEqual(len(proxy), 10)
+        assert_array_equal(proxy[3], test_data['ragged'][3])
+        assert_array_equal(proxy[-1], test_data['ragged'][-1])
+        for arr, arr_loaded in zip(test_data['ragged'][2:5], proxy[2:5]):
+            assert_array_equal(arr, arr_loaded)
+
+        itsh5py.config.use_lazy_arrays = False
+        itsh5py.load(test_file).close()
+        test_file.unlink()
+
+    def tearDown(self):
+        itsh5py.config.use_lazy_arrays = False
+        itsh5py.config.use_lazy = False
+
+
+class TestDatetimeTypes(unittest.TestCase, CustomValidation):
+    def test_python(self):
+        tz = timezone(timedelta(hours=2))
+        test_data = {'datetime': datetime(2021, 8, 9, 12, 30, 1, 123),
+                     'datetime_list': [datetime(2021, 8, 9) + timedelta(seconds=i)
+                                       for i in range(1000)],
+                     'datetime_tuple': (datetime(2021, 8, 9), datetime(2022, 1, 1)),
+                     'datetime_aware': [datetime(2021, 8, 9, tzinfo=tz),
+                                        datetime(2021, 8, 10, tzinfo=tz)],
+                     }
+
+        test_file = itsh5py.save('test_datetime', test_data)
+        test_data_loaded = itsh5py.load(test_file)
+        self.assertDictEqual(test_data, test_data_loaded)
+        self.assertEqual(test_data_loaded['datetime_aware'][0].utcoffset(),
+                         timedelta(hours=2))
+
+        itsh5py.config.datetime_as_numpy = True
+        test_data_loaded = itsh5py.load(test_file)
+        itsh5py.config.datetime_as_numpy = False
+        self.assertEqual(test_data_loaded['datetime_list'].dtype, np.dtype('M8[us]'))
+        assert_array_equal(test_data_loaded['datetime_list'],
+                           np.array(test_data['datetime_list'], dtype='M8[us]'))
+        test_file.unlink()
+
+    def test_native(self):
+        test_data = {'datetime64': np.arange('2021-08-09', '2021-09-09',
+                                             dtype='datetime64[s]'),
+                     'datetime64_scalar': np.datetime64('2021-08-09T12:00', 'ns'),
+                     'datetime_index': pd.date_range('2021-08-09', periods=100,
+                                                     freq='h', tz='Europe/Berlin'),
+                     }
+
+        test_file = itsh5py.save('test_datetime_native', test_data)
+        test_data_loaded = itsh5py.load(test_file)
+        assert_array_equal(test_data['datetime64'], test_data_loaded['datetime64'])
+        self.assertEqual(test_data_loaded['datetime64'].dtype, np.dtype('M8[s]'))
+        self.assertEqual(test_data['datetime64_scalar'],
+                         test_data_loaded['datetime64_scalar'])
+        self.assertTrue(test_data['datetime_index'].equals(
+            test_data_loaded['datetime_index']))
+        self.assertEqual(str(test_data_loaded['datetime_index'].tz), 'Europe/Berlin')
+        test_file.unlink()
+
+
 class TestPandasTypes(unittest.TestCase, CustomValidation):
     def test_single(self):
         itsh5py.config.squeeze_single = True
@@ -389,6 +576,384 @@ class TestPandasTypes(unittest.TestCase, CustomValidation):
         Path('test_dataframe_lvl2' + itsh5py.config.default_suffix).unlink()
 
 
+class TestNativeFrames(unittest.TestCase):
+    """Tests the columnar layout of frames, see `config.native_frames`
+    """
+    def setUp(self):
+        itsh5py.config.native_frames = True
+        itsh5py.config.use_lazy = False
+        self.frame = pd.DataFrame(
+            {'float': np.random.random(5),
+             'int': np.arange(5),
+             'bool': [True, False, True, False, True],
+             'str': ['a', 'b', 'cd', 'äöü', 'e'],
+             'category': pd.Categorical(['x', 'y', 'x', 'y', 'x']),
+             'datetime': pd.date_range('2020-01-01', periods=5),
+             'tz': pd.date_range('2020-01-01', periods=5, tz='Europe/Berlin'),
+             3: np.ones(5)},
+            index=pd.Index(['v', 'w', 'x', 'y', 'z'], name='idx'))
+
+    def test_roundtrip(self):
+        test_data = {'nested': {'frame': self.frame,
+                                'series': pd.Series([1., 2.], name='x'),
+                                'unnamed': pd.Series([1., 2.])},
+                     'dataframe': pd.DataFrame(np.ones((100, 5))),
+                     }
+
+        test_file = itsh5py.save('test_native_frames', test_data)
+        test_data_loaded = itsh5py.load(test_file)
+        assert_frame_equal(test_data_loaded['nested']['frame'], self.frame)
+        pd.testing.assert_series_equal(test_data_loaded['nested']['series'],
+                                       test_data['nested']['series'])
+        pd.testing.assert_series_equal(test_data_loaded['nested']['unnamed'],
+                                       test_data['nested']['unnamed'])
+        assert_frame_equal(test_data_loaded['dataframe'],
+                           test_data['dataframe'])
+        test_file.unlink()
+
+        itsh5py.config.squeeze_single = True
+        test_file = itsh5py.save('test_native_frame_bare', self.frame)
+        assert_frame_equal(itsh5py.load(test_file), self.frame)
+        test_file.unlink()
+
+    def test_lazy(self):
+        itsh5py.config.use_lazy = True
+        itsh5py.config.use_lazy_arrays = True
+
+        test_file = itsh5py.save('test_native_frames_lazy', {'frame': self.frame})
+        test_data_loaded = itsh5py.load(test_file)
+        proxy = test_data_loaded['frame']
+        self.assertIsInstance(proxy, itsh5py.LazyFrame)
+        self.assertEqual(proxy.shape, self.frame.shape)
+        assert_frame_equal(proxy[['str', 'tz']], self.frame[['str', 'tz']])
+        assert_frame_equal(proxy[1:3], self.frame[1:3])
+        pd.testing.assert_series_equal(proxy['category'],
+                                       self.frame['category'])
+        with self.assertRaises(KeyError):
+            _ = proxy['missing']
+
+        test_data_loaded.close()
+        test_file.unlink()
+
+    def test_unsupported(self):
+        columns = pd.MultiIndex.from_tuples([('a', 1), ('a', 2)])
+        test_data = {'object': pd.DataFrame({'a': [{'x': 1}, 2]}),
+                     'levels': pd.DataFrame(np.ones((2, 2)), columns=columns)}
+
+        test_file = itsh5py.save('test_native_frames_unsupported', {'int_type': 1})
+        for key, frame in test_data.items():
+            with self.assertRaises(TypeError):
+                itsh5py.save(test_file, {key: frame})
+        self.assertEqual(itsh5py.load(test_file), {'int_type': 1})
+        test_file.unlink()
+
+    def tearDown(self):
+        itsh5py.config.squeeze_single = False
+        itsh5py.config.native_frames = False
+        itsh5py.config.use_lazy_arrays = False
+        itsh5py.config.use_lazy = False
+
+
+class TestLazyArrays(unittest.TestCase):
+    """Tests the sliceable array proxies of lazy files
+    """
+    def setUp(self):
+        itsh5py.config.use_lazy = True
+        itsh5py.config.use_lazy_arrays = True
+
+    def test_slicing(self):
+        test_data = {'float_type': np.random.random((100, 20)),
+                     'string_type': np.array(['a', 'b', 'cd', 'äöü']),
+                     'list_type_str': ['a', 'b', 'cd', 'äöü'],
+                     'list_type': [1, 2, 3, 4],
+                     'scalar': 1,
+                     }
+
+        test_file = itsh5py.save('test_lazy_arrays', test_data)
+        test_data_loaded = itsh5py.load(test_file)
+
+        proxy = test_data_loaded['float_type']
+        self.assertIsInstance(proxy, itsh5py.LazyArray)
+        self.assertEqual(proxy.shape, (100, 20))
+        self.assertEqual(proxy.dtype, test_data['float_type'].dtype)
+        self.assertEqual(len(proxy), 100)
+        assert_array_equal(proxy[10:20, ::4], test_data['float_type'][10:20, ::4])
+        assert_array_equal(np.asarray(proxy), test_data['float_type'])
+        assert_array_equal(proxy + 1, test_data['float_type'] + 1)
+
+        assert_array_equal(test_data_loaded['string_type'][1:3],
+                           test_data['string_type'][1:3])
+        self.assertEqual(test_data_loaded['string_type'][3], 'äöü')
+        self.assertEqual(test_data_loaded['list_type_str'][1:], ['b', 'cd', 'äöü'])
+        self.assertEqual(test_data_loaded['list_type'][:2], [1, 2])
+        self.assertEqual(test_data_loaded['scalar'], 1)
+
+        unlazied = test_data_loaded.unlazy()
+        assert_array_equal(unlazied['float_type'], test_data['float_type'])
+        test_file.unlink()
+
+    def test_resave(self):
+        itsh5py.config.native_frames = True
+        test_data = {'float_type': np.random.random((100, 20)),
+                     'list_type_str': ['a', 'b', 'cd', 'äöü'],
+                     'ragged': [np.arange(3.), np.arange(5.)],
+                     'frame': pd.DataFrame({'a': [1., 2.], 'b': ['x', 'y']}),
+                     }
+
+        test_file = itsh5py.save('test_lazy_arrays_resave', test_data)
+        test_data_loaded = itsh5py.load(test_file)
+        self.assertIsInstance(test_data_loaded['ragged'], itsh5py.RaggedList)
+        resaved = itsh5py.save('test_lazy_arrays_resaved', test_data_loaded,
+                               compress=True)
+        test_data_loaded.close()
+
+        with h5py.File(resaved, 'r') as h5file:
+            self.assertEqual(h5file['float_type'].compression, 'gzip')
+
+        itsh5py.config.use_lazy = False
+        test_data_loaded = itsh5py.load(resaved)
+        assert_array_equal(test_data_loaded['float_type'], test_data['float_type'])
+        self.assertEqual(test_data_loaded['list_type_str'], test_data['list_type_str'])
+        for loaded, array in zip(test_data_loaded['ragged'], test_data['ragged']):
+            assert_array_equal(loaded, array)
+        assert_frame_equal(test_data_loaded['frame'], test_data['frame'])
+        test_file.unlink()
+        resaved.unlink()
+
+    def tearDown(self):
+        itsh5py.config.native_frames = False
+        itsh5py.config.use_lazy_arrays = False
+        itsh5py.config.use_lazy = False
+
+
+class TestMemmap(unittest.TestCase):
+    """Tests memory mapped reads of contiguous arrays, see `config.use_memmap`
+    """
+    def setUp(self):
+        itsh5py.config.use_memmap = True
+        self.test_data = {'large': np.random.random((200, 100)),
+                          'small': np.arange(10),
+                          }
+
+    def test_memmap(self):
+        itsh5py.config.use_lazy = False
+        itsh5py.config.contiguous_bytes = 1000
+
+        test_file = itsh5py.save('test_memmap', self.test_data)
+        test_data_loaded = itsh5py.load(test_file)
+        self.assertIsInstance(test_data_loaded['large'], np.memmap)
+        self.assertFalse(test_data_loaded['large'].flags.writeable)
+        assert_array_equal(test_data_loaded['large'], self.test_data['large'])
+
+        # Compressed and thus not mappable
+        self.assertNotIsInstance(test_data_loaded['small'], np.memmap)
+        assert_array_equal(test_data_loaded['small'], self.test_data['small'])
+        del test_data_loaded
+        test_file.unlink()
+
+    def test_lazy(self):
+        itsh5py.config.use_lazy = True
+        itsh5py.config.use_lazy_arrays = True
+
+        test_file = itsh5py.save('test_memmap_lazy', self.test_data, compress=(False, 0))
+        test_data_loaded = itsh5py.load(test_file)
+        large = test_data_loaded['large']
+        self.assertIsInstance(large, np.memmap)
+        test_data_loaded.close()
+        assert_array_equal(large[5:10], self.test_data['large'][5:10])
+        del large
+        test_file.unlink()
+
+    def tearDown(self):
+        itsh5py.config.use_memmap = False
+        itsh5py.config.contiguous_bytes = None
+        itsh5py.config.use_lazy_arrays = False
+        itsh5py.config.use_lazy = False
+
+
+class TestBuffers(unittest.TestCase):
+    """Tests reading into reused and caller supplied arrays"""
+    def setUp(self):
+        self.test_data = {'array': np.random.random((20, 10)),
+                          'group': {'list_type': [np.arange(5), 'a'],
+                                    'str_type': 'b'},
+                          }
+
+    def test_pool(self):
+        itsh5py.config.use_lazy = False
+        test_file = itsh5py.save('test_buffers', self.test_data)
+        pool = itsh5py.BufferPool()
+
+        for _ in range(3):
+            test_data_loaded = itsh5py.load(test_file, buffers=pool)
+            assert_array_equal(test_data_loaded['array'], self.test_data['array'])
+            assert_array_equal(test_data_loaded['group']['list_type'][0],
+                               np.arange(5))
+            self.assertEqual(test_data_loaded['group']['str_type'], 'b')
+            pool.release(test_data_loaded)
+
+        self.assertEqual(pool.stats()['hits'], 4)
+        self.assertEqual(pool.stats()['free'], 2)
+        test_file.unlink()
+
+    def test_release_lazy(self):
+        itsh5py.config.use_lazy = True
+        test_file = itsh5py.save('test_buffers_release', self.test_data)
+        other_file = itsh5py.save('test_buffers_other',
+                                  {'array': np.zeros((20, 10))})
+        pool = itsh5py.BufferPool()
+
+        test_data_loaded = itsh5py.load(test_file, buffers=pool)
+        test_data_loaded['array']
+        pool.release(test_data_loaded)
+        self.assertEqual(pool.stats()['free'], 1)
+
+        # The released buffer is filled from the other file now
+        assert_array_equal(itsh5py.load(other_file, buffers=pool)['array'], 0)
+        assert_array_equal(itsh5py.load(test_file)['array'],
+                           self.test_data['array'])
+        itsh5py.load(test_file).close()
+        itsh5py.load(other_file).close()
+        test_file.unlink()
+        other_file.unlink()
+
+    def test_read_into(self):
+        itsh5py.config.use_lazy = True
+        itsh5py.config.use_lazy_arrays = True
+        itsh5py.config.allow_fallback_open = True
+        test_file = itsh5py.save('test_buffers_lazy', self.test_data)
+
+        test_data_loaded = itsh5py.load(test_file)
+        stack = np.zeros((2, 20, 10))
+        test_data_loaded.read_into('array', stack, dest_sel=np.s_[1])
+        assert_array_equal(stack[1], self.test_data['array'])
+        assert_array_equal(stack[0], 0)
+
+        # Not contiguous and thus copied
+        columns = np.zeros((10, 20)).T
+        test_data_loaded['array'].read_into(columns)
+        assert_array_equal(columns, self.test_data['array'])
+
+        with self.assertRaises(TypeError):
+            test_data_loaded['group'].read_into('str_type', np.zeros(1))
+
+        test_data_loaded.close()
+        part = np.zeros((3, 10))
+        test_data_loaded.read_into('array', part, source_sel=np.s_[2:5])
+        assert_array_equal(part, self.test_data['array'][2:5])
+        test_file.unlink()
+
+    def tearDown(self):
+        itsh5py.config.use_lazy_arrays = False
+        itsh5py.config.allow_fallback_open = False
+        itsh5py.config.use_lazy = False
+
+
+class TestSerializedTypes(unittest.TestCase):
+    def setUp(self):
+        itsh5py.config.use_lazy = False
+
+    def test_serializers(self):
+        test_data = {'list_of_dicts': [{'a': 1, 'b': [1.5, 'x', None]}] * 2,
+                     'set_type': {1, 2., '3'},
+                     'none_type': None,
+                     'int_keys': [{1: 'a'}],
+                     }
+        type_ids = {'list_of_dicts': 'json', 'set_type': 'yaml',
+                    'none_type': 'json', 'int_keys': 'yaml'}
+
+        test_file = itsh5py.save('test_serialized', test_data)
+        with h5py.File(test_file, 'r') as h5file:
+            for key, type_id in type_ids.items():
+                self.assertEqual(h5file[key].attrs['_TYPE_'], type_id)
+
+        test_data_loaded = itsh5py.load(test_file)
+        self.assertDictEqual(test_data, test_data_loaded)
+
+        # Memoized values must not be shared
+        test_data_loaded['list_of_dicts'][0]['a'] = 2
+        self.assertEqual(itsh5py.load(test_file)['list_of_dicts'][0]['a'], 1)
+        test_file.unlink()
+
+    def test_yaml_only(self):
+        itsh5py.config.json_fallback = False
+        test_data = {'list_of_dicts': [{'a': 1}]}
+
+        test_file = itsh5py.save('test_serialized_yaml', test_data)
+        with h5py.File(test_file, 'r') as h5file:
+            self.assertEqual(h5file['list_of_dicts'].attrs['_TYPE_'], 'yaml')
+        self.assertDictEqual(test_data, itsh5py.load(test_file))
+        test_file.unlink()
+
+    def tearDown(self):
+        itsh5py.config.json_fallback = True
+
+
+class TestLazyExpansion(unittest.TestCase):
+    def setUp(self):
+        itsh5py.config.use_lazy = True
+
+    def test_on_access(self):
+        test_data = {'group': {'tuple_type': (1, 'a'),
+                               'sub': {'int_type': 1}},
+                     'list_type': [1, 'b'],
+                     }
+
+        test_file = itsh5py.save('test_lazy_expansion', test_data)
+        test_data_loaded = itsh5py.load(test_file)
+        self.assertEqual(len(test_data_loaded._data), 0)
+
+        group = test_data_loaded['group']
+        self.assertIsInstance(group, itsh5py.LazyHdfDict)
+        self.assertEqual(len(group._data), 0)
+        self.assertFalse(isinstance(group.data['tuple_type'], tuple))
+        self.assertEqual(len(group._data['sub']._data), 0)
+
+        self.assertEqual(group['tuple_type'], (1, 'a'))
+        self.assertEqual(group['sub']['int_type'], 1)
+        self.assertEqual(test_data_loaded['list_type'], [1, 'b'])
+        self.assertEqual(sorted(test_data_loaded.keys()), ['group', 'list_type'])
+
+        copied = test_data_loaded.copy()
+        copied.pop('list_type')
+        self.assertEqual(sorted(test_data_loaded.keys()), ['group', 'list_type'])
+        self.assertEqual(copied['group']['sub']['int_type'], 1)
+
+        test_data_loaded.close()
+        test_file.unlink()
+
+    def test_threads(self):
+        # Groups listed from the index are filled fast enough to meet others
+        itsh5py.config.structure_index = 'file'
+        test_data = {'group': {f'key_{i}': i for i in range(2000)}}
+        test_file = itsh5py.save('test_lazy_expansion_threads', test_data)
+
+        # Switching threads often makes them meet while listing the group
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            for _ in range(20):
+                test_data_loaded = itsh5py.load(test_file)
+                group = test_data_loaded['group']
+                barrier = threading.Barrier(8)
+
+                def _read(_):
+                    barrier.wait()
+                    return group['key_1999']
+
+                with ThreadPoolExecutor(8) as executor:
+                    self.assertEqual(list(executor.map(_read, range(8))),
+                                     [1999] * 8)
+                test_data_loaded.close()
+        finally:
+            sys.setswitchinterval(interval)
+            itsh5py.config.structure_index = None
+        test_file.unlink()
+
+    def tearDown(self):
+        itsh5py.config.use_lazy = False
+
+
 class TestInvalidType(unittest.TestCase):
     """Tests a fail, here we use a callable which is not implemented
     """
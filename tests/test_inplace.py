@@ -0,0 +1,108 @@
+"""
+Tester for in-place updates of existing files.
+"""
+import unittest
+import logging
+import numpy as np
+from numpy.testing import assert_array_equal
+import itsh5py
+from itsh5py import DELETE
+
+logger = logging.getLogger('itsh5py')
+
+
+class TestUpdate(unittest.TestCase):
+    def setUp(self):
+        itsh5py.config.use_lazy = False
+        self.test_data = {'array': np.random.random((100, 50)),
+                          'large': np.random.random(20000),
+                          'group': {'int_type': 1, 'list_type': [1, 'a']},
+                          'str_type': 'abc',
+                          'attrs': {'version': 1},
+                          }
+
+    def test_update(self):
+        test_file = itsh5py.save('test_update', self.test_data, compress=False)
+        array = np.zeros((100, 50))
+        report = itsh5py.update(test_file, {
+            'array': array, 'large': DELETE, 'str_type': 'changed',
+            'group': {'int_type': DELETE, 'new_type': 2.},
+            'nested/key': np.arange(3), 'attrs': {'version': DELETE, 'run': 2}})
+
+        self.assertEqual(report.reused, ['/array'])
+        self.assertEqual(report.deleted, ['/large', '/group/int_type'])
+        self.assertEqual(report.replaced, ['/str_type'])
+        self.assertEqual(report.added, ['/group/new_type', '/nested/key'])
+        self.assertGreater(report.dead_bytes, 10000 * 8)
+
+        test_data_loaded = itsh5py.load(test_file, unpack_attrs=True)
+        assert_array_equal(test_data_loaded['array'], array)
+        self.assertNotIn('large', test_data_loaded)
+        self.assertEqual(test_data_loaded['group'],
+                         {'list_type': [1, 'a'], 'new_type': 2.})
+        self.assertEqual(test_data_loaded['str_type'], 'changed')
+        assert_array_equal(test_data_loaded['nested']['key'], np.arange(3))
+        self.assertEqual(test_data_loaded['attrs'], {'run': 2})
+
+        size = test_file.stat().st_size
+        self.assertEqual(itsh5py.repack(test_file), size - test_file.stat().st_size)
+        self.assertGreaterEqual(size - test_file.stat().st_size, report.dead_bytes)
+        self.assertEqual(itsh5py.update(test_file, {}).dead_bytes, 0)
+        assert_array_equal(itsh5py.load(test_file)['array'], array)
+        test_file.unlink()
+
+    def test_resize(self):
+        with itsh5py.HdfWriter('test_update_resize') as writer:
+            writer.append('signal', np.zeros((10, 3)))
+            writer.append('fixed', np.zeros(4))
+            test_file = writer.filename
+
+        report = itsh5py.update(test_file, {'signal': np.ones((25, 3)),
+                                            'fixed': np.ones(4).astype(int)},
+                                reclaim=True)
+        self.assertEqual(report.resized, ['/signal'])
+        self.assertEqual(report.replaced, ['/fixed'])
+        self.assertEqual(report.dead_bytes, 0)
+        assert_array_equal(itsh5py.load(test_file)['signal'], np.ones((25, 3)))
+        test_file.unlink()
+
+    def test_failed_pack(self):
+        test_file = itsh5py.save('test_update_failed', self.test_data)
+        with self.assertRaises(RuntimeError):
+            itsh5py.update(test_file, {'str_type': object()})
+
+        test_data_loaded = itsh5py.load(test_file)
+        self.assertEqual(test_data_loaded['str_type'], 'abc')
+        self.assertEqual(set(test_data_loaded), {'array', 'large', 'group',
+                                                 'str_type'})
+        test_file.unlink()
+
+    def test_index(self):
+        itsh5py.config.use_lazy = True
+        itsh5py.config.structure_index = 'file'
+        test_file = itsh5py.save('test_update_index', self.test_data)
+        itsh5py.update(test_file, {'large': DELETE}, reclaim=True)
+
+        test_data_loaded = itsh5py.load(test_file)
+        self.assertIsNotNone(test_data_loaded._index)
+        self.assertNotIn('large', test_data_loaded)
+        test_data_loaded.close()
+        test_file.unlink()
+
+    def test_lazy_open(self):
+        itsh5py.config.use_lazy = True
+        itsh5py.config.allow_fallback_open = True
+        test_file = itsh5py.save('test_update_lazy', self.test_data)
+        test_data_loaded = itsh5py.load(test_file)
+        test_data_loaded['group']
+
+        itsh5py.update(test_file, {'str_type': 'changed'})
+        self.assertEqual(test_data_loaded['str_type'], 'changed')
+        self.assertEqual(itsh5py.load(test_file)['str_type'], 'changed')
+        itsh5py.load(test_file).close()
+        test_file.unlink()
+
+    def tearDown(self):
+        itsh5py.config.use_lazy = False
+        itsh5py.config.allow_fallback_open = False
+        itsh5py.config.structure_index = None
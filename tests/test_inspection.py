@@ -0,0 +1,74 @@
+"""
+Tester for the metadata-only storage inspection and the tree view.
+"""
+import unittest
+import logging
+import numpy as np
+import itsh5py
+from itsh5py import inspection
+
+logger = logging.getLogger('itsh5py')
+
+
+class TestInspection(unittest.TestCase):
+    def setUp(self):
+        itsh5py.config.use_lazy = False
+        self.test_data = {'array': np.zeros((200, 100)),
+                          'group': {'int_type': 1,
+                                    'tuple_type': (1, 'a')},
+                          'many': {f'k{i}': i for i in range(50)},
+                          }
+
+    def test_statistics(self):
+        test_file = itsh5py.save('test_inspection', self.test_data)
+        info = itsh5py.inspect(test_file)
+
+        self.assertEqual(info.num_datasets, 54)
+        array = info.to_frame().loc['/array']
+        self.assertEqual(array['shape'], (200, 100))
+        self.assertEqual(array['dtype'], 'float64')
+        self.assertEqual(array['filters'], 'gzip')
+        self.assertEqual(array['logical_bytes'], 200 * 100 * 8)
+        self.assertGreater(array['ratio'], 10)
+
+        group = next(e for e in info.children if e.path == '/group')
+        self.assertEqual(group.logical_bytes,
+                         sum(e.logical_bytes for e in group.children))
+        self.assertEqual([e.type_id for e in group.children if e.is_group],
+                         ['tuple'])
+        self.assertEqual(info.stored_bytes,
+                         sum(e.stored_bytes for e in info.children))
+
+        shallow = itsh5py.inspect(test_file, max_depth=1)
+        self.assertEqual(shallow.num_datasets, info.num_datasets)
+        self.assertTrue(all(not e.children for e in shallow.children))
+        test_file.unlink()
+
+    def test_render(self):
+        test_file = itsh5py.save('test_inspection_render', self.test_data)
+        lines = itsh5py.inspect(test_file).render(max_children=5).splitlines()
+        self.assertIn('/array', lines[1])  # largest first
+        self.assertTrue(any(line.endswith('...and 45 more omitted')
+                            for line in lines))
+        lines = itsh5py.inspect(test_file).render(max_lines=10).splitlines()
+        self.assertEqual(len(lines), 11)
+
+        itsh5py.config.use_lazy = True
+        test_data_loaded = itsh5py.load(test_file)
+        tree = repr(test_data_loaded).splitlines()
+        self.assertLessEqual(len(tree),
+                             3 + 3 + itsh5py.config.max_tree_children + 1)
+        self.assertEqual(tree[-1], '   └─> ...and 20 more omitted')
+        self.assertEqual(repr(itsh5py.LazyHdfDict()), '')
+        self.assertEqual(itsh5py.inspect(test_data_loaded['group']).path,
+                         '/group')
+        test_data_loaded.close()
+        test_file.unlink()
+
+    def test_format(self):
+        self.assertEqual(inspection._format_bytes(12), '12 B')
+        self.assertEqual(inspection._format_bytes(1500), '1.5 kB')
+        self.assertEqual(inspection._format_bytes(2.5e15), '2500.0 TB')
+
+    def tearDown(self):
+        itsh5py.config.use_lazy = False
@@ -0,0 +1,75 @@
+"""
+Tester for the profiling hooks of saving, loading and lazy reads.
+"""
+import unittest
+import logging
+import numpy as np
+import itsh5py
+from itsh5py import profiling
+
+logger = logging.getLogger('itsh5py')
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        itsh5py.config.use_lazy = False
+        self.test_data = {'array': np.zeros((100, 50)),
+                          'group': {'list_type': [1, 'a', None]},
+                          }
+
+    def test_collector(self):
+        with profiling.Collector() as collector:
+            self.assertTrue(profiling.active)
+            test_file = itsh5py.save('test_profiling', self.test_data)
+            itsh5py.load(test_file)
+        self.assertFalse(profiling.active)
+
+        events = collector.to_frame().set_index(['kind', 'key'])
+        self.assertEqual(list(collector.summary()['count'].items()),
+                         [('load', 1), ('open', 1), ('pack', 2), ('save', 1),
+                          ('unpack', 2)])
+        array = events.loc[('unpack', '/array')]
+        self.assertEqual(array['nbytes'], 100 * 50 * 8)
+        self.assertEqual(array['decompressed_bytes'], 100 * 50 * 8)
+        self.assertLess(array['stored_bytes'], array['nbytes'])
+        self.assertEqual(events.loc[('pack', '/group/list_type')]['codec'], 'list')
+        self.assertEqual(events.loc[('save', '/')]['stored_bytes'],
+                         test_file.stat().st_size)
+        test_file.unlink()
+
+    def test_empty(self):
+        with profiling.Collector() as collector:
+            test_file = itsh5py.save('test_profiling_empty',
+                                     {'empty': np.zeros(0), 'str_type': 'a',
+                                      'stream': iter([])})
+        self.assertEqual([(e.kind, e.key) for e in collector.events],
+                         [('pack', '/str_type'), ('save', '/')])
+        test_file.unlink()
+
+    def test_lazy(self):
+        itsh5py.config.use_lazy = True
+        itsh5py.config.use_lazy_arrays = True
+        itsh5py.config.allow_fallback_open = True
+        test_file = itsh5py.save('test_profiling_lazy', self.test_data)
+
+        events = []
+        profiling.add_hook(events.append)
+        test_data_loaded = itsh5py.load(test_file)
+        test_data_loaded['array'][:10]
+        test_data_loaded['group']
+        test_data_loaded.close()
+        test_data_loaded['group']['list_type']
+        profiling.remove_hook(events.append)
+
+        self.assertEqual([(e.kind, e.key) for e in events],
+                         [('open', '/'), ('load', '/'), ('lazy', '/array'),
+                          ('slice', '/array'), ('reopen', '/'), ('reopen', '/'),
+                          ('unpack', '/group/list_type'),
+                          ('lazy', '/group/list_type')])
+        self.assertEqual(events[3].nbytes, 10 * 50 * 8)
+        test_file.unlink()
+
+    def tearDown(self):
+        itsh5py.config.use_lazy = False
+        itsh5py.config.use_lazy_arrays = False
+        itsh5py.config.allow_fallback_open = False
@@ -0,0 +1,72 @@
+"""
+Tester for the queue of open files.
+"""
+import unittest
+import logging
+from pathlib import Path
+import itsh5py
+from itsh5py import queue_handler
+
+logger = logging.getLogger('itsh5py')
+
+
+class TestQueue(unittest.TestCase):
+    def setUp(self):
+        itsh5py.config.use_lazy = True
+        Path('test_queue/').mkdir()
+        self.files = [itsh5py.save(f'test_queue/file_{i}', {'index': i})
+                      for i in range(4)]
+
+    def test_lru(self):
+        queue_handler.max_open_files = 3
+        loaded = [itsh5py.load(f) for f in self.files[:3]]
+
+        # Touching the first file makes the second the oldest
+        self.assertIs(itsh5py.load(self.files[0]), loaded[0])
+        _ = itsh5py.load(self.files[3])
+        self.assertIsNotNone(queue_handler.is_open(self.files[0]))
+        self.assertIsNone(queue_handler.is_open(self.files[1]))
+        self.assertEqual(len(itsh5py.open_filenames()), 3)
+        self.assertEqual(itsh5py.open_filenames()[0], str(self.files[0]))
+
+    def test_same_name(self):
+        other = itsh5py.save(self.files[0].name, {'index': -1})
+        first = itsh5py.load(self.files[0])
+        second = itsh5py.load(other)
+        self.assertIsNot(first, second)
+        self.assertEqual(first['index'], 0)
+        self.assertEqual(second['index'], -1)
+        second.close()
+        other.unlink()
+
+    def test_changed_file(self):
+        first = itsh5py.load(self.files[0])
+        self.assertEqual(first['index'], 0)
+        self.files[0].unlink()
+        itsh5py.save(self.files[0], {'index': 10})
+        self.assertEqual(itsh5py.load(self.files[0])['index'], 10)
+
+    def test_memory_limit(self):
+        loaded = [itsh5py.load(f) for f in self.files[:-1]]
+        self.assertGreater(queue_handler.handle_bytes(loaded[0]), 0)
+
+        # Limits are enforced when adding files, not on lookups
+        queue_handler.max_open_bytes = 1
+        _ = itsh5py.load(self.files[0])
+        self.assertEqual(len(queue_handler.open_files), len(loaded))
+        _ = itsh5py.load(self.files[-1])
+        self.assertEqual(len(queue_handler.open_files), 1)
+
+    def tearDown(self):
+        queue_handler.max_open_files = 12
+        queue_handler.max_open_bytes = None
+        for key in list(queue_handler.open_files):
+            queue_handler.remove_from_queue(key)
+        for f in self.files:
+            f.unlink()
+        Path('test_queue/').rmdir()
+        itsh5py.config.use_lazy = False
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Tester for codecs of custom types.
+"""
+import unittest
+import logging
+from fractions import Fraction
+import numpy as np
+import h5py
+import itsh5py
+from itsh5py import registry
+
+logger = logging.getLogger('itsh5py')
+
+
+class Interval:
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+
+    def __eq__(self, other):
+        return (self.low, self.high) == (other.low, other.high)
+
+
+class TestCodecs(unittest.TestCase):
+    def setUp(self):
+        itsh5py.register_codec(
+            'fraction', Fraction,
+            encode=lambda f: np.array([f.numerator, f.denominator]),
+            decode=lambda a: Fraction(int(a[0]), int(a[1])))
+        itsh5py.register_codec(
+            'interval', Interval,
+            encode=lambda i: f'{i.low}:{i.high}',
+            decode=lambda s: Interval(*map(float, s.split(':'))))
+
+    def test_roundtrip(self):
+        test_data = {'fraction': Fraction(1, 3),
+                     'interval': Interval(1., 2.5),
+                     'list_type': [Fraction(1, 2), 'a', 3],
+                     'nested': {'fraction': Fraction(-7, 2)},
+                     }
+
+        for lazy in (False, True):
+            itsh5py.config.use_lazy = lazy
+            test_file = itsh5py.save('test_codecs', test_data)
+            with h5py.File(test_file, 'r') as h5file:
+                self.assertEqual(h5file['fraction'].attrs['_TYPE_'], 'fraction')
+
+            test_data_loaded = itsh5py.load(test_file)
+            for key, value in test_data.items():
+                if key == 'nested':
+                    self.assertEqual(test_data_loaded[key]['fraction'],
+                                     value['fraction'])
+                else:
+                    self.assertEqual(test_data_loaded[key], value)
+
+            if lazy:
+                test_data_loaded.close()
+            test_file.unlink()
+
+    def test_registration(self):
+        with self.assertRaises(ValueError):
+            itsh5py.register_codec('list', list, list, list)
+
+        self.assertEqual(registry.find(Fraction(1, 2)).type_id, 'fraction')
+        self.assertIsNone(registry.find(1.5))
+
+        itsh5py.unregister_codec('fraction')
+        self.assertIsNone(registry.find(Fraction(1, 2)))
+        with self.assertRaises(KeyError):
+            itsh5py.unregister_codec('fraction')
+
+    def tearDown(self):
+        for type_id in ('fraction', 'interval'):
+            registry._codecs.pop(type_id, None)
+        registry._by_type.clear()
+        itsh5py.config.use_lazy = False
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+Tester for the native group scan and the persisted structure index.
+"""
+import unittest
+import logging
+import os
+from pathlib import Path
+import h5py
+import numpy as np
+import pandas as pd
+from numpy.testing import assert_array_equal
+import itsh5py
+from itsh5py import structure
+
+logger = logging.getLogger('itsh5py')
+
+
+class TestScan(unittest.TestCase):
+    def test_scan(self):
+        test_data = {'int_type': 1,
+                     'tuple_type': (1, 'a'),
+                     'group': {'path_type': Path('a')},
+                     'frame': pd.DataFrame({'a': [1, 2]}),
+                     }
+
+        test_file = itsh5py.save('test_scan', test_data)
+        with h5py.File(test_file, 'r') as h5file:
+            objects = {name: tags for name, *tags in structure.scan(h5file)}
+        self.assertEqual(objects, {'int_type': [False, None, False],
+                                   'tuple_type': [True, 'tuple', False],
+                                   'group': [True, None, False],
+                                   'frame': [True, None, True]})
+        test_file.unlink()
+
+
+class TestIndex(unittest.TestCase):
+    def setUp(self):
+        itsh5py.config.use_lazy = True
+        self.test_data = {'array': np.arange(10.),
+                          'group': {'tuple_type': (1, 'a'),
+                                    'sub': {'int_type': 1}},
+                          }
+
+    def check_lazy(self, test_file):
+        loaded = itsh5py.load(test_file)
+        self.assertIsNotNone(loaded._index)
+        self.assertEqual(sorted(loaded.keys()), ['array', 'group'])
+        assert_array_equal(loaded['array'], self.test_data['array'])
+        self.assertEqual(loaded['group']['tuple_type'], (1, 'a'))
+        self.assertEqual(loaded['group']['sub']['int_type'], 1)
+        loaded.close()
+
+    def test_in_file(self):
+        itsh5py.config.structure_index = 'file'
+        test_file = itsh5py.save('test_index_file', self.test_data)
+        self.check_lazy(test_file)
+
+        with h5py.File(test_file, 'r') as h5file:
+            index = structure.read(h5file)
+        array = {c[0]: c for c in index['/']}['array']
+        self.assertEqual(array[4:6], [[10], '<f8'])
+
+        itsh5py.config.use_lazy = False
+        self.assertEqual(sorted(itsh5py.load(test_file)), ['array', 'group'])
+
+        # Keys added below the root by other tools invalidate the index
+        with h5py.File(test_file, 'a') as h5file:
+            h5file['group/other'] = 2
+        itsh5py.config.use_lazy = True
+        loaded = itsh5py.load(test_file)
+        self.assertIsNone(loaded._index)
+        self.assertIn('other', loaded['group'])
+        loaded.close()
+
+        # New root keys as well
+        with h5py.File(test_file, 'a') as h5file:
+            h5file['other'] = 1
+            self.assertIsNone(structure.read(h5file))
+        test_file.unlink()
+
+    def test_deleted_key(self):
+        itsh5py.config.structure_index = 'file'
+        test_file = itsh5py.save('test_index_deleted', self.test_data)
+        size = test_file.stat().st_size
+
+        # Deleting a key keeps the size of the file and the index valid
+        with h5py.File(test_file, 'a') as h5file:
+            del h5file['group/tuple_type']
+        self.assertEqual(test_file.stat().st_size, size)
+        loaded = itsh5py.load(test_file)
+        self.assertIsNotNone(loaded._index)
+        self.assertEqual(list(loaded['group']), ['sub'])
+        self.assertEqual(loaded['group']['sub']['int_type'], 1)
+        loaded.close()
+        test_file.unlink()
+
+    def test_sidecar(self):
+        itsh5py.config.structure_index = 'sidecar'
+        test_file = itsh5py.save('test_index_sidecar', self.test_data)
+        sidecar = structure.sidecar_path(test_file)
+        self.assertTrue(sidecar.exists())
+        self.check_lazy(test_file)
+
+        # Outdated sidecars are written again on loading
+        with h5py.File(test_file, 'a') as h5file:
+            h5file['group/sub/other'] = 2
+        os.utime(test_file, ns=(0, 0))
+        loaded = itsh5py.load(test_file)
+        self.assertEqual(loaded['group']['sub']['other'], 2)
+        loaded.close()
+
+        sidecar.unlink()
+        test_file.unlink()
+
+    def tearDown(self):
+        itsh5py.config.structure_index = None
+        itsh5py.config.use_lazy = False
+
+
+if __name__ == '__main__':
+    unittest.main()
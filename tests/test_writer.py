@@ -0,0 +1,63 @@
+"""
+Tester for streamed writing with appendable datasets.
+"""
+import unittest
+import logging
+import numpy as np
+from numpy.testing import assert_array_equal
+import itsh5py
+
+logger = logging.getLogger('itsh5py')
+itsh5py.config.use_lazy = False  # Set lazy to False so the data can be compared.
+
+
+class TestHdfWriter(unittest.TestCase):
+    def test_append(self):
+        blocks = [np.random.random((10, 3)) for _ in range(5)]
+
+        with itsh5py.HdfWriter('test_writer') as writer:
+            for block in blocks:
+                writer.append('signal', block)
+                writer.append('nested/group/time', block[:, 0])
+            self.assertEqual(writer.append('signal', np.zeros(3)), 51)
+            writer.append('labels', np.array(['a', 'bc']))
+            writer.append('labels', np.array(['a much longer label']))
+            writer.write('meta', {'name': 'run', 'gain': 2.})
+            test_file = writer.filename
+
+        test_data_loaded = itsh5py.load(test_file)
+        assert_array_equal(test_data_loaded['signal'][:50], np.vstack(blocks))
+        assert_array_equal(test_data_loaded['signal'][50], np.zeros(3))
+        assert_array_equal(test_data_loaded['nested']['group']['time'],
+                           np.concatenate([b[:, 0] for b in blocks]))
+        assert_array_equal(test_data_loaded['labels'],
+                           np.array(['a', 'bc', 'a much longer label']))
+        self.assertEqual(test_data_loaded['meta'], {'name': 'run', 'gain': 2.})
+        test_file.unlink()
+
+    def test_invalid_block(self):
+        with itsh5py.HdfWriter('test_writer_invalid') as writer:
+            writer.append('signal', np.ones((2, 3)))
+            with self.assertRaises(ValueError):
+                writer.append('signal', np.ones((2, 4)))
+            test_file = writer.filename
+        test_file.unlink()
+
+    def test_save_generator(self):
+        def _generator():
+            for i in range(10):
+                yield np.full((4, 2), i)
+
+        test_file = itsh5py.save('test_save_generator', {
+            'gen': _generator(),
+            'nested': {'iter': iter([1., 2., 3.])},
+            })
+        test_data_loaded = itsh5py.load(test_file)
+        assert_array_equal(test_data_loaded['gen'],
+                           np.vstack(list(_generator())))
+        assert_array_equal(test_data_loaded['nested']['iter'], [1., 2., 3.])
+        test_file.unlink()
+
+
+if __name__ == '__main__':
+    unittest.main()